@@ -0,0 +1,166 @@
+import os
+import time
+import argparse
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+import data_cache
+import sales_cube
+import tracing
+import ml_predict
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_CSV = os.path.join(SCRIPT_DIR, 'Video_Games_Sales_as_at_22_Dec_2016.csv')
+GROUP_COLUMNS = ['Platform', 'Name', 'Genre', 'Publisher']
+CUTOFFS = list(range(2005, 2016))
+
+_worker_yearly = None
+
+
+def default_train_years(cube):
+    # The dashboard fits TRAIN_START_YEAR onwards up to the dataset's last
+    # year, so each replay trains on the same number of years up to its cutoff.
+    last_year = int(cube.cells()['Year_of_Release'].max())
+    return last_year - ml_predict.TRAIN_START_YEAR + 1
+
+
+def yearly_tables(cube, cutoffs, train_years):
+    # One (entity, year) sales table per entity type, covering every replay's
+    # training window and target year; the replays only slice it.
+    min_year = min(cutoffs) - train_years + 1
+    max_year = max(cutoffs) + 1
+    tables = {}
+    for group_col in GROUP_COLUMNS:
+        yearly = cube.entity_yearly(group_col, min_year=min_year)
+        tables[group_col] = yearly[yearly['Year_of_Release'] <= max_year].reset_index(drop=True)
+    return tables
+
+
+def score_cutoff(yearly, cutoff, train_years):
+    # Fits every entity's trend on the training window ending at the cutoff,
+    # exactly as the dashboard's forecaster would have that year, and compares
+    # the line's value for the next year with what the entity actually sold
+    # (zero when it sold nothing).
+    errors = []
+    for group_col, table in yearly.items():
+        years = table['Year_of_Release']
+        train = table[(years > cutoff - train_years) & (years <= cutoff)]
+        with tracing.span('backtest.fit_trends', group_col=group_col, cutoff=cutoff):
+            trends = ml_predict.fit_trends(train, group_col)
+        target = table[years == cutoff + 1]
+        actual = pd.Series(target['Global_Sales'].to_numpy(), index=target[group_col].to_numpy())
+
+        predicted = trends['Intercept'].to_numpy() + trends['Slope'].to_numpy() * (cutoff + 1)
+        observed = actual.reindex(trends[group_col].to_numpy()).fillna(0).to_numpy()
+        errors.append(pd.DataFrame({
+            'Group': group_col,
+            'Entity': trends[group_col].to_numpy(),
+            'Cutoff': cutoff,
+            'Predicted': predicted,
+            'Actual': observed,
+            'Error': predicted - observed,
+        }))
+    return pd.concat(errors, ignore_index=True)
+
+
+def _init_worker(yearly):
+    global _worker_yearly
+    _worker_yearly = yearly
+
+
+def _run_cutoff(cutoff, train_years):
+    errors = score_cutoff(_worker_yearly, cutoff, train_years)
+    return errors, tracing.drain()
+
+
+def error_metrics(errors, by):
+    # MAE, RMSE and bias in millions of units over every forecast. WAPE is the
+    # absolute error as a share of actual sales, so it compares across entity
+    # types, and only counts forecasts of entities that sold something that
+    # year: most games sell only in their release year, and their forecasts
+    # against zero would swamp it. MAE covers those.
+    sold = errors['Actual'] != 0
+    frame = errors.assign(
+        Abs_Error=errors['Error'].abs(),
+        Sq_Error=errors['Error'] ** 2,
+        Sold_Abs_Error=errors['Error'].abs().where(sold, 0.0),
+        Abs_Actual=errors['Actual'].abs(),
+    )
+    grouped = frame.groupby(by, sort=True)
+    metrics = pd.DataFrame({
+        'Forecasts': grouped.size(),
+        'MAE': grouped['Abs_Error'].mean(),
+        'RMSE': np.sqrt(grouped['Sq_Error'].mean()),
+        'Bias': grouped['Error'].mean(),
+    })
+    with np.errstate(divide='ignore', invalid='ignore'):
+        metrics['WAPE'] = grouped['Sold_Abs_Error'].sum() / grouped['Abs_Actual'].sum()
+    return metrics.reset_index()
+
+
+@tracing.traced('backtest.run')
+def run_backtest(cube, cutoffs=CUTOFFS, train_years=None, jobs=None):
+    cutoffs = sorted(cutoffs)
+    train_years = train_years or default_train_years(cube)
+    yearly = yearly_tables(cube, cutoffs, train_years)
+
+    jobs = jobs or min(len(cutoffs), os.cpu_count() or 1)
+    if jobs <= 1:
+        parts = [score_cutoff(yearly, cutoff, train_years) for cutoff in cutoffs]
+    else:
+        # The yearly tables are sent to each worker once, not with every cutoff.
+        with ProcessPoolExecutor(
+            max_workers=jobs,
+            mp_context=multiprocessing.get_context('spawn'),
+            initializer=_init_worker,
+            initargs=(yearly,),
+        ) as executor:
+            parts = []
+            for errors, events in executor.map(_run_cutoff, cutoffs, [train_years] * len(cutoffs)):
+                tracing.record(events)
+                parts.append(errors)
+
+    errors = pd.concat(parts, ignore_index=True)
+    return {
+        'errors': errors,
+        'entities': error_metrics(errors, ['Group', 'Entity']),
+        'cutoffs': error_metrics(errors, ['Group', 'Cutoff']),
+        'summary': error_metrics(errors, ['Group']),
+    }
+
+
+def format_summary(summary):
+    lines = [f"{'Entity type':<12} {'Forecasts':>10} {'MAE':>8} {'RMSE':>8} {'Bias':>8} {'WAPE':>8}"]
+    for row in summary.itertuples(index=False):
+        lines.append(f"{row.Group:<12} {row.Forecasts:>10,} {row.MAE:8.3f} {row.RMSE:8.3f} {row.Bias:+8.3f} {row.WAPE:8.1%}")
+    return "\n".join(lines)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Replay the trend forecaster at past cutoff years and score it against actual next-year sales.")
+    parser.add_argument('csv', nargs='?', default=DEFAULT_CSV, help="Sales CSV file")
+    parser.add_argument('--cutoffs', type=int, nargs=2, metavar=('FIRST', 'LAST'), default=(CUTOFFS[0], CUTOFFS[-1]))
+    parser.add_argument('--train-years', type=int, default=None, help="Years per training window (default: the dashboard's window on this dataset)")
+    parser.add_argument('--jobs', type=int, default=None, help="Worker processes (default: one per cutoff, up to the CPU count)")
+    parser.add_argument('--out', default=None, help="Directory for errors.csv, entities.csv and cutoffs.csv")
+    args = parser.parse_args()
+
+    df = data_cache.load_dataset(args.csv)
+    cube = sales_cube.build_cube(df)
+
+    cutoffs = list(range(args.cutoffs[0], args.cutoffs[1] + 1))
+    train_years = args.train_years or default_train_years(cube)
+    print(f">>> Backtesting {len(cutoffs)} cutoffs ({cutoffs[0]}-{cutoffs[-1]}), {train_years}-year training windows...")
+    start = time.perf_counter()
+    backtest = run_backtest(cube, cutoffs, train_years, args.jobs)
+    print(f"    Done in {time.perf_counter() - start:.2f}s")
+    print(format_summary(backtest['summary']))
+
+    if args.out:
+        os.makedirs(args.out, exist_ok=True)
+        for name in ('errors', 'entities', 'cutoffs'):
+            backtest[name].to_csv(os.path.join(args.out, f"{name}.csv"), index=False)
+        print(f"    Wrote errors.csv, entities.csv and cutoffs.csv to {args.out}")
\ No newline at end of file
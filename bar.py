@@ -1,36 +1,84 @@
 import matplotlib.pyplot as plt
 import seaborn as sns
 import pandas as pd
+import numpy as np
 import tkinter as tk
 import os
 
-def run_analysis(df):
-    df['Global_Sales'] = pd.to_numeric(df['Global_Sales'], errors='coerce')
-    df['Critic_Score'] = pd.to_numeric(df['Critic_Score'], errors='coerce')
+import sales_cube
+import bootstrap
+import tracing
 
-    publisher_stats = df.groupby('Publisher').agg(
-        Total_Revenue=('Global_Sales', 'sum'),
-        Game_Count=('Name', 'count'),
-        Max_Critic_Score=('Critic_Score', 'max')
-    ).reset_index()
+TOP_N = 20
+FILTERS = ['years', 'platforms', 'genres']
+# Column each panel ranks publishers by, in axes order.
+PANELS = ['Average_Revenue', 'Total_Revenue', 'Max_Critic_Score', 'Game_Count']
+
+@tracing.traced('bar.compute')
+def compute(df, cube=None, top_n=TOP_N, filters=None, resamples=bootstrap.RESAMPLES):
+    # resamples=0 skips the bootstrap intervals of Average_Revenue; they need
+    # the row-level frame, so streamed and SQLite sessions show the bars alone.
+    cube = cube if cube is not None else sales_cube.build_cube(df)
+    if filters:
+        cube = cube.filtered(**filters)
+
+    with tracing.span('bar.publisher_stats'):
+        publisher_stats = cube.publisher_stats()
 
     publisher_stats['Average_Revenue'] = publisher_stats['Total_Revenue'] / publisher_stats['Game_Count']
-    top_20 = publisher_stats.sort_values('Total_Revenue', ascending=False).head(20)
+    top_20 = publisher_stats.sort_values('Total_Revenue', ascending=False).head(top_n)
+    if df is not None and resamples:
+        with tracing.span('bar.bootstrap'):
+            top_20 = revenue_intervals(df, top_20, filters, resamples)
+    return {'top_publishers': top_20}
+
+def revenue_intervals(df, top_publishers, filters=None, resamples=bootstrap.RESAMPLES):
+    # Bootstrap interval of each listed publisher's revenue per game, from
+    # its named titles (Game_Count counts those; missing sales count as zero).
+    publishers = pd.Categorical(df['Publisher'], categories=top_publishers['Publisher'])
+    codes = np.asarray(publishers.codes)
+    keep = (codes >= 0) & df['Name'].notna().to_numpy() & sales_cube.row_mask(df, **(filters or {}))
+    sales = pd.to_numeric(df['Global_Sales'], errors='coerce').to_numpy(dtype='float64', na_value=np.nan)
+    intervals = bootstrap.bootstrap_groups(codes[keep], np.nan_to_num(sales[keep]), resamples=resamples)
+    intervals.index = np.asarray(top_publishers['Publisher'], dtype=object)[intervals.index]
+    intervals = intervals.rename(columns={'X_Mean_Low': 'Average_Revenue_Low', 'X_Mean_High': 'Average_Revenue_High'})
+    return top_publishers.join(intervals[['Average_Revenue_Low', 'Average_Revenue_High']], on='Publisher')
+
+def _revenue_bars(ax, data):
+    # Error bars over the revenue-per-game bars, when compute() bootstrapped them.
+    if 'Average_Revenue_Low' not in data or not len(data):
+        return None
+    # The bars show the cube's figure, which also counts the sales of nameless
+    # rows, so the interval is widened to include it where needed.
+    values = data['Average_Revenue'].to_numpy()
+    low = np.minimum(data['Average_Revenue_Low'].fillna(data['Average_Revenue']).to_numpy(), values)
+    high = np.maximum(data['Average_Revenue_High'].fillna(data['Average_Revenue']).to_numpy(), values)
+    return ax.errorbar(
+        values, np.arange(len(data)), xerr=[values - low, high - values],
+        fmt='none', ecolor='black', elinewidth=1, capsize=3, zorder=3,
+    )
 
-    fig, axes = plt.subplots(2, 2, figsize=(14, 10))
+@tracing.traced('bar.render')
+def render(results, figsize=(14, 10)):
+    top_20 = results['top_publishers']
+
+    fig, axes = plt.subplots(2, 2, figsize=figsize)
     plt.subplots_adjust(hspace=0.4, wspace=0.5, bottom=0.1, top=0.9, left=0.15, right=0.95)
 
     ax1 = axes[0, 0]
     data_1 = top_20.sort_values('Average_Revenue', ascending=False)
-    sns.barplot(data=data_1, y='Publisher', x='Average_Revenue', ax=ax1, palette='viridis')
+    with tracing.span('bar.render.barplot'):
+        sns.barplot(data=data_1, y='Publisher', x='Average_Revenue', ax=ax1, palette='viridis')
+    intervals = _revenue_bars(ax1, data_1)
     ax1.set_title('1. Efficiency: Avg Revenue per Game', fontsize=12, fontweight='bold')
-    ax1.set_xlabel('Avg Sales ($M)')
+    ax1.set_xlabel('Avg Sales ($M)' if intervals is None else f'Avg Sales ($M), {bootstrap.CONFIDENCE:.0%} bootstrap interval')
     ax1.set_ylabel('')
     ax1.tick_params(axis='y', labelsize=8)
 
     ax2 = axes[0, 1]
     data_2 = top_20.sort_values('Total_Revenue', ascending=False)
-    sns.barplot(data=data_2, y='Publisher', x='Total_Revenue', ax=ax2, palette='magma')
+    with tracing.span('bar.render.barplot'):
+        sns.barplot(data=data_2, y='Publisher', x='Total_Revenue', ax=ax2, palette='magma')
     ax2.set_title('2. Market Leaders: Total Revenue', fontsize=12, fontweight='bold')
     ax2.set_xlabel('Total Sales ($M)')
     ax2.set_ylabel('')
@@ -38,7 +86,8 @@ def run_analysis(df):
 
     ax3 = axes[1, 0]
     data_3 = top_20.sort_values('Max_Critic_Score', ascending=False)
-    sns.barplot(data=data_3, y='Publisher', x='Max_Critic_Score', ax=ax3, palette='rocket')
+    with tracing.span('bar.render.barplot'):
+        sns.barplot(data=data_3, y='Publisher', x='Max_Critic_Score', ax=ax3, palette='rocket')
     ax3.set_title('3. Critical Peak: Highest Game Score', fontsize=12, fontweight='bold')
     ax3.set_xlabel('Max Critic Score')
     ax3.set_ylabel('')
@@ -47,13 +96,15 @@ def run_analysis(df):
 
     ax4 = axes[1, 1]
     data_4 = top_20.sort_values('Game_Count', ascending=False)
-    sns.barplot(data=data_4, y='Publisher', x='Game_Count', ax=ax4, palette='crest')
+    with tracing.span('bar.render.barplot'):
+        sns.barplot(data=data_4, y='Publisher', x='Game_Count', ax=ax4, palette='crest')
     ax4.set_title('4. Volume: Total Games Released', fontsize=12, fontweight='bold')
     ax4.set_xlabel('Number of Games')
     ax4.set_ylabel('')
     ax4.tick_params(axis='y', labelsize=8)
 
-    fig.suptitle(f'Top 20 Publishers: 4-Part Analysis', fontsize=18)
+    title = fig.suptitle(f'Top {len(top_20)} Publishers: 4-Part Analysis', fontsize=18)
+    fig.filter_artists = {'axes': [ax1, ax2, ax3, ax4], 'title': title, 'intervals': intervals}
 
     manager = plt.get_current_fig_manager()
     if hasattr(manager, 'window'):
@@ -71,6 +122,37 @@ def run_analysis(df):
             pass
         # ------------------------------
 
+    return fig
+
+@tracing.traced('bar.update')
+def update(fig, results):
+    # Resizes and relabels the existing bars for a new filter selection
+    # instead of drawing four fresh seaborn plots. The x limits follow the
+    # data, so the caller redraws the whole figure.
+    top_20 = results['top_publishers']
+    artists = fig.filter_artists
+    for ax, column in zip(artists['axes'], PANELS):
+        data = top_20.sort_values(column, ascending=False)
+        values = data[column].fillna(0).to_numpy()
+        labels = data['Publisher'].tolist()
+        bars = ax.patches
+        for i, bar in enumerate(bars):
+            bar.set_visible(i < len(values))
+            if i < len(values):
+                bar.set_width(values[i])
+        ax.set_yticks(range(len(bars)), labels + [''] * (len(bars) - len(labels)))
+        if column == 'Average_Revenue' and artists['intervals'] is not None:
+            artists['intervals'].remove()
+            artists['intervals'] = _revenue_bars(ax, data)
+            if artists['intervals'] is not None:
+                values = np.append(values, data['Average_Revenue_High'].fillna(0).to_numpy())
+        if column != 'Max_Critic_Score':
+            ax.set_xlim(0, values.max() * 1.05 if len(values) and values.max() > 0 else 1)
+    artists['title'].set_text(f'Top {len(top_20)} Publishers: 4-Part Analysis')
+    return True
+
+def run_analysis(df, cube=None):
+    render(compute(df, cube=cube))
     plt.show()
 
 if __name__ == "__main__":
@@ -0,0 +1,56 @@
+import os
+import sys
+import time
+import numpy as np
+import shapely
+from shapely.geometry import Point
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import geo_store
+from heat import generate_random_points
+
+DOT_COUNTS = [100, 1000, 10000, 100000, 1000000]
+LEGACY_LIMIT = 10000
+
+
+def legacy_generate_random_points(geom, num_points):
+    # The original one-Point-at-a-time sampler, kept for comparison.
+    points = []
+    minx, miny, maxx, maxy = geom.bounds
+    attempts = 0
+    while len(points) < num_points and attempts < num_points * 20:
+        pnt = Point(np.random.uniform(minx, maxx), np.random.uniform(miny, maxy))
+        if geom.contains(pnt):
+            points.append([pnt.x, pnt.y])
+        attempts += 1
+    return np.array(points)
+
+
+def benchmark_geometry():
+    if os.path.exists(geo_store.STORE_PATH):
+        regions = geo_store.load_store().regions()
+        return 'Rest of World (store)', regions[-1]['geometry']
+    # Fallback: a star-shaped polygon with a ~50% hit rate against its bounding box.
+    angles = np.linspace(0, 2 * np.pi, 64, endpoint=False)
+    radii = np.where(np.arange(64) % 2 == 0, 60, 30)
+    return 'synthetic star', shapely.Polygon(np.column_stack([radii * np.cos(angles), radii * np.sin(angles)]))
+
+
+if __name__ == "__main__":
+    name, geom = benchmark_geometry()
+    print(f"Dot sampler benchmark on {name}")
+    print(f"{'Dots':>10} {'Legacy (s)':>12} {'Vectorized (s)':>15} {'Dots/s':>14}")
+
+    for count in DOT_COUNTS:
+        legacy = '-'
+        if count <= LEGACY_LIMIT:
+            start = time.perf_counter()
+            legacy_generate_random_points(geom, count)
+            legacy = f"{time.perf_counter() - start:.4f}"
+
+        rng = np.random.default_rng(0)
+        start = time.perf_counter()
+        dots = generate_random_points(geom, count, rng)
+        elapsed = time.perf_counter() - start
+        print(f"{count:>10} {legacy:>12} {elapsed:>15.4f} {len(dots) / elapsed:>14,.0f}")
\ No newline at end of file
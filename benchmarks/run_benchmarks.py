@@ -0,0 +1,171 @@
+import matplotlib
+matplotlib.use('Agg')
+
+import os
+import sys
+import json
+import time
+import platform
+import argparse
+import importlib
+import subprocess
+import tracemalloc
+
+import numpy as np
+import pandas as pd
+import matplotlib.pyplot as plt
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+ROOT_DIR = os.path.dirname(BENCH_DIR)
+sys.path.insert(0, ROOT_DIR)
+
+import geo_store
+import sales_cube
+import synthetic
+
+HISTORY_PATH = os.path.join(BENCH_DIR, 'history.jsonl')
+MODULES = ['bar', 'line', 'scatter', 'heat', 'ml_predict']
+DEFAULT_ROWS = [1_000_000]
+
+
+def git_commit():
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'],
+            cwd=ROOT_DIR, capture_output=True, text=True, check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def max_rss_mb():
+    try:
+        import resource
+    except ImportError:
+        return None
+    # ru_maxrss is in kilobytes on Linux and bytes on macOS.
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return rss / 2**20 if sys.platform == 'darwin' else rss / 2**10
+
+
+def measure(func, repeat=1, trace=True):
+    # Best wall time over `repeat` untraced runs, plus one traced run for the
+    # peak Python allocation (tracemalloc slows allocation-heavy code such as
+    # rendering by an order of magnitude, so it never overlaps the timing).
+    best = None
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+
+    peak = None
+    if trace:
+        tracemalloc.start()
+        func()
+        peak = tracemalloc.get_traced_memory()[1] / 2**20
+        tracemalloc.stop()
+    return result, best, peak
+
+
+def run_size(n_rows, modules, repeat, render, source):
+    records = []
+    print(f">>> {n_rows:,} rows")
+
+    start = time.perf_counter()
+    df = synthetic.generate(n_rows, source=source)
+    print(f"    generated in {time.perf_counter() - start:.2f}s")
+
+    cube, elapsed, peak = measure(lambda: sales_cube.build_cube(df), repeat)
+    records.append({'rows': n_rows, 'stage': 'cube', 'phase': 'compute', 'seconds': elapsed, 'peak_mb': peak})
+
+    for module_name in modules:
+        if module_name == 'heat' and not os.path.exists(geo_store.STORE_PATH):
+            print("    heat skipped (no geometry store; run geo_store.py import)")
+            continue
+        module = importlib.import_module(module_name)
+        results, elapsed, peak = measure(lambda: module.compute(df, cube=cube), repeat)
+        records.append({'rows': n_rows, 'stage': module_name, 'phase': 'compute', 'seconds': elapsed, 'peak_mb': peak})
+
+        if render:
+            fig, elapsed, peak = measure(lambda: module.render(results), 1, trace=False)
+            plt.close('all')
+            records.append({'rows': n_rows, 'stage': module_name, 'phase': 'render', 'seconds': elapsed, 'peak_mb': peak})
+
+    for record in records:
+        peak = '' if record['peak_mb'] is None else f"{record['peak_mb']:9.1f} MB peak"
+        print(f"    {record['stage']:<12} {record['phase']:<8} {record['seconds'] * 1000:10.1f} ms {peak}")
+    return records
+
+
+def append_history(records, path=HISTORY_PATH):
+    meta = {
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'commit': git_commit(),
+        'python': platform.python_version(),
+        'numpy': np.__version__,
+        'pandas': pd.__version__,
+        'machine': platform.machine(),
+        'cpus': os.cpu_count(),
+        'max_rss_mb': max_rss_mb(),
+    }
+    with open(path, 'a') as f:
+        for record in records:
+            f.write(json.dumps({**meta, **record}) + "\n")
+
+
+def load_history(path=HISTORY_PATH):
+    if not os.path.exists(path):
+        return []
+    with open(path) as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def compare(path=HISTORY_PATH, threshold=0.10):
+    # Latest run of each (rows, stage, phase) against the most recent run from
+    # a different commit.
+    history = load_history(path)
+    latest = {}
+    previous = {}
+    for record in history:
+        key = (record['rows'], record['stage'], record['phase'])
+        if key in latest and latest[key]['commit'] != record['commit']:
+            previous[key] = latest[key]
+        latest[key] = record
+
+    print(f"{'Rows':>12} {'Stage':<12} {'Phase':<8} {'Before (ms)':>12} {'After (ms)':>12} {'Change':>8}")
+    regressions = 0
+    for key in sorted(latest):
+        if key not in previous:
+            continue
+        before = previous[key]['seconds']
+        after = latest[key]['seconds']
+        change = (after - before) / before if before else 0.0
+        flag = '  <-- slower' if change > threshold else ''
+        regressions += bool(flag)
+        print(f"{key[0]:>12,} {key[1]:<12} {key[2]:<8} {before * 1000:12.1f} {after * 1000:12.1f} {change:+8.1%}{flag}")
+    return regressions
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Time each module's compute phase on synthetic data.")
+    parser.add_argument('--rows', type=int, nargs='+', default=DEFAULT_ROWS, help="Row counts to generate (e.g. 1000000 10000000)")
+    parser.add_argument('--modules', nargs='+', choices=MODULES, default=MODULES)
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--render', action='store_true', help="Also time rendering (Agg backend), reported separately")
+    parser.add_argument('--no-save', action='store_true', help="Do not append results to history.jsonl")
+    parser.add_argument('--compare', action='store_true', help="Compare the latest results with the previous commit and exit")
+    args = parser.parse_args()
+
+    if args.compare:
+        sys.exit(1 if compare() else 0)
+
+    source = synthetic.load_source()
+    records = []
+    for n_rows in args.rows:
+        records.extend(run_size(n_rows, args.modules, args.repeat, args.render, source))
+
+    if not args.no_save:
+        append_history(records)
+        print(f"Appended {len(records)} results to {HISTORY_PATH}")
\ No newline at end of file
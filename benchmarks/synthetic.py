@@ -0,0 +1,91 @@
+import os
+import sys
+import time
+import argparse
+import numpy as np
+import pandas as pd
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT_DIR)
+
+import data_cache
+
+SOURCE_CSV = os.path.join(ROOT_DIR, 'Video_Games_Sales_as_at_22_Dec_2016.csv')
+TEXT_COLUMNS = ['Name', 'Platform', 'Genre', 'Publisher', 'Developer', 'Rating']
+REGION_COLUMNS = ['NA_Sales', 'EU_Sales', 'JP_Sales', 'Other_Sales']
+
+
+def load_source(csv_path=SOURCE_CSV):
+    return data_cache.load_dataset(csv_path)
+
+
+def generate(n_rows, source=None, seed=0):
+    # Rows are drawn from the real catalogue so the joint distribution of
+    # platform, year, genre, publisher and scores is preserved. Each draw is
+    # assigned to a "replica" of its title, so the number of distinct titles
+    # grows with the row count instead of staying at the source's ~11.5k.
+    source = source if source is not None else load_source()
+    rng = np.random.default_rng(seed)
+    n_source = len(source)
+    picks = rng.integers(0, n_source, n_rows)
+
+    data = {}
+    for col in TEXT_COLUMNS:
+        codes, uniques = pd.factorize(source[col], sort=True, use_na_sentinel=True)
+        if col == 'Name':
+            continue
+        data[col] = pd.Categorical.from_codes(codes[picks], categories=uniques)
+
+    name_codes, names = pd.factorize(source['Name'], sort=True, use_na_sentinel=True)
+    replicas = max(1, int(np.ceil(n_rows / n_source)))
+    replica = rng.integers(0, replicas, n_rows)
+    picked_names = name_codes[picks]
+    title_codes = np.where(picked_names >= 0, picked_names.astype(np.int64) * replicas + replica, -1)
+    named = title_codes >= 0
+    used, inverse = np.unique(title_codes[named], return_inverse=True)
+    title_codes[named] = inverse
+    title_names = [
+        names[code // replicas] if replicas == 1 else f"{names[code // replicas]} #{code % replicas}"
+        for code in used
+    ]
+    data['Name'] = pd.Categorical.from_codes(title_codes, categories=title_names)
+
+    # Perturb sales so the replicas are not exact copies, then rebuild the
+    # global column from the regions as in the source data.
+    noise = rng.lognormal(mean=0.0, sigma=0.25, size=n_rows)
+    for col in REGION_COLUMNS:
+        data[col] = np.round(source[col].to_numpy(dtype='float64')[picks] * noise, 2)
+    data['Global_Sales'] = np.round(sum(data[col] for col in REGION_COLUMNS), 2)
+
+    for col in ['Year_of_Release', 'Critic_Score', 'Critic_Count', 'User_Score', 'User_Count']:
+        data[col] = source[col].array.take(picks)
+
+    return data_cache.prepare_frame(pd.DataFrame(data, columns=list(source.columns)))
+
+
+def write_csv(path, n_rows, seed=0, chunk_rows=1_000_000):
+    source = load_source()
+    written = 0
+    chunk_index = 0
+    while written < n_rows:
+        size = min(chunk_rows, n_rows - written)
+        chunk = generate(size, source=source, seed=seed + chunk_index)
+        if chunk_index > 0:
+            # Keep titles distinct across chunks.
+            chunk['Name'] = chunk['Name'].cat.rename_categories(lambda name: f"{name} /{chunk_index}")
+        chunk.to_csv(path, mode='w' if written == 0 else 'a', header=(written == 0), index=False)
+        written += size
+        chunk_index += 1
+        print(f"    {written:,} / {n_rows:,} rows")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Write a synthetic sales CSV with the real catalogue's schema and cardinality.")
+    parser.add_argument('rows', type=int)
+    parser.add_argument('out')
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    write_csv(args.out, args.rows, args.seed)
+    print(f"Wrote {args.rows:,} rows to {args.out} in {time.perf_counter() - start:.1f}s")
\ No newline at end of file
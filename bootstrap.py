@@ -0,0 +1,129 @@
+import warnings
+import numpy as np
+import pandas as pd
+
+import tracing
+
+RESAMPLES = 2000
+CONFIDENCE = 0.95
+# Fixed seed: the same data always gets the same intervals (and cache entry).
+SEED = 0
+# Rows drawn per group and resample. Larger groups are resampled m out of
+# n: GROUP_DRAWS rows each time, with the spread around the point estimate
+# scaled by sqrt(GROUP_DRAWS / rows), which keeps the cost flat as the data
+# grows. Every genre and publisher in the shipped dataset is smaller, so it
+# gets the ordinary bootstrap.
+GROUP_DRAWS = 2000
+# Index-matrix entries drawn per batch of resamples, bounding peak memory.
+BATCH_CELLS = 2_000_000
+
+
+def _percentiles(samples, confidence):
+    # Percentile interval per group (column); groups whose statistic is
+    # undefined in every resample (one title, constant values) get NaN.
+    tail = (1 - confidence) / 2
+    if samples.shape[1] == 0:
+        # No groups; nanquantile cannot reduce an empty axis.
+        return np.empty(0), np.empty(0)
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore', RuntimeWarning)
+        low, high = np.nanquantile(samples, [tail, 1 - tail], axis=0)
+    return low, high
+
+
+def _correlation(n, sx, sy, sxx, syy, sxy):
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return (n * sxy - sx * sy) / np.sqrt((n * sxx - sx * sx) * (n * syy - sy * sy))
+
+
+@tracing.traced('bootstrap.groups')
+def bootstrap_groups(codes, x, y=None, resamples=RESAMPLES, confidence=CONFIDENCE, seed=SEED):
+    # Stratified bootstrap of every group at once: each resample redraws every
+    # group's rows from that group only, with replacement. Rows are sorted by
+    # group and each group owns a run of draw slots, so a batch of resamples
+    # is one index matrix (resamples x slots) and the per-group sums are a
+    # single reduceat along its rows. Returns one row per non-empty group code
+    # with the mean of x and its interval, and with y also the mean of y and
+    # the correlation of x and y with their intervals.
+    codes = np.asarray(codes, dtype=np.int64)
+    order = np.argsort(codes, kind='stable')
+    codes = codes[order]
+    x = np.asarray(x, dtype='float64')[order]
+    if y is not None:
+        y = np.asarray(y, dtype='float64')[order]
+
+    groups, starts, counts = np.unique(codes, return_index=True, return_counts=True)
+    draws_per_group = np.minimum(counts, GROUP_DRAWS)
+    slot_starts = np.concatenate([[0], np.cumsum(draws_per_group)[:-1]]).astype(np.int64)
+    # Every slot draws from the index range of its own group.
+    slot_row_start = np.repeat(starts, draws_per_group)
+    slot_row_count = np.repeat(counts, draws_per_group).astype('float64')
+    n = counts.astype('float64')
+    m = draws_per_group.astype('float64')
+
+    point = {'Count': counts}
+    if len(codes):
+        point['X_Mean'] = np.add.reduceat(x, starts) / n
+        if y is not None:
+            point['Y_Mean'] = np.add.reduceat(y, starts) / n
+            point['R'] = _correlation(
+                n, np.add.reduceat(x, starts), np.add.reduceat(y, starts),
+                np.add.reduceat(x * x, starts), np.add.reduceat(y * y, starts), np.add.reduceat(x * y, starts),
+            )
+    else:
+        point.update({name: np.empty(0) for name in (['X_Mean'] + (['Y_Mean', 'R'] if y is not None else []))})
+
+    samples = {name: np.empty((resamples, len(groups))) for name in point if name != 'Count'}
+    rng = np.random.default_rng(seed)
+    slots = len(slot_row_start)
+    batch = max(1, BATCH_CELLS // max(slots, 1))
+    for first in range(0, resamples if slots else 0, batch):
+        size = min(batch, resamples - first)
+        with tracing.span('bootstrap.batch', resamples=size):
+            draws = slot_row_start + (rng.random((size, slots)) * slot_row_count).astype(np.int64)
+            xs = x[draws]
+            sx = np.add.reduceat(xs, slot_starts, axis=1)
+            samples['X_Mean'][first:first + size] = sx / m
+            if y is not None:
+                ys = y[draws]
+                sy = np.add.reduceat(ys, slot_starts, axis=1)
+                samples['Y_Mean'][first:first + size] = sy / m
+                samples['R'][first:first + size] = _correlation(
+                    m, sx, sy,
+                    np.add.reduceat(xs * xs, slot_starts, axis=1),
+                    np.add.reduceat(ys * ys, slot_starts, axis=1),
+                    np.add.reduceat(xs * ys, slot_starts, axis=1),
+                )
+
+    intervals = pd.DataFrame(point, index=pd.Index(groups, name='Group'))
+    # 1 for groups resampled in full; below 1 for the m-out-of-n ones.
+    scale = np.sqrt(m / n)
+    for name, values in samples.items():
+        low, high = _percentiles(values, confidence)
+        intervals[f"{name}_Low"] = point[name] + (low - point[name]) * scale
+        intervals[f"{name}_High"] = point[name] + (high - point[name]) * scale
+    return intervals
+
+
+if __name__ == "__main__":
+    import os
+    import sys
+    import time
+    import data_cache
+
+    script_dir = os.path.dirname(os.path.abspath(__file__))
+    csv_path = sys.argv[1] if len(sys.argv) > 1 else os.path.join(script_dir, 'Video_Games_Sales_as_at_22_Dec_2016.csv')
+    resamples = int(sys.argv[2]) if len(sys.argv) > 2 else RESAMPLES
+
+    df = data_cache.load_dataset(csv_path)
+    critic = pd.to_numeric(df['Critic_Score'], errors='coerce').to_numpy(dtype='float64', na_value=np.nan)
+    sales = pd.to_numeric(df['Global_Sales'], errors='coerce').to_numpy(dtype='float64', na_value=np.nan)
+    genres = pd.Categorical(df['Genre'])
+    scored = ~np.isnan(critic) & (np.asarray(genres.codes) >= 0)
+
+    start = time.perf_counter()
+    intervals = bootstrap_groups(np.asarray(genres.codes)[scored], np.nan_to_num(sales[scored]), critic[scored], resamples)
+    elapsed = time.perf_counter() - start
+    print(f"{resamples:,} resamples of {int(scored.sum()):,} scored rows in {len(intervals)} genres: {elapsed * 1000:.0f} ms")
+    intervals.index = np.asarray(genres.categories)[intervals.index]
+    print(intervals.round(3).to_string())
\ No newline at end of file
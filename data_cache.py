@@ -0,0 +1,360 @@
+import os
+import sys
+import json
+import time
+import shutil
+import hashlib
+import numpy as np
+import pandas as pd
+
+CACHE_DIR_NAME = '.greenlight_cache'
+CACHE_VERSION = 3
+
+# Integer-valued columns are stored compactly with -1 marking a missing value.
+INT_COLUMNS = {
+    'Year_of_Release': np.int16,
+    'Critic_Score': np.int16,
+    'Critic_Count': np.int16,
+    'User_Count': np.int32,
+}
+
+# User_Score holds "tbd" strings next to scores like "8.3"; stored as tenths.
+SCALED_COLUMNS = {
+    'User_Score': 10,
+}
+
+MISSING = -1
+
+# Float columns with at most this many decimals (sales in millions with two)
+# are stored as float32, which the prepared frame maps as is; the decimals
+# recorded with them restore the exact float64 values for plain frames.
+MAX_FLOAT32_DECIMALS = 6
+
+# Rows parsed per chunk when a CSV is read with progress reporting.
+CHUNK_ROWS = 200_000
+
+# Prepared (compact) frames: text columns become categoricals sharing one
+# string per distinct value, integers nullable small ints, floats float32.
+NULLABLE_INT_DTYPES = {
+    np.int16: 'Int16',
+    np.int32: 'Int32',
+}
+
+
+def default_cache_dir(csv_path):
+    csv_path = os.path.abspath(csv_path)
+    stem = os.path.splitext(os.path.basename(csv_path))[0]
+    return os.path.join(os.path.dirname(csv_path), CACHE_DIR_NAME, stem)
+
+
+def file_digest(path, block_size=1 << 20):
+    digest = hashlib.sha1()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(block_size), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def read_source_csv(csv_path, **kwargs):
+    return pd.read_csv(csv_path, **kwargs)
+
+
+def read_source_chunks(csv_path, chunk_rows=CHUNK_ROWS, progress=None, **kwargs):
+    # Parses the CSV a chunk at a time through one binary handle, calling
+    # progress(rows_parsed, bytes_read) after each chunk.
+    with open(csv_path, 'rb') as f:
+        rows = 0
+        for chunk in read_source_csv(f, chunksize=chunk_rows, **kwargs):
+            rows += len(chunk)
+            if progress is not None:
+                progress(rows, f.tell())
+            yield chunk
+
+
+def _encode_float(values):
+    present = values[~np.isnan(values)]
+    narrow = present.astype(np.float32).astype(np.float64)
+    for decimals in range(MAX_FLOAT32_DECIMALS + 1):
+        if np.array_equal(np.round(present, decimals), present):
+            if np.array_equal(np.round(narrow, decimals), present):
+                return {'kind': 'float', 'decimals': decimals}, {'values': values.astype(np.float32)}
+            break
+    return {'kind': 'float'}, {'values': values}
+
+
+def _encode_column(series):
+    name = series.name
+
+    if name in SCALED_COLUMNS:
+        scale = SCALED_COLUMNS[name]
+        values = pd.to_numeric(series, errors='coerce').to_numpy(dtype='float64')
+        scaled = np.round(values * scale)
+        missing = np.isnan(values)
+        if np.allclose(scaled[~missing] / scale, values[~missing]):
+            out = np.where(missing, MISSING, scaled).astype(np.int16)
+            return {'kind': 'scaled', 'scale': scale}, {'values': out}
+        return _encode_float(values)
+
+    if name in INT_COLUMNS or pd.api.types.is_numeric_dtype(series.dtype):
+        values = pd.to_numeric(series, errors='coerce').to_numpy(dtype='float64')
+
+        if name in INT_COLUMNS:
+            dtype = INT_COLUMNS[name]
+            missing = np.isnan(values)
+            present = values[~missing]
+            limits = np.iinfo(dtype)
+            fits = (
+                np.all(present == np.floor(present))
+                and (present.size == 0 or (present.min() >= 0 and present.max() <= limits.max))
+            )
+            if fits:
+                out = np.where(missing, MISSING, values).astype(dtype)
+                return {'kind': 'int'}, {'values': out}
+
+        return _encode_float(values)
+
+    codes, categories = pd.factorize(series, use_na_sentinel=True)
+    # Distinct strings are stored as one UTF-8 blob plus offsets; a fixed-width
+    # unicode array would pad every title to the longest one.
+    encoded = [str(value).encode('utf-8') for value in categories]
+    offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+    np.cumsum([len(value) for value in encoded], out=offsets[1:])
+    blob = np.frombuffer(b''.join(encoded), dtype=np.uint8)
+    return {'kind': 'text'}, {'values': codes.astype(np.int32), 'categories': blob, 'offsets': offsets}
+
+
+def _decode_categories(arrays):
+    blob = arrays['categories'].tobytes()
+    offsets = arrays['offsets'].tolist()
+    out = np.empty(len(offsets) - 1, dtype=object)
+    out[:] = [blob[start:end].decode('utf-8') for start, end in zip(offsets[:-1], offsets[1:])]
+    return out
+
+
+def _decode_column(spec, arrays):
+    kind = spec['kind']
+    values = arrays['values']
+
+    if kind == 'float':
+        if 'decimals' in spec:
+            return np.round(values.astype('float64'), spec['decimals'])
+        return values
+    if kind == 'int':
+        out = values.astype('float64')
+        out[values == MISSING] = np.nan
+        return out
+    if kind == 'scaled':
+        out = values.astype('float64') / spec['scale']
+        out[values == MISSING] = np.nan
+        return out
+
+    categories = _decode_categories(arrays)
+    out = np.empty(len(values), dtype=object)
+    present = values != MISSING
+    out[present] = categories[values[present]]
+    out[~present] = np.nan
+    return out
+
+
+def _readonly(array):
+    array = np.asarray(array)
+    if array.flags.writeable:
+        array.setflags(write=False)
+    return array
+
+
+def _decode_compact(spec, arrays):
+    # Views over the memory-mapped cache where the layout allows it; nothing
+    # here hands out a writable buffer.
+    kind = spec['kind']
+    values = arrays['values']
+
+    if kind == 'float':
+        # float32 on disk for any column that fits (see _encode_float), so
+        # this is the memory map itself.
+        return _readonly(values if values.dtype == np.float32 else values.astype(np.float32))
+    if kind == 'int':
+        mask = _readonly(values == MISSING)
+        return pd.arrays.IntegerArray(values, mask)
+    if kind == 'scaled':
+        mask = _readonly(values == MISSING)
+        scaled = _readonly(values.astype(np.float32) / np.float32(spec['scale']))
+        return pd.arrays.FloatingArray(scaled, mask)
+
+    categories = pd.Index(_decode_categories(arrays))
+    return pd.Categorical.from_codes(values, categories=categories)
+
+
+def prepare_frame(df):
+    # Converts a frame parsed any other way (e.g. straight from CSV) to the
+    # same compact dtypes as a prepared cache read.
+    data = {}
+    for col in df.columns:
+        series = df[col]
+        if isinstance(series.dtype, pd.CategoricalDtype):
+            data[col] = series.array
+        elif col in INT_COLUMNS or col in SCALED_COLUMNS or pd.api.types.is_numeric_dtype(series.dtype):
+            values = pd.to_numeric(series, errors='coerce')
+            if col in INT_COLUMNS:
+                present = values.dropna()
+                if (present == present.round()).all():
+                    data[col] = values.astype(NULLABLE_INT_DTYPES[INT_COLUMNS[col]]).array
+                    continue
+            if col in SCALED_COLUMNS:
+                data[col] = values.astype('Float32').array
+                continue
+            data[col] = _readonly(values.to_numpy(dtype=np.float32, na_value=np.nan))
+        else:
+            data[col] = pd.Categorical(series)
+    return pd.DataFrame(data, columns=list(df.columns))
+
+
+def write_cache(df, cache_dir, source_meta):
+    tmp_dir = cache_dir + '.tmp'
+    if os.path.exists(tmp_dir):
+        shutil.rmtree(tmp_dir)
+    os.makedirs(tmp_dir)
+
+    columns = []
+    for i, col in enumerate(df.columns):
+        spec, arrays = _encode_column(df[col])
+        spec['name'] = col
+        spec['files'] = {}
+        for part, arr in arrays.items():
+            filename = f"{i:03d}.{part}.npy"
+            np.save(os.path.join(tmp_dir, filename), arr)
+            spec['files'][part] = filename
+        columns.append(spec)
+
+    meta = dict(source_meta)
+    meta['version'] = CACHE_VERSION
+    meta['rows'] = len(df)
+    meta['columns'] = columns
+
+    with open(os.path.join(tmp_dir, 'meta.json'), 'w') as f:
+        json.dump(meta, f, indent=1)
+
+    if os.path.exists(cache_dir):
+        shutil.rmtree(cache_dir)
+    os.replace(tmp_dir, cache_dir)
+    return meta
+
+
+def read_meta(cache_dir):
+    meta_path = os.path.join(cache_dir, 'meta.json')
+    if not os.path.exists(meta_path):
+        return None
+    try:
+        with open(meta_path) as f:
+            meta = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if meta.get('version') != CACHE_VERSION:
+        return None
+    return meta
+
+
+def read_cache(cache_dir, meta, compact=True):
+    decode = _decode_compact if compact else _decode_column
+    data = {}
+    for spec in meta['columns']:
+        arrays = {
+            part: np.load(os.path.join(cache_dir, filename), mmap_mode='r')
+            for part, filename in spec['files'].items()
+        }
+        data[spec['name']] = decode(spec, arrays)
+    return pd.DataFrame(data, columns=[spec['name'] for spec in meta['columns']], copy=False)
+
+
+def source_state(csv_path):
+    stat = os.stat(csv_path)
+    return {'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns}
+
+
+def cache_is_fresh(csv_path, cache_dir, meta):
+    state = source_state(csv_path)
+    if meta['source_size'] != state['size']:
+        return False
+    if meta['source_mtime_ns'] == state['mtime_ns']:
+        return True
+
+    # The file was touched or copied; only rebuild if the contents changed.
+    if file_digest(csv_path) != meta['source_sha1']:
+        return False
+    meta['source_mtime_ns'] = state['mtime_ns']
+    # Written aside and swapped in, so a reader never sees a half-written file.
+    meta_path = os.path.join(cache_dir, 'meta.json')
+    with open(meta_path + '.tmp', 'w') as f:
+        json.dump(meta, f, indent=1)
+    os.replace(meta_path + '.tmp', meta_path)
+    return True
+
+
+def build_cache(csv_path, cache_dir=None, compact=True, progress=None):
+    cache_dir = cache_dir or default_cache_dir(csv_path)
+    os.makedirs(os.path.dirname(cache_dir), exist_ok=True)
+
+    if progress is None:
+        df = read_source_csv(csv_path)
+    else:
+        df = pd.concat(read_source_chunks(csv_path, progress=progress), ignore_index=True)
+    state = source_state(csv_path)
+    source_meta = {
+        'source_path': os.path.abspath(csv_path),
+        'source_size': state['size'],
+        'source_mtime_ns': state['mtime_ns'],
+        'source_sha1': file_digest(csv_path),
+    }
+    meta = write_cache(df, cache_dir, source_meta)
+    return read_cache(cache_dir, meta, compact)
+
+
+def load_dataset(csv_path, cache_dir=None, use_cache=True, compact=True, progress=None):
+    # compact=True returns the prepared frame every module shares: compact
+    # dtypes over read-only buffers, so a module that needs a different shape
+    # derives it instead of mutating the shared data. compact=False gives the
+    # plain float64/object frame that pd.read_csv would. progress, if given,
+    # is called with (rows_parsed, bytes_read) while the CSV is parsed; a
+    # fresh cache is opened without parsing anything.
+    if not use_cache:
+        df = read_source_csv(csv_path)
+        df['User_Score'] = pd.to_numeric(df['User_Score'], errors='coerce')
+        return prepare_frame(df) if compact else df
+
+    cache_dir = cache_dir or default_cache_dir(csv_path)
+    meta = read_meta(cache_dir)
+
+    if meta is not None and cache_is_fresh(csv_path, cache_dir, meta):
+        try:
+            return read_cache(cache_dir, meta, compact)
+        except (OSError, ValueError, KeyError) as e:
+            print(f"    Cache unreadable ({e}), rebuilding...")
+
+    print(">>> Building binary dataset cache (one-time conversion)...")
+    return build_cache(csv_path, cache_dir, compact, progress)
+
+
+if __name__ == "__main__":
+    script_dir = os.path.dirname(os.path.abspath(__file__))
+    csv_path = sys.argv[1] if len(sys.argv) > 1 else os.path.join(script_dir, 'Video_Games_Sales_as_at_22_Dec_2016.csv')
+
+    start = time.perf_counter()
+    df = read_source_csv(csv_path)
+    csv_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    df = load_dataset(csv_path)
+    first_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    df = load_dataset(csv_path)
+    cached_time = time.perf_counter() - start
+
+    print(f"Rows: {len(df)}")
+    print(f"pd.read_csv:        {csv_time * 1000:8.1f} ms")
+    print(f"First load (build): {first_time * 1000:8.1f} ms")
+    print(f"Cached load:        {cached_time * 1000:8.1f} ms")
+
+    plain = load_dataset(csv_path, compact=False)
+    print(f"Frame memory:       {plain.memory_usage(deep=True).sum() / 2**20:8.1f} MB plain, "
+          f"{df.memory_usage(deep=True).sum() / 2**20:.1f} MB prepared")
\ No newline at end of file
@@ -0,0 +1,511 @@
+import os
+import sys
+import time
+import hashlib
+import itertools
+import numpy as np
+import pandas as pd
+
+import data_cache
+import sales_cube
+import result_cache
+
+# A delta row replaces the dataset row with the same Name and Platform, or is
+# appended when there is none.
+KEY_COLUMNS = ['Name', 'Platform']
+
+# Entity columns whose ml_predict trend fits depend on the rows they group.
+TREND_COLUMNS = ['Platform', 'Name', 'Genre', 'Publisher']
+
+# Inserted rows wait in a buffer beside the dataset, and workers get the
+# changed rows as a patch (DeltaUpdater.overlay), until together they reach
+# COMPACT_FRACTION of the dataset or COMPACT_ROWS, whichever is larger. Then
+# both are folded into a new compact frame, a cost paid once per fold.
+COMPACT_ROWS = 20_000
+COMPACT_FRACTION = 0.05
+
+# Overlay versions, unique across updaters so a worker never mistakes one
+# dataset's patch for another's.
+_versions = itertools.count(1)
+
+
+def _object_values(series):
+    # Plain values with None for missing. A categorical's categories are
+    # looked up for the rows at hand only; astype(object) would convert all of
+    # them, which for Name is one per title.
+    if isinstance(series.dtype, pd.CategoricalDtype):
+        codes = np.asarray(series.cat.codes)
+        values = np.full(len(codes), None, dtype=object)
+        present = codes >= 0
+        values[present] = np.asarray(series.cat.categories.take(codes[present]), dtype=object)
+        return values
+    values = series.to_numpy(dtype=object, copy=True)
+    values[pd.isna(values)] = None
+    return values
+
+
+def _key_tuples(frame, columns):
+    # Missing values become None so keys with gaps still compare equal.
+    return list(zip(*(_object_values(frame[col]) for col in columns)))
+
+
+def _level_codes(series):
+    # Numbers a key column's distinct values; missing values get len(levels).
+    if isinstance(series.dtype, pd.CategoricalDtype):
+        codes = np.asarray(series.cat.codes, dtype=np.int64)
+        levels = series.cat.categories
+    else:
+        codes, levels = pd.factorize(series, use_na_sentinel=True)
+        codes = codes.astype(np.int64)
+        levels = pd.Index(levels)
+    return np.where(codes < 0, len(levels), codes), levels
+
+
+class RowIndex:
+    # Positions of the rows holding each key, for a key made of a few columns.
+    # The rows present when it is built are indexed once as one sorted integer
+    # code per row (each column's distinct values numbered, combined in mixed
+    # radix). Rows appended or re-keyed since are kept in two small dicts
+    # beside it, so a lookup costs what it returns rather than a scan.
+    def __init__(self, frame, columns):
+        self.columns = list(columns)
+        self.levels = []
+        codes = np.zeros(len(frame), dtype=np.int64)
+        for col in self.columns:
+            column_codes, levels = _level_codes(frame[col])
+            codes = codes * (len(levels) + 1) + column_codes
+            self.levels.append(levels)
+        self.order = np.argsort(codes, kind='stable')
+        self.codes = codes[self.order]
+        # moved: position -> current key, for rows whose key is not the one
+        # indexed above (appended rows included). added: key -> positions
+        # that took it that way.
+        self.moved = {}
+        self.added = {}
+
+    def encode(self, frame):
+        # Each row's code, or -1 where one of its values is new to the index.
+        codes = np.zeros(len(frame), dtype=np.int64)
+        for col, levels in zip(self.columns, self.levels):
+            values = _object_values(frame[col])
+            missing = pd.isna(values)
+            found = levels.get_indexer(values)
+            found[missing] = len(levels)
+            codes = np.where((codes < 0) | (found < 0), -1, codes * (len(levels) + 1) + found)
+        return codes
+
+    def positions(self, frame):
+        # For each row of frame, the sorted positions currently holding its key.
+        codes = self.encode(frame)
+        low = np.searchsorted(self.codes, codes, side='left')
+        high = np.searchsorted(self.codes, codes, side='right')
+        moved = np.fromiter(self.moved, dtype=np.int64, count=len(self.moved))
+        found = []
+        for start, stop, key in zip(low, high, _key_tuples(frame, self.columns)):
+            rows = self.order[start:stop]
+            if len(moved) and len(rows):
+                rows = rows[~np.isin(rows, moved)]
+            extra = self.added.get(key)
+            if extra:
+                rows = np.concatenate([rows, np.fromiter(extra, dtype=np.int64, count=len(extra))])
+            found.append(np.sort(rows))
+        return found
+
+    def first(self, frame):
+        # The first position holding each row's key, or -1 if none does.
+        return np.array([rows[0] if len(rows) else -1 for rows in self.positions(frame)], dtype=np.int64)
+
+    def place(self, positions, frame):
+        # Records that each position now holds the key of frame's row.
+        for position, key in zip(positions, _key_tuples(frame, self.columns)):
+            position = int(position)
+            previous = self.moved.get(position)
+            if previous is not None:
+                self.added[previous].discard(position)
+                if not self.added[previous]:
+                    del self.added[previous]
+            self.moved[position] = key
+            self.added.setdefault(key, set()).add(position)
+
+    def move(self, positions, before, after):
+        # Re-keys the rows whose key changed from before's row to after's.
+        changed = [i for i, (old, new) in enumerate(zip(_key_tuples(before, self.columns), _key_tuples(after, self.columns))) if old != new]
+        if changed:
+            self.place(np.asarray(positions)[changed], after.iloc[changed])
+
+
+def _plain(frame):
+    # Categoricals as plain values, so a few rows do not carry (or pickle)
+    # every category of a large column.
+    frame = frame.copy()
+    for col in frame.columns:
+        if isinstance(frame[col].dtype, pd.CategoricalDtype):
+            frame[col] = _object_values(frame[col])
+    return frame
+
+
+def conform_delta(delta, like):
+    # Parse the delta's columns the same way the dataset loader does. Text
+    # stays plain; categorical columns are widened only where a changed row
+    # needs a value they lack (see DeltaUpdater._write).
+    data = {}
+    for col in like.columns:
+        if col not in delta:
+            values = pd.Series(np.nan, index=delta.index)
+        else:
+            values = delta[col]
+        dtype = like[col].dtype
+        if isinstance(dtype, pd.CategoricalDtype):
+            data[col] = values.astype(object).where(values.notna(), None)
+        elif pd.api.types.is_numeric_dtype(dtype):
+            data[col] = pd.to_numeric(values, errors='coerce').astype(dtype)
+        else:
+            data[col] = values.astype(dtype)
+    conformed = pd.DataFrame(data, index=delta.index)
+
+    missing_key = conformed[KEY_COLUMNS].isna().any(axis=1)
+    if missing_key.any():
+        raise ValueError(f"{int(missing_key.sum())} delta row(s) have no Name or Platform")
+    # The last row for a key wins, as if the delta were applied row by row.
+    return conformed.drop_duplicates(KEY_COLUMNS, keep='last').reset_index(drop=True)
+
+
+def overlay_frame(df, overlay):
+    # df as it was published to a worker, plus the rows changed and appended
+    # since (DeltaUpdater.overlay). Only columns whose values changed are
+    # copied; a categorical meeting a value it lacks falls back to plain
+    # values until the next fold publishes a new compact frame.
+    positions = overlay['positions']
+    if len(positions):
+        rows = overlay['rows']
+        data = {}
+        for col in df.columns:
+            series = df[col]
+            values = rows[col]
+            current = _object_values(series.take(positions))
+            new = _object_values(values)
+            same = (current == new) | (pd.isna(current) & pd.isna(new))
+            if same.all():
+                data[col] = series.array
+                continue
+            if isinstance(series.dtype, pd.CategoricalDtype):
+                present = values.dropna()
+                if (series.cat.categories.get_indexer(present.to_numpy()) < 0).any():
+                    series = series.astype(object)
+            series = series.copy()
+            series.iloc[positions] = values.to_numpy()
+            data[col] = series.array
+        df = pd.DataFrame(data, columns=df.columns)
+    appended = overlay['appended']
+    if appended is not None and len(appended):
+        df = pd.concat([df, appended], ignore_index=True)
+    return df
+
+
+def _empty_value(how, dtype):
+    # A measure's value for a key with no rows: nothing to sum, and a max or
+    # min that any value a later row brings replaces.
+    if how == 'sum':
+        return 0
+    if pd.api.types.is_float_dtype(dtype):
+        return np.nan
+    info = np.iinfo(dtype)
+    return info.min if how == 'max' else info.max
+
+
+def _update_table(table, index, keys, measures, removed, added, recompute, emptied):
+    # Applies removed/added partial aggregates (one row per key) to a cube
+    # table, reading and writing only their rows. Sums are adjusted; a max
+    # or min that a removed row held cannot be undone arithmetically, so
+    # those keys are recomputed from their rows. index (a RowIndex of table
+    # positions) is kept in step. A key left without rows keeps its position
+    # (see _empty_value) and is recorded in emptied, a set of positions, until
+    # DeltaUpdater.compact drops it; one that gets rows again leaves the set.
+    removed_pos = index.first(removed)
+    added_pos = index.first(added)
+    existing = added_pos >= 0
+    touched = np.unique(np.concatenate([removed_pos, added_pos[existing]]))
+    at_removed = np.searchsorted(touched, removed_pos)
+    at_added = np.searchsorted(touched, added_pos[existing])
+    values = {m: table[m].to_numpy()[touched] for m in measures}
+
+    removed_keys = _key_tuples(removed, keys)
+    added_keys = _key_tuples(added, keys)
+    added_lookup = dict(zip(added_keys, range(len(added_keys))))
+
+    dirty = set()
+    for m, how in measures.items():
+        if how == 'sum':
+            np.subtract.at(values[m], at_removed, removed[m].to_numpy())
+            continue
+        current = values[m][at_removed]
+        lost = removed[m].to_numpy()
+        for key, held, value in zip(removed_keys, current, lost):
+            if value != held:
+                continue
+            # Still held if the same key re-adds an equal or better value,
+            # e.g. a row updated without changing its score or position.
+            replacement = added_lookup.get(key)
+            if replacement is not None:
+                readded = added[m].iloc[replacement]
+                if (how == 'max' and readded >= held) or (how == 'min' and readded <= held):
+                    continue
+            dirty.add(key)
+
+    for m, how in measures.items():
+        column = added[m].to_numpy()[existing]
+        if how == 'sum':
+            np.add.at(values[m], at_added, column)
+        elif how == 'max':
+            np.fmax.at(values[m], at_added, column)
+        else:
+            np.fmin.at(values[m], at_added, column)
+
+    if dirty:
+        dirty_keys = pd.DataFrame(list(dirty), columns=keys)
+        fresh = recompute(dirty_keys)
+        fresh_lookup = dict(zip(_key_tuples(fresh, keys), range(len(fresh))))
+        at_dirty = np.searchsorted(touched, index.first(dirty_keys))
+        for key, target in zip(_key_tuples(dirty_keys, keys), at_dirty):
+            source = fresh_lookup.get(key)
+            for m, how in measures.items():
+                values[m][target] = fresh[m].iloc[source] if source is not None else _empty_value(how, values[m].dtype)
+
+    # Written in place: the cube's version tells holders of the table that it
+    # changed (see DeltaUpdater.apply).
+    for m in measures:
+        table.iloc[touched, table.columns.get_loc(m)] = values[m]
+
+    appended = added[~existing]
+    if len(appended):
+        index.place(np.arange(len(table), len(table) + len(appended)), appended)
+        appended = appended[table.columns].astype(table.dtypes.to_dict())
+        table = pd.concat([table, appended], ignore_index=True)
+
+    empty = values['Rows'] == 0
+    emptied.difference_update(touched[~empty].tolist())
+    emptied.update(touched[empty].tolist())
+    return table
+
+
+def _drop_positions(table, positions):
+    keep = np.ones(len(table), dtype=bool)
+    keep[list(positions)] = False
+    return table[keep].reset_index(drop=True)
+
+
+class DeltaUpdater:
+    # Keeps a loaded dataset and its sales cube current as delta files of new
+    # or changed rows arrive, at a cost that follows the delta size: rows are
+    # found through key indexes, changed rows are written in place, inserted
+    # rows wait in a buffer, and only the cube cells and titles they touch are
+    # updated. The buffer and the patch workers need are folded into a new
+    # compact frame once they outgrow COMPACT_ROWS / COMPACT_FRACTION.
+    def __init__(self, df, cube, fingerprint=None):
+        self.cube = cube
+        self.fingerprint = fingerprint or result_cache.dataset_fingerprint(df)
+        self.cell_index = RowIndex(cube.frame, sales_cube.CUBE_KEYS)
+        self.title_index = RowIndex(cube.titles, sales_cube.TITLE_KEYS)
+        # Positions of the cells and titles left without rows (see
+        # _update_table), dropped from the cube by compact().
+        self.emptied_cells = set()
+        self.emptied_titles = set()
+        self._reset(df)
+
+    def _reset(self, df):
+        # The prepared frame is read-only and shared; the updater works on its
+        # own frame and copies each column's buffer once, on the first change.
+        self.base = df.copy(deep=False)
+        self.owned = False
+        self.appended = None
+        # Positions of base rows changed since df was published to workers.
+        self.changed = set()
+        self.version = next(_versions)
+        self.current = self.base
+        self.row_index = RowIndex(self.base, KEY_COLUMNS)
+        self.cell_rows = RowIndex(self.base, sales_cube.CUBE_KEYS)
+        self.title_rows = RowIndex(self.base, sales_cube.TITLE_KEYS)
+
+    def __len__(self):
+        return len(self.base) + (len(self.appended) if self.appended is not None else 0)
+
+    def take(self, positions):
+        # Current rows at the given positions (appended rows follow the base
+        # ones), in the order asked for and labelled by position.
+        positions = np.asarray(positions, dtype=np.int64)
+        in_base = positions < len(self.base)
+        if self.appended is None or in_base.all():
+            return self.base.take(positions)
+        parts = pd.concat([
+            self.base.take(positions[in_base]),
+            self.appended.iloc[positions[~in_base] - len(self.base)],
+        ])
+        order = np.concatenate([np.flatnonzero(in_base), np.flatnonzero(~in_base)])
+        return parts.iloc[np.argsort(order, kind='stable')]
+
+    def frame(self):
+        # The whole current dataset. With rows in the buffer it is assembled
+        # on first use after an update, by whoever needs every row.
+        if self.current is None:
+            self.current = pd.concat([self.base, self.appended], ignore_index=True)
+        return self.current
+
+    def overlay(self):
+        # What a holder of the frame as last published needs to see the
+        # current one (see overlay_frame): changed rows and the buffer.
+        positions = np.array(sorted(self.changed), dtype=np.int64)
+        return {
+            'version': self.version,
+            'positions': positions,
+            'rows': _plain(self.base.take(positions)),
+            'appended': self.appended,
+        }
+
+    def _recompute(self, index, keys, table_name):
+        positions = [p for rows in index.positions(keys) for p in rows]
+        positions = np.unique(np.asarray(positions, dtype=np.int64))
+        partial = sales_cube.build_cube(_plain(self.take(positions)), positions=positions)
+        return getattr(partial, table_name)
+
+    def _write(self, positions, rows):
+        # Changed rows go back where they were: in place in the base frame
+        # (after widening a categorical that lacks one of their values; key
+        # columns never need it) or in the buffer.
+        in_base = positions < len(self.base)
+        base_pos = positions[in_base]
+        if len(base_pos):
+            if not self.owned:
+                for col in self.base.columns:
+                    self.base[col] = self.base[col].copy()
+                self.owned = True
+            base_rows = rows[in_base]
+            for col in self.base.columns:
+                if col in KEY_COLUMNS:
+                    continue
+                dtype = self.base[col].dtype
+                if isinstance(dtype, pd.CategoricalDtype):
+                    present = base_rows[col].dropna()
+                    new = present[dtype.categories.get_indexer(present.to_numpy()) < 0].unique()
+                    if len(new):
+                        self.base[col] = self.base[col].cat.add_categories(new)
+                self.base.iloc[base_pos, self.base.columns.get_loc(col)] = base_rows[col].array
+            self.changed.update(base_pos.tolist())
+        if not in_base.all():
+            buffered = rows[~in_base]
+            local = positions[~in_base] - len(self.base)
+            for col in self.appended.columns:
+                self.appended.iloc[local, self.appended.columns.get_loc(col)] = buffered[col].array
+
+    def _append(self, rows, start):
+        rows = rows.set_axis(pd.RangeIndex(start, start + len(rows)))
+        self.appended = rows if self.appended is None else pd.concat([self.appended, rows])
+
+    def compact(self):
+        # Folds the buffer into a new compact frame and reindexes it, and drops
+        # the cube's emptied cells and titles. Workers and the title index then
+        # start over from frame().
+        folded = data_cache.prepare_frame(self.frame())
+        self._reset(folded)
+        cube = self.cube
+        if self.emptied_cells:
+            cube.frame = _drop_positions(cube.frame, self.emptied_cells)
+            self.cell_index = RowIndex(cube.frame, sales_cube.CUBE_KEYS)
+            self.emptied_cells = set()
+        if self.emptied_titles:
+            cube.titles = _drop_positions(cube.titles, self.emptied_titles)
+            self.title_index = RowIndex(cube.titles, sales_cube.TITLE_KEYS)
+            self.emptied_titles = set()
+        cube.emptied = 0
+
+    def apply(self, delta):
+        delta = conform_delta(delta, self.base)
+        positions = self.row_index.first(delta)
+        updated = positions >= 0
+
+        updated_pos = positions[updated]
+        old_rows = _plain(self.take(updated_pos))
+        new_rows = delta[updated]
+        removed = sales_cube.build_cube(old_rows, positions=updated_pos)
+        self._write(updated_pos, new_rows)
+        for index in (self.cell_rows, self.title_rows):
+            index.move(updated_pos, old_rows, new_rows)
+
+        inserted = delta[~updated]
+        if len(inserted):
+            start = len(self)
+            positions[~updated] = np.arange(start, start + len(inserted))
+            self._append(inserted, start)
+            for index in (self.row_index, self.cell_rows, self.title_rows):
+                index.place(positions[~updated], inserted)
+        self.current = None if self.appended is not None else self.base
+
+        added = sales_cube.build_cube(delta, positions=positions)
+
+        cube = self.cube
+        cube.frame = _update_table(
+            cube.frame, self.cell_index, sales_cube.CUBE_KEYS, sales_cube.MEASURES,
+            removed.frame, added.frame,
+            lambda dirty: self._recompute(self.cell_rows, dirty, 'frame'),
+            self.emptied_cells,
+        )
+        cube.titles = _update_table(
+            cube.titles, self.title_index, sales_cube.TITLE_KEYS, sales_cube.TITLE_MEASURES,
+            removed.titles, added.titles,
+            lambda dirty: self._recompute(self.title_rows, dirty, 'titles'),
+            self.emptied_titles,
+        )
+        cube.emptied = len(self.emptied_cells) + len(self.emptied_titles)
+        cube.version += 1
+
+        affected = {}
+        for col in TREND_COLUMNS:
+            source = 'titles' if col == 'Name' else 'frame'
+            touched = pd.concat([getattr(removed, source)[col], getattr(added, source)[col]])
+            affected[col] = set(touched.dropna())
+        # Trend fits are kept on this cube, the one updates are applied to,
+        # and reach process workers with it. Workers fit their own copies, so
+        # the first update fits the default ones here in full, once.
+        import ml_predict
+        for col, entities in affected.items():
+            ml_predict.refit_trends(cube, col, entities)
+            ml_predict.entity_trends(cube, col)
+
+        digest = hashlib.sha1(self.fingerprint.encode())
+        digest.update(result_cache.dataset_fingerprint(delta).encode())
+        self.fingerprint = digest.hexdigest()
+
+        pending = len(self.changed) + (len(self.appended) if self.appended is not None else 0)
+        compacted = pending > max(COMPACT_ROWS, len(self.base) * COMPACT_FRACTION)
+        if compacted:
+            self.compact()
+        else:
+            self.version = next(_versions)
+
+        return {
+            'updated': int(updated.sum()),
+            'inserted': int((~updated).sum()),
+            'affected': affected,
+            # The rows this delta wrote, labelled by position.
+            'rows': delta.set_axis(pd.Index(positions)),
+            'compacted': compacted,
+        }
+
+    def apply_file(self, path):
+        return self.apply(data_cache.read_source_csv(path))
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 3:
+        print("Usage: python delta.py DATASET.csv DELTA.csv")
+        sys.exit(2)
+
+    df = data_cache.load_dataset(sys.argv[1])
+    cube = sales_cube.build_cube(df)
+    updater = DeltaUpdater(df, cube)
+
+    start = time.perf_counter()
+    summary = updater.apply_file(sys.argv[2])
+    elapsed = time.perf_counter() - start
+    print(f"Applied {os.path.basename(sys.argv[2])}: {summary['updated']} updated, {summary['inserted']} new rows in {elapsed * 1000:.1f} ms")
+    for col, entities in summary['affected'].items():
+        print(f"    {col}: {len(entities)} affected")
\ No newline at end of file
@@ -0,0 +1,97 @@
+import io
+import os
+import inspect
+import threading
+
+import result_cache
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_CACHE_DIR = os.path.join(SCRIPT_DIR, '.greenlight_cache', 'figures')
+DISK_BUDGET_BYTES = 128 * 1024 * 1024
+# Figure sizes are chosen in inches as screen pixels / 100.
+RENDER_DPI = 100
+
+
+def render_size(module, figsize=None):
+    # The figure size render() draws at: the one asked for, else its default.
+    if figsize is not None:
+        return tuple(figsize)
+    default = inspect.signature(module.render).parameters.get('figsize')
+    if default is None or default.default is inspect.Parameter.empty:
+        return None
+    return tuple(default.default)
+
+
+def figure_key(fingerprint, module, params, figsize=None, dpi=RENDER_DPI):
+    # params are the resolved compute parameters (see result_cache.compute_params).
+    # The figure size in inches (the module's default when figsize is None),
+    # the DPI and the module's source stamp are part of the key too: a figure
+    # drawn for another screen or size, or by an older render(), is not reused.
+    size = render_size(module, figsize)
+    figure_params = dict(params, _figsize=list(size) if size else None, _dpi=dpi, _source=result_cache.source_stamp(module))
+    return result_cache.make_key(fingerprint, f"{module.__name__}.figure", figure_params)
+
+
+def rasterize(module, results, figsize=None, dpi=RENDER_DPI):
+    # PNG bytes of the module's figure. Only call this where pyplot runs on the
+    # Agg backend (the worker processes), never next to the Tk event loop.
+    import matplotlib.pyplot as plt
+
+    fig = module.render(results) if figsize is None else module.render(results, figsize=figsize)
+    buffer = io.BytesIO()
+    try:
+        fig.savefig(buffer, format='png', dpi=dpi)
+    finally:
+        plt.close(fig)
+    return buffer.getvalue()
+
+
+class FigureCache:
+    # Rendered figures as PNG files, one per key, evicted least recently used
+    # first once the folder outgrows the disk budget.
+    def __init__(self, cache_dir=DEFAULT_CACHE_DIR, disk_budget=DISK_BUDGET_BYTES):
+        self.cache_dir = cache_dir
+        self.disk_budget = disk_budget
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def _path(self, key):
+        return os.path.join(self.cache_dir, f"{key}.png")
+
+    def __contains__(self, key):
+        return os.path.exists(self._path(key))
+
+    def get(self, key):
+        path = self._path(key)
+        try:
+            with open(path, 'rb') as f:
+                png = f.read()
+            os.utime(path)
+        except OSError:
+            with self.lock:
+                self.misses += 1
+            return None
+        with self.lock:
+            self.hits += 1
+        return png
+
+    def put(self, key, png):
+        path = self._path(key)
+        os.makedirs(self.cache_dir, exist_ok=True)
+        tmp_path = path + '.tmp'
+        try:
+            with open(tmp_path, 'wb') as f:
+                f.write(png)
+            os.replace(tmp_path, path)
+        except OSError:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            return
+        result_cache.evict_to_budget(self.cache_dir, '.png', self.disk_budget)
+
+    def clear(self):
+        if os.path.isdir(self.cache_dir):
+            for name in os.listdir(self.cache_dir):
+                if name.endswith('.png'):
+                    os.remove(os.path.join(self.cache_dir, name))
\ No newline at end of file
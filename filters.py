@@ -0,0 +1,189 @@
+import time
+from collections import OrderedDict
+
+import tracing
+
+# Filter fields a module can offer, with the cube column each one narrows.
+FIELDS = {
+    'platforms': 'Platform',
+    'genres': 'Genre',
+    'publishers': 'Publisher',
+}
+
+CONTROL_HEIGHT = 0.035
+MAX_CACHED = 32
+
+
+def match_values(text, options):
+    # Comma-separated, case-insensitive terms. A term naming a value exactly
+    # selects just that value ("ps" is PS only); otherwise it selects every
+    # value containing it ("nintendo"). Empty text means everything.
+    terms = [term.strip().lower() for term in text.split(',') if term.strip()]
+    if not terms:
+        return None
+    selected = set()
+    for term in terms:
+        exact = [value for value in options if value.lower() == term]
+        selected.update(exact or [value for value in options if term in value.lower()])
+    return [value for value in options if value in selected]
+
+
+def reserve_bottom(fig, height):
+    # Makes room for the controls under the existing plots, whichever layout
+    # the module used.
+    engine = fig.get_layout_engine()
+    if engine is not None and hasattr(engine, 'set') and 'rect' in engine.get():
+        engine.set(rect=(0, height, 1, 1 - height))
+    else:
+        fig.subplots_adjust(bottom=fig.subplotpars.bottom + height)
+
+
+class BlitManager:
+    # Redraws only the artists a filter changes, over a saved background,
+    # while the axes limits stay put.
+    def __init__(self, canvas, artists):
+        self.canvas = canvas
+        self.artists = list(artists)
+        self.background = None
+        for artist in self.artists:
+            artist.set_animated(True)
+        canvas.mpl_connect('draw_event', self.on_draw)
+
+    def on_draw(self, event):
+        self.background = self.canvas.copy_from_bbox(self.canvas.figure.bbox)
+        self.draw_artists()
+
+    def draw_artists(self):
+        for artist in self.artists:
+            self.canvas.figure.draw_artist(artist)
+
+    def update(self):
+        if self.background is None:
+            self.canvas.draw_idle()
+            return
+        self.canvas.restore_region(self.background)
+        self.draw_artists()
+        self.canvas.blit(self.canvas.figure.bbox)
+        self.canvas.flush_events()
+
+
+class FilterControls:
+    # Year range slider and platform/genre/publisher pickers under a module's
+    # figure. A change recomputes the module from the filtered cube and hands
+    # the results to module.update(), which edits the existing artists.
+    # df and params are what the module was first computed with (the
+    # row-level frame, when loaded, and e.g. its render mode).
+    def __init__(self, fig, module, cube, fields, df=None, params=None):
+        # matplotlib.widgets takes ~300 ms to import; the dashboard imports this
+        # module at start-up but only needs the widgets once a figure opens.
+        from matplotlib.widgets import RangeSlider, TextBox
+
+        self.fig = fig
+        self.module = module
+        self.cube = cube
+        self.df = df
+        self.params = params or {}
+        self.fields = [field for field in fields if field == 'years' or field in FIELDS]
+        self.filters = {}
+        self.results = OrderedDict()
+        self.version = cube.version
+
+        pickers = [field for field in self.fields if field != 'years']
+        rows = 1 + (1 if pickers else 0)
+        reserve_bottom(fig, CONTROL_HEIGHT * (rows + 1) + 0.02)
+
+        self.widgets = []
+        if 'years' in self.fields:
+            years = cube.cells()['Year_of_Release'].dropna()
+            low, high = int(years.min()), int(years.max())
+            slider_ax = fig.add_axes([0.12, 0.02 + CONTROL_HEIGHT * rows, 0.6, CONTROL_HEIGHT * 0.8])
+            self.slider = RangeSlider(slider_ax, "Years", low, high, valinit=(low, high), valstep=1, valfmt='%d')
+            self.slider.on_changed(self.on_years)
+            self.widgets.append(self.slider)
+
+        self.options = {}
+        width = 0.7 / max(len(pickers), 1)
+        for i, field in enumerate(pickers):
+            col = FIELDS[field]
+            self.options[field] = cube.values(col)
+            box_ax = fig.add_axes([0.12 + i * (width + 0.04), 0.02 + CONTROL_HEIGHT * 0.6, width - 0.04, CONTROL_HEIGHT * 0.8])
+            box = TextBox(box_ax, col, initial='')
+            box.on_submit(lambda text, field=field: self.on_pick(field, text))
+            self.widgets.append(box)
+
+        self.status = fig.text(0.99, 0.01, "", ha='right', va='bottom', fontsize=8, color='#555555')
+
+        artists = fig.filter_artists.get('animated', []) if hasattr(fig, 'filter_artists') else []
+        self.blitter = None
+        if artists and fig.canvas.supports_blit:
+            self.blitter = BlitManager(fig.canvas, artists + [self.status])
+
+    def on_years(self, value):
+        low, high = int(value[0]), int(value[1])
+        years = self.cube.cells()['Year_of_Release'].dropna()
+        full = (low, high) == (int(years.min()), int(years.max()))
+        self.set_filter('years', None if full else (low, high))
+
+    def on_pick(self, field, text):
+        values = match_values(text, self.options[field])
+        self.set_filter(field, values)
+
+    def set_filter(self, field, value):
+        if value is None:
+            self.filters.pop(field, None)
+        else:
+            self.filters[field] = value
+        self.refresh()
+
+    def compute(self):
+        # Filter combinations seen before (e.g. dragging the slider back and
+        # forth) reuse their results until a delta update changes the cube's
+        # cells.
+        if self.cube.version != self.version:
+            self.results.clear()
+            self.version = self.cube.version
+        key = tuple(sorted((field, tuple(value)) for field, value in self.filters.items()))
+        if key in self.results:
+            self.results.move_to_end(key)
+            return self.results[key]
+        results = self.module.compute(self.df, cube=self.cube, filters=dict(self.filters) or None, **self.params)
+        self.results[key] = results
+        while len(self.results) > MAX_CACHED:
+            self.results.popitem(last=False)
+        return results
+
+    def refresh(self):
+        start = time.perf_counter()
+        with tracing.span(f"{self.module.__name__}.filter_update", filters=len(self.filters)):
+            results = self.compute()
+            rescaled = self.module.update(self.fig, results)
+            elapsed = time.perf_counter() - start
+            self.status.set_text(self.describe() + f"  |  updated in {elapsed * 1000:.0f} ms")
+            if rescaled or self.blitter is None:
+                self.fig.canvas.draw_idle()
+            else:
+                self.blitter.update()
+
+    def describe(self):
+        parts = []
+        for field, value in self.filters.items():
+            if field == 'years':
+                parts.append(f"{value[0]}-{value[1]}")
+            elif not value:
+                parts.append(f"no matching {field}")
+            elif len(value) <= 3:
+                parts.append(", ".join(value))
+            else:
+                parts.append(f"{len(value)} {field}")
+        return "Filters: " + ("; ".join(parts) if parts else "none")
+
+
+def attach(fig, module, cube, df=None, params=None):
+    # Modules opt in by listing FILTERS and providing update(fig, results).
+    fields = getattr(module, 'FILTERS', None)
+    if not fields or not hasattr(module, 'update'):
+        return None
+    controls = FilterControls(fig, module, cube, fields, df, params)
+    # Widgets only respond while something holds a reference to them.
+    fig.filter_controls = controls
+    return controls
\ No newline at end of file
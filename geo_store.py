@@ -0,0 +1,266 @@
+import os
+import sys
+import json
+import tempfile
+import numpy as np
+import shapely
+
+import sales_cube
+import tracing
+
+BASEMAP_URL = "https://naturalearth.s3.amazonaws.com/110m_cultural/ne_110m_admin_0_countries.zip"
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+STORE_PATH = os.path.join(SCRIPT_DIR, 'geodata', 'world_regions.npz')
+CUSTOM_REGION_SETS_PATH = os.path.join(SCRIPT_DIR, 'geodata', 'region_sets.json')
+
+EXCLUDED_COUNTRIES = ['Antarctica', 'Dem. Rep. Korea', 'North Korea']
+
+# Used to tag Europe when the imported basemap has no CONTINENT column.
+EU_FALLBACK = ['France', 'Germany', 'United Kingdom', 'Italy', 'Spain', 'Poland', 'Sweden',
+               'Norway', 'Finland', 'Greece', 'Ireland', 'Portugal', 'Austria', 'Switzerland',
+               'Belgium', 'Netherlands', 'Denmark', 'Russia', 'Ukraine', 'Belarus', 'Romania']
+
+WRAP_OFFSETS = [-360, 0, 360]
+
+DEFAULT_REGION_SET = 'sales_regions'
+
+# Basemap attributes a region selector can match on.
+SELECT_ATTRIBUTES = ['NAME', 'CONTINENT']
+
+IMPORT_HINT = "Run 'python geo_store.py import <path-to-countries.zip>' once on this host."
+
+# A region set maps a label to the sales column it represents and a selector
+# over the basemap attributes. A selector of None takes every country not
+# claimed by another region in the same set.
+REGION_SETS = {
+    'sales_regions': [
+        {'label': 'North America', 'sales_column': 'NA_Sales', 'select': {'NAME': ['United States of America', 'Canada', 'Mexico']}},
+        {'label': 'Europe', 'sales_column': 'EU_Sales', 'select': {'CONTINENT': ['Europe']}},
+        {'label': 'Japan', 'sales_column': 'JP_Sales', 'select': {'NAME': ['Japan']}},
+        {'label': 'Rest of World', 'sales_column': 'Other_Sales', 'select': None},
+    ],
+}
+
+
+class RegionStore:
+    def __init__(self, names, continents, countries, outlines, region_sets):
+        self.names = names
+        self.continents = continents
+        self.countries = countries
+        self.outlines = outlines
+        self.region_sets = region_sets
+
+    def regions(self, set_name=DEFAULT_REGION_SET):
+        if set_name not in self.region_sets:
+            raise KeyError(f"Unknown region set '{set_name}'. Available: {sorted(self.region_sets)}")
+        return self.region_sets[set_name]
+
+
+def _pack_wkb(geoms):
+    blobs = shapely.to_wkb(np.asarray(geoms, dtype=object))
+    lengths = np.array([len(b) for b in blobs], dtype=np.int64)
+    offsets = np.concatenate([[0], np.cumsum(lengths)])
+    buffer = np.frombuffer(b''.join(blobs), dtype=np.uint8)
+    return buffer, offsets
+
+
+def _unpack_wkb(buffer, offsets):
+    raw = buffer.tobytes()
+    blobs = [raw[offsets[i]:offsets[i + 1]] for i in range(len(offsets) - 1)]
+    return shapely.from_wkb(blobs)
+
+
+def validate_region_set(set_name, regions):
+    # A mistyped attribute or sales column would otherwise only surface as a
+    # KeyError deep inside the dissolve or the heatmap.
+    for region in regions:
+        label = region.get('label')
+        if region.get('sales_column') not in sales_cube.REGION_COLUMNS:
+            raise ValueError(
+                f"Region '{label}' in set '{set_name}' has sales_column {region.get('sales_column')!r}; "
+                f"expected one of {sales_cube.REGION_COLUMNS}"
+            )
+        if 'geometry' in region:
+            continue
+        if 'select' not in region:
+            raise ValueError(f"Region '{label}' in set '{set_name}' has no select; use null for every unclaimed country")
+        select = region['select']
+        if select is None:
+            continue
+        if not isinstance(select, dict):
+            raise ValueError(f"Region '{label}' in set '{set_name}' needs a select mapping or null, got {select!r}")
+        unknown = sorted(set(select) - set(SELECT_ATTRIBUTES))
+        if unknown:
+            raise ValueError(
+                f"Region '{label}' in set '{set_name}' selects on unknown attribute(s) {unknown}; "
+                f"expected any of {SELECT_ATTRIBUTES}"
+            )
+
+
+def load_custom_region_sets(path=CUSTOM_REGION_SETS_PATH):
+    if not os.path.exists(path):
+        return {}
+    with open(path) as f:
+        region_sets = json.load(f)
+    for set_name, regions in region_sets.items():
+        validate_region_set(set_name, regions)
+    return region_sets
+
+
+def _select(names, continents, select):
+    attributes = {'NAME': names, 'CONTINENT': continents}
+    mask = np.zeros(len(names), dtype=bool)
+    for column, values in select.items():
+        mask |= np.isin(attributes[column], values)
+    return mask
+
+
+@tracing.traced('geo_store.dissolve')
+def build_region_geometries(names, continents, countries, regions):
+    claimed = np.zeros(len(names), dtype=bool)
+    masks = []
+    for region in regions:
+        if region['select'] is None:
+            masks.append(None)
+            continue
+        mask = _select(names, continents, region['select'])
+        claimed |= mask
+        masks.append(mask)
+
+    geoms = []
+    for mask in masks:
+        if mask is None:
+            mask = ~claimed
+        geoms.append(shapely.union_all(countries[mask]))
+    return geoms
+
+
+def _region_set_arrays(set_name, regions, geoms):
+    buffer, offsets = _pack_wkb(geoms)
+    return {
+        f'set__{set_name}__labels': np.array([r['label'] for r in regions]),
+        f'set__{set_name}__columns': np.array([r['sales_column'] for r in regions]),
+        f'set__{set_name}__wkb': buffer,
+        f'set__{set_name}__offsets': offsets,
+    }
+
+
+def write_store(names, continents, countries, region_sets, path=STORE_PATH):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+
+    shifted = np.concatenate([shapely.transform(countries, lambda c, o=offset: c + [o, 0]) for offset in WRAP_OFFSETS])
+    country_wkb, country_offsets = _pack_wkb(countries)
+    outline_wkb, outline_offsets = _pack_wkb(shifted)
+
+    arrays = {
+        'names': np.asarray(names, dtype=str),
+        'continents': np.asarray(continents, dtype=str),
+        'country_wkb': country_wkb,
+        'country_offsets': country_offsets,
+        'outline_wkb': outline_wkb,
+        'outline_offsets': outline_offsets,
+    }
+    for set_name, regions in region_sets.items():
+        geoms = build_region_geometries(names, continents, countries, regions)
+        arrays.update(_region_set_arrays(set_name, regions, geoms))
+
+    # Written to a uniquely named file beside the store and renamed over it,
+    # so a reader never sees a partial store and concurrent writers do not
+    # share a temporary file.
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), prefix='.world_regions.', suffix='.npz')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            np.savez_compressed(f, **arrays)
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+
+
+def import_basemap(source=BASEMAP_URL, path=STORE_PATH):
+    import geopandas as gpd
+
+    print(f">>> Importing basemap from {source}...")
+    world = gpd.read_file(source)
+    world = world[~world['NAME'].isin(EXCLUDED_COUNTRIES)]
+
+    names = world['NAME'].astype(str).to_numpy()
+    if 'CONTINENT' in world.columns:
+        continents = world['CONTINENT'].astype(str).to_numpy()
+    else:
+        continents = np.where(np.isin(names, EU_FALLBACK), 'Europe', '')
+    countries = np.asarray(world.geometry.values, dtype=object)
+
+    region_sets = dict(REGION_SETS)
+    region_sets.update(load_custom_region_sets())
+    write_store(names, continents, countries, region_sets, path)
+    print(f"    Saved {len(names)} countries and {len(region_sets)} region set(s) to {path}")
+
+
+@tracing.traced('geo_store.load')
+def load_store(path=STORE_PATH):
+    with np.load(path) as data:
+        arrays = {key: data[key] for key in data.files}
+
+    region_sets = {}
+    for key in arrays:
+        if key.startswith('set__') and key.endswith('__labels'):
+            set_name = key[len('set__'):-len('__labels')]
+            geoms = _unpack_wkb(arrays[f'set__{set_name}__wkb'], arrays[f'set__{set_name}__offsets'])
+            region_sets[set_name] = [
+                {'label': str(label), 'sales_column': str(column), 'geometry': geom}
+                for label, column, geom in zip(arrays[key], arrays[f'set__{set_name}__columns'], geoms)
+            ]
+            # Stores written before sets were validated may hold a bad one.
+            validate_region_set(set_name, region_sets[set_name])
+
+    return RegionStore(
+        names=arrays['names'],
+        continents=arrays['continents'],
+        countries=_unpack_wkb(arrays['country_wkb'], arrays['country_offsets']),
+        outlines=_unpack_wkb(arrays['outline_wkb'], arrays['outline_offsets']),
+        region_sets=region_sets,
+    )
+
+
+def add_region_set(set_name, regions, path=STORE_PATH, custom_path=CUSTOM_REGION_SETS_PATH):
+    # Custom sets are built from the stored countries, so no re-import is needed,
+    # and are recorded so a later re-import keeps them.
+    validate_region_set(set_name, regions)
+    store = load_store(path)
+    custom = load_custom_region_sets(custom_path)
+    custom[set_name] = regions
+    with open(custom_path, 'w') as f:
+        json.dump(custom, f, indent=1)
+
+    region_sets = dict(REGION_SETS)
+    region_sets.update(custom)
+    write_store(store.names, store.continents, store.countries, region_sets, path)
+
+
+def get_store(path=STORE_PATH, allow_download=False):
+    # Only the interactive dashboard downloads the basemap on first use;
+    # batch and service callers get None until it has been imported.
+    if not os.path.exists(path):
+        if not allow_download:
+            return None
+        try:
+            import_basemap(BASEMAP_URL, path)
+        except Exception as e:
+            print(f"Error: Could not import map data ({e}).")
+            print(f"       {IMPORT_HINT}")
+            return None
+    return load_store(path)
+
+
+if __name__ == "__main__":
+    if len(sys.argv) >= 2 and sys.argv[1] == 'import':
+        import_basemap(sys.argv[2] if len(sys.argv) > 2 else BASEMAP_URL)
+    elif len(sys.argv) >= 4 and sys.argv[1] == 'add-set':
+        with open(sys.argv[3]) as f:
+            add_region_set(sys.argv[2], json.load(f))
+        print(f"Added region set '{sys.argv[2]}'")
+    else:
+        print("Usage: python geo_store.py import [path-or-url]")
+        print("       python geo_store.py add-set <name> <regions.json>")
\ No newline at end of file
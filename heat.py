@@ -2,71 +2,183 @@ import matplotlib.pyplot as plt
 import seaborn as sns
 import pandas as pd
 import sys
+import os
 import numpy as np
 import tkinter as tk
 import geopandas as gpd
-from shapely.geometry import Point
+import shapely
 
-def run_analysis(df):
-    print(">>> Generating World Map (Split Screen View)...")
-    print("    (Generating dots for the entire world, please wait...)")
-    
-    df = df.dropna(subset=['Genre']).copy()
-    
-    all_genres = sorted(df['Genre'].unique().tolist())
-    
-    cmap = plt.get_cmap('tab20', len(all_genres))
-    genre_colors = {genre: cmap(i) for i, genre in enumerate(all_genres)}
+import geo_store
+import sales_cube
+import tracing
 
-    url = "https://naturalearth.s3.amazonaws.com/110m_cultural/ne_110m_admin_0_countries.zip"
-    try:
-        world = gpd.read_file(url)
-    except:
-        print("Error: Could not download map data. Check internet connection.")
-        return
+SALES_PER_DOT = 15
+DOT_SEED = 42
+MAX_ATTEMPTS_PER_DOT = 20
 
-    excluded_countries = ['Antarctica', 'Dem. Rep. Korea', 'North Korea']
-    world = world[~world['NAME'].isin(excluded_countries)]
+# 'dots' draws every sampled dot as a marker; 'density' shades one raster
+# image with the dots each map cell would get on average, computed from the
+# region totals without sampling any, so neither compute nor render time
+# depends on the dot size.
+RENDER_MODES = ['dots', 'density']
+RENDER_MODE = 'dots'
+DENSITY_SALES_PER_DOT = 1
+# Half-degree cells over the whole map, (rows, columns), blurred over a few
+# cells so region borders read as a continuous density.
+RASTER_SHAPE = (360, 720)
+SMOOTH_CELLS = 3
+# All genres together are shaded with this colormap; a single genre with its
+# own table colour.
+DENSITY_CMAP = 'YlOrRd'
 
-    na_countries = ['United States of America', 'Canada', 'Mexico']
-    na_geo = world[world['NAME'].isin(na_countries)].dissolve()
-    
-    if 'CONTINENT' in world.columns:
-        eu_geo = world[world['CONTINENT'] == 'Europe'].dissolve()
+def generate_random_points(geom, num_points, rng=None):
+    # Rejection sampling in NumPy blocks, tested against the prepared geometry
+    # in one vectorized call per block instead of one Point at a time.
+    if geom.is_empty or num_points <= 0:
+        return np.empty((0, 2))
+    rng = rng if rng is not None else np.random.default_rng()
+
+    shapely.prepare(geom)
+    minx, miny, maxx, maxy = geom.bounds
+    box_area = (maxx - minx) * (maxy - miny)
+    hit_rate = geom.area / box_area if box_area > 0 else 1.0
+    hit_rate = min(max(hit_rate, 1.0 / MAX_ATTEMPTS_PER_DOT), 1.0)
+
+    max_attempts = num_points * MAX_ATTEMPTS_PER_DOT
+    blocks = []
+    found = 0
+    attempts = 0
+    while found < num_points and attempts < max_attempts:
+        block_size = min(int((num_points - found) / hit_rate * 1.1) + 16, max_attempts - attempts)
+        xs = rng.uniform(minx, maxx, block_size)
+        ys = rng.uniform(miny, maxy, block_size)
+        inside = shapely.contains_xy(geom, xs, ys)
+        blocks.append(np.column_stack([xs[inside], ys[inside]]))
+        found += int(inside.sum())
+        attempts += block_size
+
+    return np.concatenate(blocks)[:num_points]
+
+def region_cells(geom, shape=RASTER_SHAPE):
+    # Each map cell's share of the region: uniform over the cells whose centres
+    # fall inside it, as uniformly sampled dots would be on average. A region
+    # smaller than a cell gets the cell holding its representative point.
+    share = np.zeros(shape, dtype=np.float32)
+    if geom.is_empty:
+        return share
+    rows, cols = shape
+    lat = (np.arange(rows) + 0.5) * 180 / rows - 90
+    lon = (np.arange(cols) + 0.5) * 360 / cols - 180
+    shapely.prepare(geom)
+    inside = shapely.contains_xy(geom, *np.meshgrid(lon, lat)).reshape(shape)
+    if not inside.any():
+        point = shapely.point_on_surface(geom)
+        row = min(int((point.y + 90) * rows / 180), rows - 1)
+        col = int(((point.x + 180) % 360) * cols / 360) % cols
+        inside[row, col] = True
+    share[inside] = 1 / inside.sum()
+    return share
+
+def smooth_raster(raster, radius=SMOOTH_CELLS):
+    # Two passes of a separable box filter (close to a Gaussian). Columns wrap
+    # around the antimeridian; rows are padded with zeros at the poles.
+    for _ in range(2):
+        raster = sum(np.roll(raster, shift, axis=1) for shift in range(-radius, radius + 1))
+        padded = np.pad(raster, ((radius, radius), (0, 0)))
+        raster = sum(padded[shift:shift + raster.shape[0]] for shift in range(2 * radius + 1))
+    return (raster / (2 * radius + 1) ** 4).astype(np.float32)
+
+def density_image(raster, color=None):
+    # RGBA image of a density raster. Levels are log-scaled against the 99th
+    # percentile of occupied cells, so one very dense region (Japan) does not
+    # wash out the rest; empty cells are fully transparent.
+    occupied = raster[raster > 0]
+    peak = np.percentile(occupied, 99) if len(occupied) else 1.0
+    level = np.clip(np.log1p(raster) / np.log1p(peak), 0, 1)
+    if color is None:
+        image = plt.get_cmap(DENSITY_CMAP)(level)
     else:
-        eu_list = ['France', 'Germany', 'United Kingdom', 'Italy', 'Spain', 'Poland', 'Sweden', 
-                   'Norway', 'Finland', 'Greece', 'Ireland', 'Portugal', 'Austria', 'Switzerland', 
-                   'Belgium', 'Netherlands', 'Denmark', 'Russia', 'Ukraine', 'Belarus', 'Romania']
-        eu_geo = world[world['NAME'].isin(eu_list)].dissolve()
+        image = np.empty(raster.shape + (4,))
+        image[..., :3] = color[:3]
+    image[..., 3] = 0.9 * np.sqrt(level)
+    return image.astype(np.float32)
 
-    jp_geo = world[world['NAME'] == 'Japan'].dissolve()
+# Why compute() returns None; report.py prints it for skipped jobs.
+SKIP_REASON = f"no map data at {geo_store.STORE_PATH}. {geo_store.IMPORT_HINT}"
+
+def cache_token():
+    if not os.path.exists(geo_store.STORE_PATH):
+        return None
+    return os.stat(geo_store.STORE_PATH).st_mtime_ns
+
+@tracing.traced('heat.compute')
+def compute(df, cube=None, region_set=geo_store.DEFAULT_REGION_SET, sales_per_dot=None, seed=DOT_SEED, mode=RENDER_MODE, allow_download=False):
+    if mode not in RENDER_MODES:
+        raise ValueError(f"Unknown heatmap mode '{mode}'; expected one of {RENDER_MODES}")
+    if sales_per_dot is None:
+        sales_per_dot = DENSITY_SALES_PER_DOT if mode == 'density' else SALES_PER_DOT
+    cube = cube if cube is not None else sales_cube.build_cube(df)
+    with tracing.span('heat.genre_region_sales'):
+        genre_sales = cube.genre_region_sales()
     
-    rest_of_world = world[
-        (~world['NAME'].isin(na_countries)) & 
-        (world['NAME'] != 'Japan') & 
-        (world['CONTINENT'] != 'Europe' if 'CONTINENT' in world.columns else ~world['NAME'].isin(eu_list))
-    ]
-    other_geo = rest_of_world.dissolve()
-
-    def generate_random_points(poly, num_points):
-        points = []
-        if poly.empty or num_points <= 0:
-            return []
-        minx, miny, maxx, maxy = poly.total_bounds
-        geom = poly.geometry.iloc[0]
-        attempts = 0
-        while len(points) < num_points and attempts < num_points * 20:
-            pnt = Point(np.random.uniform(minx, maxx), np.random.uniform(miny, maxy))
-            if geom.contains(pnt):
-                points.append([pnt.x, pnt.y])
-            attempts += 1
-        return np.array(points)
+    all_genres = sorted(genre_sales.index.tolist())
+
+    store = geo_store.get_store(allow_download=allow_download)
+    if store is None:
+        return None
+    regions = store.regions(region_set)
+
+    rng = np.random.default_rng(seed)
+    genre_dots = {}
+    genre_density = {}
+    table_data = []
+    if mode == 'density':
+        with tracing.span('heat.region_cells'):
+            shares = [region_cells(region['geometry']) for region in regions]
+
+    for genre in all_genres:
+        sales_summary = {region['label']: genre_sales.at[genre, region['sales_column']] for region in regions}
+
+        if mode == 'density':
+            # Expected dots per cell: each region's dot count spread over its
+            # cells. Only the raster is kept, whatever the dot size.
+            with tracing.span('heat.density_raster', genre=genre):
+                raster = sum(share * (sales_summary[region['label']] / sales_per_dot) for region, share in zip(regions, shares))
+                genre_density[genre] = smooth_raster(raster)
+        else:
+            with tracing.span('heat.sample_dots', genre=genre):
+                genre_dots[genre] = np.concatenate([
+                    generate_random_points(region['geometry'], int(sales_summary[region['label']] / sales_per_dot), rng)
+                    for region in regions
+                ])
+
+        top_region = max(sales_summary, key=sales_summary.get)
+        table_data.append([genre, top_region])
+
+    return {
+        'genres': all_genres,
+        'genre_dots': genre_dots,
+        'genre_density': genre_density,
+        'table_data': table_data,
+        'outlines': store.outlines,
+        'sales_per_dot': sales_per_dot,
+        'mode': mode,
+    }
 
+@tracing.traced('heat.render')
+def render(results, figsize=(14, 10), genre=None):
+    # In density mode, genre shows that genre's raster alone instead of the
+    # combined density of every genre.
+    all_genres = results['genres']
+    density = results.get('mode') == 'density'
     
+    cmap = plt.get_cmap('tab20', len(all_genres))
+    genre_colors = {genre: cmap(i) for i, genre in enumerate(all_genres)}
+
     fig, (ax_map, ax_table) = plt.subplots(
         nrows=2, 
         ncols=1, 
-        figsize=(14, 10),
+        figsize=figsize,
         gridspec_kw={'height_ratios': [1.5, 1]} 
     )
     
@@ -84,58 +196,50 @@ def run_analysis(df):
         except:
             pass
 
-    offsets = [-360, 0, 360]
-    for offset in offsets:
-        shifted_world = world.copy()
-        shifted_world['geometry'] = shifted_world.translate(xoff=offset)
-        shifted_world.plot(ax=ax_map, color='#f0f0f0', edgecolor='#d0d0d0')
+    offsets = geo_store.WRAP_OFFSETS
+    with tracing.span('heat.render.basemap'):
+        gpd.GeoSeries(results['outlines']).plot(ax=ax_map, color='#f0f0f0', edgecolor='#d0d0d0')
 
-    SALES_PER_DOT = 15
-    table_data = []
     cell_colors = []
 
-    for genre in all_genres:
-        genre_data = df[df['Genre'] == genre]
-        
-        n_na = int(genre_data['NA_Sales'].sum() / SALES_PER_DOT)
-        n_eu = int(genre_data['EU_Sales'].sum() / SALES_PER_DOT)
-        n_jp = int(genre_data['JP_Sales'].sum() / SALES_PER_DOT)
-        n_other = int(genre_data['Other_Sales'].sum() / SALES_PER_DOT)
-        
-        dots_na = generate_random_points(na_geo, n_na)
-        dots_eu = generate_random_points(eu_geo, n_eu)
-        dots_jp = generate_random_points(jp_geo, n_jp)
-        dots_other = generate_random_points(other_geo, n_other)
-        
-        all_dots_list = [dots_na, dots_eu, dots_jp, dots_other]
-        
-        for offset in offsets:
-            def plot_dots(dots_array):
-                if len(dots_array) > 0:
-                    shifted = dots_array.copy()
-                    shifted[:, 0] += offset
-                    ax_map.scatter(
-                        shifted[:, 0], shifted[:, 1], 
-                        s=15, 
-                        c=[genre_colors[genre]], 
-                        alpha=0.7, 
-                        edgecolors='none'
-                    )
-            for dots in all_dots_list:
-                plot_dots(dots)
-
-        sales_summary = {
-            'North America': genre_data['NA_Sales'].sum(),
-            'Europe': genre_data['EU_Sales'].sum(),
-            'Japan': genre_data['JP_Sales'].sum(),
-            'Rest of World': genre_data['Other_Sales'].sum()
-        }
-        top_region = max(sales_summary, key=sales_summary.get)
-        
-        table_data.append([genre, top_region])
-        cell_colors.append([genre_colors[genre], 'white'])
+    if density:
+        if genre is None:
+            image = density_image(sum(results['genre_density'].values()))
+        else:
+            image = density_image(results['genre_density'][genre], genre_colors[genre])
+        # The wrap-around is one image tiled once per offset, matching the
+        # shifted copies the dot mode draws.
+        with tracing.span('heat.render.density'):
+            ax_map.imshow(
+                np.tile(image, (1, len(offsets), 1)),
+                extent=(-180 + min(offsets), 180 + max(offsets), -90, 90),
+                origin='lower',
+                interpolation='bilinear',
+                zorder=2,
+            )
 
-    ax_map.set_title(f"Global Sales Distribution (1 Dot ≈ {SALES_PER_DOT}M Sales)", fontsize=16)
+    for name, top_region in results['table_data']:
+        cell_colors.append([genre_colors[name], 'white'])
+        if density:
+            continue
+        dots = results['genre_dots'][name]
+
+        if len(dots) > 0:
+            wrapped = np.concatenate([dots + [offset, 0] for offset in offsets])
+            with tracing.span('heat.render.dots', genre=name):
+                ax_map.scatter(
+                    wrapped[:, 0], wrapped[:, 1], 
+                    s=15, 
+                    c=[genre_colors[name]], 
+                    alpha=0.7, 
+                    edgecolors='none'
+                )
+
+    if density:
+        subject = genre if genre is not None else "All Genres Blended"
+        ax_map.set_title(f"Global Sales Density: {subject} (1 Dot ≈ {results['sales_per_dot']}M Sales)", fontsize=16)
+    else:
+        ax_map.set_title(f"Global Sales Distribution (1 Dot ≈ {results['sales_per_dot']}M Sales)", fontsize=16)
     ax_map.set_aspect('equal')
     ax_map.set_xlim([-180, 180])
     ax_map.set_ylim([-90, 90])
@@ -144,7 +248,7 @@ def run_analysis(df):
     ax_table.axis('off')
     
     the_table = ax_table.table(
-        cellText=table_data,
+        cellText=results['table_data'],
         cellColours=cell_colors,
         colLabels=["Genre", "Most Popular Region"],
         loc='center',
@@ -155,7 +259,19 @@ def run_analysis(df):
     the_table.set_fontsize(10)
     the_table.scale(1, 1.5)
 
-    plt.tight_layout()
+    with tracing.span('heat.render.layout'):
+        plt.tight_layout()
+    return fig
+
+def run_analysis(df, cube=None, region_set=geo_store.DEFAULT_REGION_SET, sales_per_dot=None, seed=DOT_SEED, mode=RENDER_MODE):
+    print(">>> Generating World Map (Split Screen View)...")
+    print("    (Generating dots for the entire world, please wait...)")
+
+    results = compute(df, cube=cube, region_set=region_set, sales_per_dot=sales_per_dot, seed=seed, mode=mode)
+    if results is None:
+        return
+
+    render(results)
     print("   Insight: Top half shows Map, Bottom half shows detailed Table.")
     print("   (Close window to continue.)")
     plt.show()
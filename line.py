@@ -5,32 +5,144 @@ import numpy as np
 import tkinter as tk
 import math
 
-def run_analysis_wrapper(df, root=None):
-    run_analysis(df, root)
+import sales_cube
+import tracing
 
-def run_analysis(df, existing_root=None):
-    print(">>> Generating Sales Timeline (Split into 4 Chronological Eras)...")
-    
-    df_clean = df.dropna(subset=['Year_of_Release', 'Global_Sales']).copy()
-    df_clean['Year_of_Release'] = df_clean['Year_of_Release'].astype(int)
-    
-    platform_start_years = df_clean.groupby('Platform')['Year_of_Release'].min().sort_values()
-    all_platforms_sorted = platform_start_years.index.tolist()
-    
-    platform_groups = np.array_split(all_platforms_sorted, 4)
-    
-    if existing_root:
-        screen_w = existing_root.winfo_screenwidth()
-        screen_h = existing_root.winfo_screenheight()
-    else:
-        root = tk.Tk()
-        root.withdraw()
-        screen_w = root.winfo_screenwidth()
-        screen_h = root.winfo_screenheight()
-        root.destroy()
+def run_analysis_wrapper(df, root=None, cube=None):
+    run_analysis(df, root, cube=cube)
+
+FILTERS = ['years', 'genres', 'publishers']
+ERAS = 4
+# Platforms listed in the lifecycle metrics table, best-selling first.
+TABLE_ROWS = 12
+METRIC_COLUMNS = [
+    'Platform', 'Launch_Year', 'Last_Year', 'Peak_Year', 'Peak_Sales', 'Years_To_Peak',
+    'Decline_Half_Life', 'Total_Sales', 'Sales_Share', 'Cumulative_Share',
+]
+METRIC_HEADINGS = ['Platform', 'Launch', 'Peak', 'Peak\n(M)', 'To\npeak', 'Half-\nlife', 'Share', 'Cum.\nshare']
+
+def lifecycle_matrix(platform_year_sales):
+    # Dense Platform x Year sales with one row per platform in launch order
+    # (ties as a sort of the launch years would leave them) and one column
+    # per year from the first to the last. present marks the years a
+    # platform had any release, since a year can sum to zero sales.
+    codes, platforms = pd.factorize(platform_year_sales['Platform'], sort=True)
+    year_values = platform_year_sales['Year_of_Release'].to_numpy()
+    first_year = year_values.min() if len(year_values) else 0
+    years = np.arange(first_year, year_values.max() + 1 if len(year_values) else 0)
+
+    matrix = np.zeros((len(platforms), len(years)))
+    present = np.zeros((len(platforms), len(years)), dtype=bool)
+    matrix[codes, year_values - first_year] = platform_year_sales['Global_Sales'].to_numpy()
+    present[codes, year_values - first_year] = True
+
+    order = np.argsort(present.argmax(axis=1)) if len(years) else np.arange(0)
+    return np.asarray(platforms)[order], years, matrix[order], present[order]
+
+def lifecycle_metrics(platforms, years, matrix, present):
+    # Every platform at once, from its row of the matrix:
+    #   Peak_Year / Peak_Sales: its best year (the first, on ties).
+    #   Decline_Half_Life: years from the peak until yearly sales first fall
+    #     to half the peak, interpolated between the two years around the
+    #     crossing; NaN while it still sells above half.
+    #   Sales_Share: its share of all platforms' sales; Cumulative_Share adds
+    #     the shares of every platform that sold more.
+    n = len(platforms)
+    if n == 0:
+        return pd.DataFrame(columns=METRIC_COLUMNS)
+    rows = np.arange(n)
+    launch = present.argmax(axis=1)
+    last = present.shape[1] - 1 - present[:, ::-1].argmax(axis=1)
+    peak = matrix.argmax(axis=1)
+    peak_sales = matrix[rows, peak]
+
+    half = peak_sales / 2
+    below = (np.arange(len(years)) > peak[:, None]) & (matrix <= half[:, None])
+    cross = below.argmax(axis=1)
+    before = matrix[rows, np.maximum(cross - 1, 0)]
+    after = matrix[rows, cross]
+    with np.errstate(divide='ignore', invalid='ignore'):
+        fraction = (before - half) / (before - after)
+    half_life = np.where(below.any(axis=1) & (peak_sales > 0), cross - 1 - peak + fraction, np.nan)
+
+    total = matrix.sum(axis=1)
+    share = total / total.sum() if total.sum() > 0 else np.zeros(n)
+    ranked = np.argsort(-total, kind='stable')
+    cumulative = np.empty(n)
+    cumulative[ranked] = np.cumsum(share[ranked])
+
+    return pd.DataFrame({
+        'Platform': platforms,
+        'Launch_Year': years[launch],
+        'Last_Year': years[last],
+        'Peak_Year': years[peak],
+        'Peak_Sales': peak_sales,
+        'Years_To_Peak': peak - launch,
+        'Decline_Half_Life': half_life,
+        'Total_Sales': total,
+        'Sales_Share': share,
+        'Cumulative_Share': cumulative,
+    }, columns=METRIC_COLUMNS)
+
+@tracing.traced('line.compute')
+def compute(df, cube=None, filters=None):
+    cube = cube if cube is not None else sales_cube.build_cube(df)
+    if filters:
+        cube = cube.filtered(**filters)
+    with tracing.span('line.platform_year_sales'):
+        platform_year_sales = cube.platform_year_sales()
+
+    with tracing.span('line.lifecycle_matrix'):
+        platforms, years, matrix, present = lifecycle_matrix(platform_year_sales)
+    with tracing.span('line.lifecycle_metrics'):
+        metrics = lifecycle_metrics(platforms, years, matrix, present)
+
+    # Eras split the platforms in launch order, so each is a block of rows.
+    eras = [(int(rows[0]), int(rows[-1]) + 1) if len(rows) else (0, 0) for rows in np.array_split(np.arange(len(platforms)), ERAS)]
+
+    return {
+        'platform_year_sales': platform_year_sales,
+        'platforms': platforms,
+        'years': years,
+        'sales_matrix': matrix,
+        'present': present,
+        'eras': eras,
+        'platform_groups': [platforms[start:stop].tolist() for start, stop in eras],
+        'metrics': metrics,
+        'platform_count': len(platforms),
+    }
+
+def era_timeline(results, era):
+    # Long-form rows of one era's block of the matrix, for seaborn.
+    start, stop = results['eras'][era]
+    rows, cols = np.nonzero(results['present'][start:stop])
+    return pd.DataFrame({
+        'Platform': results['platforms'][start:stop][rows],
+        'Year_of_Release': results['years'][cols],
+        'Global_Sales': results['sales_matrix'][start:stop][rows, cols],
+    })
+
+def metric_rows(metrics, count=TABLE_ROWS):
+    # Table text for the best-selling platforms, padded to a fixed number of
+    # rows so filter updates can rewrite the cells in place.
+    def value(number, fmt):
+        return '-' if pd.isna(number) else format(number, fmt)
+
+    top = metrics.sort_values('Total_Sales', ascending=False, kind='stable').head(count)
+    rows = [
+        [row.Platform, str(row.Launch_Year), str(row.Peak_Year), value(row.Peak_Sales, '.1f'), str(row.Years_To_Peak),
+         value(row.Decline_Half_Life, '.1f'), value(row.Sales_Share, '.1%'), value(row.Cumulative_Share, '.0%')]
+        for row in top.itertuples(index=False)
+    ]
+    return rows + [[''] * len(METRIC_HEADINGS)] * (count - len(rows))
+
+@tracing.traced('line.render')
+def render(results, figsize=(19.2, 10.8)):
+    platform_groups = results['platform_groups']
     
-    fig, axes = plt.subplots(2, 2, figsize=(screen_w/100, screen_h/100), constrained_layout=True)
-    axes_flat = axes.flatten() 
+    fig = plt.figure(figsize=figsize, constrained_layout=True)
+    grid = fig.add_gridspec(2, 3, width_ratios=[1, 1, 0.7])
+    axes_flat = [fig.add_subplot(grid[row, col]) for row in range(2) for col in range(2)]
     
     manager = plt.get_current_fig_manager()
     if hasattr(manager, 'window'):
@@ -47,28 +159,31 @@ def run_analysis(df, existing_root=None):
             pass
 
     titles = ["Era 1: The Classics", "Era 2: The Transition", "Era 3: Modern Gaming", "Era 4: Next Gen"]
+    # One Line2D per platform, so filter updates can move the lines in place.
+    platform_lines = []
     
     for i, platforms_in_group in enumerate(platform_groups):
         ax = axes_flat[i]
         
-        group_data = df_clean[df_clean['Platform'].isin(platforms_in_group)]
-        
-        timeline_data = group_data.groupby(['Platform', 'Year_of_Release'])['Global_Sales'].sum().reset_index()
+        timeline_data = era_timeline(results, i)
         
         if not timeline_data.empty:
             g_min_year = timeline_data['Year_of_Release'].min()
             g_max_year = timeline_data['Year_of_Release'].max()
+            hue_order = sorted(timeline_data['Platform'].unique())
             
-            sns.lineplot(
-                data=timeline_data, 
-                x='Year_of_Release', 
-                y='Global_Sales', 
-                hue='Platform', 
-                marker='o', 
-                linewidth=2,
-                palette='tab10', 
-                ax=ax
-            )
+            with tracing.span('line.render.lineplot', era=i + 1):
+                sns.lineplot(
+                    data=timeline_data, 
+                    x='Year_of_Release', 
+                    y='Global_Sales', 
+                    hue='Platform', 
+                    hue_order=hue_order,
+                    marker='o', 
+                    linewidth=2,
+                    palette='tab10', 
+                    ax=ax
+                )
             
             ax.set_title(f"{titles[i]} ({g_min_year} - {g_max_year})", fontsize=14, fontweight='bold')
             ax.set_xlabel('Year', fontsize=10)
@@ -79,8 +194,91 @@ def run_analysis(df, existing_root=None):
             ax.tick_params(axis='x', rotation=45)
             
             ax.legend(title='Platform', loc='upper right', fontsize=8)
+            platform_lines.append((ax, dict(zip(hue_order, ax.lines))))
+
+    table_ax = fig.add_subplot(grid[:, 2])
+    table_ax.axis('off')
+    table_ax.set_title(f"Lifecycle Metrics (Top {TABLE_ROWS} by Sales)", fontsize=14, fontweight='bold')
+    with tracing.span('line.render.metrics_table'):
+        table = table_ax.table(
+            cellText=metric_rows(results['metrics']),
+            colLabels=METRIC_HEADINGS,
+            loc='upper center',
+            cellLoc='center',
+            bbox=[0, 0.25, 1, 0.75],
+        )
+        table.auto_set_font_size(False)
+        table.set_fontsize(9)
+        for (row, col), cell in table.get_celld().items():
+            if row == 0:
+                cell.set_text_props(fontweight='bold')
+                cell.set_facecolor('#ecf0f1')
+    table_ax.text(
+        0, 0.2,
+        "Peak (M): best year's sales in millions. To peak: years from launch to that year.\n"
+        "Half-life: years after the peak until yearly sales fell to half of it.\n"
+        "Share: share of all platforms' sales; Cum. share: with every platform that sold more.",
+        transform=table_ax.transAxes, fontsize=8, va='top', color='#555555',
+    )
+
+    fig.suptitle(f'Console Lifecycles: Chronological Progression ({results["platform_count"]} Platforms)', fontsize=18)
+    fig.filter_artists = {
+        'lines': platform_lines,
+        'table': table,
+        'animated': [line for _, lines in platform_lines for line in lines.values()] + [table],
+    }
+    return fig
 
-    fig.suptitle(f'Console Lifecycles: Chronological Progression ({len(all_platforms_sorted)} Platforms)', fontsize=18)
+@tracing.traced('line.update')
+def update(fig, results):
+    # Moves each platform's existing line to its filtered yearly sales. The
+    # eras stay as first drawn; a platform the filter empties is hidden.
+    # Returns True when a y axis had to rescale and the figure needs a full
+    # redraw rather than a blit of the lines.
+    years = results['years']
+    matrix = results['sales_matrix']
+    present = results['present']
+    row_of = {platform: row for row, platform in enumerate(results['platforms'])}
+    rescaled = False
+    for ax, lines in fig.filter_artists['lines']:
+        top = 0.0
+        for platform, line in lines.items():
+            row = row_of.get(platform)
+            if row is None:
+                line.set_data([], [])
+                continue
+            mask = present[row]
+            line.set_data(years[mask], matrix[row, mask])
+            top = max(top, matrix[row, mask].max())
+        high = ax.get_ylim()[1]
+        # Rescale when the lines outgrow the axis or shrink to a sliver of it.
+        if top > high or top < high * 0.5:
+            top = top if top > 0 else 1
+            ax.set_ylim(-0.05 * top, 1.05 * top)
+            rescaled = True
+
+    table = fig.filter_artists['table']
+    for row, texts in enumerate(metric_rows(results['metrics']), start=1):
+        for col, text in enumerate(texts):
+            table[row, col].get_text().set_text(text)
+    return rescaled
+
+def run_analysis(df, existing_root=None, cube=None):
+    print(">>> Generating Sales Timeline (Split into 4 Chronological Eras)...")
+    
+    results = compute(df, cube=cube)
+    
+    if existing_root:
+        screen_w = existing_root.winfo_screenwidth()
+        screen_h = existing_root.winfo_screenheight()
+    else:
+        root = tk.Tk()
+        root.withdraw()
+        screen_w = root.winfo_screenwidth()
+        screen_h = root.winfo_screenheight()
+        root.destroy()
+    
+    render(results, figsize=(screen_w/100, screen_h/100))
     
     print("   Insight: Splitting into 4 graphs prevents clutter and shows the rise/fall of each generation clearly.")
     print("   (Close the graph window to continue)")
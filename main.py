@@ -1,23 +1,92 @@
+import time
+_PROCESS_START = time.perf_counter()
+
 import tkinter as tk
 from tkinter import messagebox
-import pandas as pd
+from tkinter import filedialog
+from tkinter import ttk
+import importlib
+import threading
+import argparse
 import os
 import sys
+import queue
+import base64
+
+import data_cache
+import sales_cube
+import workers
+import result_cache
+import figure_cache
+import delta
+import filters
+import sql_store
+import title_search
+import tracing
+
+# Analysis modules (and their matplotlib/seaborn/geopandas dependencies) are
+# imported on first use so the window appears quickly.
+MODULES = [
+    ("REGIONAL ANALYST", "heat", "#3498db", "Global Heatmap Distribution"),
+    ("RISK MANAGER", "scatter", "#e67e22", "Critic Score vs. Sales ROI"),
+    ("LIFECYCLE ANALYST", "line", "#27ae60", "Console Lifespan Trends"),
+    ("CORPORATE STRATEGIST", "bar", "#9b59b6", "Publisher Performance Metrics"),
+    ("FUTURE AI PREDICTOR", "ml_predict", "#34495e", "ML-Based Future Trend Forecast")
+]
+
+# Modules whose figures are sized to fill the screen.
+FULLSCREEN_MODULES = ['line', 'ml_predict']
+
+POLL_MS = 100
 
-import heat
-import scatter
-import line
-import bar
-import ml_predict  
+# The loading stage each control waits for: 'rows' once the row-level frame
+# is parsed, 'cube' once the aggregates and worker pool are ready too.
+CONTROL_REQUIREMENTS = dict(
+    [(module_name, 'cube') for _, module_name, _, _ in MODULES],
+    search='rows',
+    delta='cube',
+)
 
 class GreenlightDashboard:
-    def __init__(self, root):
+    def __init__(self, root, prewarm=True, worker_mode='process', stream=False, sqlite=False, module_params=None):
         self.root = root
+        # Per-module compute() arguments chosen on the command line.
+        self.module_params = module_params or {}
+        self.prewarm = prewarm
+        self.worker_mode = worker_mode
+        # Where the data comes from: rows in memory, chunks streamed into the
+        # cube, or the SQLite store.
+        self.source = 'sqlite' if sqlite else 'stream' if stream else 'memory'
+        self.startup_timings = {}
+        self.cards = {}
+        self.jobs = {}
+        # Background renders for the figure cache, by figure key.
+        self.render_jobs = {}
+        # Figure size of every module opened this session, so a sales update
+        # can redraw their cached figures before they are reopened.
+        self.opened_figures = {}
+        self.runner = None
+        self.updater = None
+        self.title_index = None
+        # The frame a title index is being built for, None once it is ready.
+        self.title_source = None
+        self.fingerprint = None
+        # Loading runs on a background thread that reports through load_events;
+        # controls are enabled as the stages they need are reached.
+        self.load_events = queue.Queue()
+        self.load_started = None
+        self.ready = set()
+        self.controls = {}
+        # Called on the Tk thread once loading has finished or failed.
+        self.when_loaded = []
+        self.result_cache = result_cache.ResultCache()
+        self.figure_cache = figure_cache.FigureCache()
         self.root.title("Project AI ANALYSIS | Executive Dashboard")
         self.root.geometry("900x700") 
         self.root.configure(bg="#f0f2f5") 
 
-        self.df = self.load_data()
+        self.df = None
+        self.cube = None
 
         header_frame = tk.Frame(root, bg="#2c3e50", height=80)
         header_frame.pack(fill=tk.X, side=tk.TOP)
@@ -43,37 +112,70 @@ class GreenlightDashboard:
         content_frame = tk.Frame(root, bg="#f0f2f5")
         content_frame.pack(expand=True, fill=tk.BOTH, padx=40, pady=20)
 
-        if self.df is None:
-            err_label = tk.Label(content_frame, text="CRITICAL ERROR: Dataset not found.", fg="#c0392b", bg="#f0f2f5", font=("Segoe UI", 12, "bold"))
-            err_label.pack(pady=20)
-            return
-
-        status_label = tk.Label(content_frame, text="✓ DATASET LOADED SUCCESSFULLY", fg="#27ae60", bg="#f0f2f5", font=("Segoe UI", 10, "bold"))
-        status_label.pack(pady=(0, 10))
+        status_frame = tk.Frame(content_frame, bg="#f0f2f5")
+        status_frame.pack(pady=(0, 10))
+        self.status_label = tk.Label(status_frame, text="LOADING DATASET...", fg="#7f8c8d", bg="#f0f2f5", font=("Segoe UI", 10, "bold"), wraplength=600, justify=tk.LEFT)
+        self.status_label.pack(side=tk.LEFT)
+        self.load_bar = ttk.Progressbar(status_frame, mode='determinate', length=200, maximum=100)
+        self.retry_btn = tk.Button(
+            status_frame,
+            text="RETRY",
+            command=self.start_loading,
+            font=("Segoe UI", 9, "bold"),
+            bg="#c0392b",
+            fg="white",
+            relief="flat",
+            padx=10,
+            cursor="hand2"
+        )
 
         grid_frame = tk.Frame(content_frame, bg="#f0f2f5")
         grid_frame.pack()
 
-        modules = [
-            ("REGIONAL ANALYST", lambda: self.run_module(heat.run_analysis), "#3498db", "Global Heatmap Distribution"),
-            ("RISK MANAGER", lambda: self.run_module(scatter.run_analysis), "#e67e22", "Critic Score vs. Sales ROI"),
-            ("LIFECYCLE ANALYST", lambda: self.run_module(line.run_analysis_wrapper), "#27ae60", "Console Lifespan Trends"),
-            ("CORPORATE STRATEGIST", lambda: self.run_module(bar.run_analysis), "#9b59b6", "Publisher Performance Metrics"),
-            ("FUTURE AI PREDICTOR", lambda: self.run_module(ml_predict.run_analysis), "#34495e", "ML-Based Future Trend Forecast") # <--- NEW BUTTON
-        ]
-
-        for i, (text, cmd, color, desc) in enumerate(modules):
+        for i, (text, module_name, color, desc) in enumerate(MODULES):
+            cmd = lambda m=module_name: self.run_module(m)
             row = i // 2
             col = i % 2
             
             if i == 4:
-                self.create_dashboard_card(grid_frame, text, cmd, color, desc, row, 0, colspan=2)
+                self.create_dashboard_card(grid_frame, module_name, text, cmd, color, desc, row, 0, colspan=2)
             else:
-                self.create_dashboard_card(grid_frame, text, cmd, color, desc, row, col)
+                self.create_dashboard_card(grid_frame, module_name, text, cmd, color, desc, row, col)
 
         footer_frame = tk.Frame(root, bg="#ecf0f1", height=50)
         footer_frame.pack(fill=tk.X, side=tk.BOTTOM)
 
+        if self.source == 'memory':
+            delta_btn = tk.Button(
+                footer_frame,
+                text="APPLY SALES UPDATE",
+                command=self.apply_delta,
+                font=("Segoe UI", 10, "bold"),
+                bg="#2c3e50",
+                fg="white",
+                relief="flat",
+                padx=20,
+                pady=5,
+                cursor="hand2"
+            )
+            delta_btn.pack(side=tk.LEFT, padx=(40, 0), pady=10)
+            self.controls['delta'] = delta_btn
+
+            search_btn = tk.Button(
+                footer_frame,
+                text="TITLE SEARCH",
+                command=self.show_search_panel,
+                font=("Segoe UI", 10, "bold"),
+                bg="#16a085",
+                fg="white",
+                relief="flat",
+                padx=20,
+                pady=5,
+                cursor="hand2"
+            )
+            search_btn.pack(side=tk.LEFT, padx=(10, 0), pady=10)
+            self.controls['search'] = search_btn
+
         exit_btn = tk.Button(
             footer_frame, 
             text="CLOSE DASHBOARD", 
@@ -88,7 +190,141 @@ class GreenlightDashboard:
         )
         exit_btn.pack(pady=10)
 
-    def create_dashboard_card(self, parent, text, command, color, desc, r, c, colspan=1):
+        trace_btn = tk.Button(
+            footer_frame,
+            text="PERFORMANCE",
+            command=self.show_trace_panel,
+            font=("Segoe UI", 10, "bold"),
+            bg="#7f8c8d",
+            fg="white",
+            relief="flat",
+            padx=20,
+            pady=5,
+            cursor="hand2"
+        )
+        trace_btn.place(relx=1.0, rely=0.5, x=-40, anchor="e")
+
+        self.start_loading()
+
+    def start_loading(self):
+        # The window is already up; the data loads on a background thread and
+        # poll_loading applies each stage here on the Tk thread. A retry
+        # starts over with every control disabled again.
+        self.df = None
+        self.updater = None
+        self.title_index = None
+        self.title_source = None
+        self.ready.clear()
+        for card in self.cards.values():
+            card['button'].config(state=tk.DISABLED)
+            card['desc_label'].config(text="Waiting for data...")
+        for control in self.controls.values():
+            control.config(state=tk.DISABLED)
+        self.retry_btn.pack_forget()
+        self.status_label.config(text="LOADING DATASET...", fg="#7f8c8d")
+        self.load_bar.config(value=0)
+        self.load_bar.pack(side=tk.LEFT, padx=(10, 0))
+        self.load_started = time.perf_counter()
+        thread = threading.Thread(target=self.load_in_background, name="data-loader", daemon=True)
+        thread.start()
+        self.root.after(POLL_MS, self.poll_loading)
+
+    def load_in_background(self):
+        # Never touches Tk: every result, progress report and error is queued.
+        def progress(rows, bytes_read):
+            self.load_events.put(('progress', (rows, bytes_read, total)))
+
+        try:
+            file_path = self.data_path()
+            total = os.path.getsize(file_path)
+            df = None
+            if self.source == 'sqlite':
+                # Aggregations run as SQL against an indexed on-disk copy of the
+                # CSV, so start-up neither parses the file nor holds its rows.
+                cube_start = time.perf_counter()
+                cube = self.open_store(file_path, progress)
+                self.startup_timings['SQLite store'] = time.perf_counter() - cube_start
+                fingerprint = cube.store.fingerprint
+            elif self.source == 'stream':
+                # Files too large for memory: aggregate chunk by chunk straight
+                # into the cube and keep no row-level frame.
+                cube_start = time.perf_counter()
+                cube = self.stream_data(file_path, progress)
+                self.startup_timings['Streamed aggregation cube'] = time.perf_counter() - cube_start
+                fingerprint = result_cache.cube_fingerprint(cube)
+            else:
+                load_start = time.perf_counter()
+                df = self.load_data(file_path, progress)
+                self.startup_timings['Dataset load'] = time.perf_counter() - load_start
+                missing = [col for col in sales_cube.STREAM_COLUMNS if col not in df.columns]
+                if missing:
+                    raise ValueError(f"'{os.path.basename(file_path)}' has no {', '.join(missing)} column(s)")
+                self.load_events.put(('rows', df))
+
+                cube_start = time.perf_counter()
+                cube = sales_cube.build_cube(df)
+                self.startup_timings['Aggregation cube'] = time.perf_counter() - cube_start
+                with tracing.span('dashboard.fingerprint'):
+                    fingerprint = result_cache.dataset_fingerprint(df)
+            runner = workers.ModuleRunner(df, cube, mode=self.worker_mode)
+        except Exception as e:
+            self.load_events.put(('error', e))
+            return
+        self.load_events.put(('cube', (cube, fingerprint, runner)))
+
+    def poll_loading(self):
+        while True:
+            try:
+                stage, payload = self.load_events.get_nowait()
+            except queue.Empty:
+                break
+            if stage == 'progress':
+                rows, bytes_read, total = payload
+                self.load_bar.config(value=100 * bytes_read / total if total else 100)
+                self.status_label.config(text=f"LOADING DATASET... {rows:,} ROWS PARSED, {bytes_read / 2**20:.1f} OF {total / 2**20:.1f} MB READ")
+            elif stage == 'rows':
+                self.df = payload
+                self.set_ready('rows')
+                self.load_bar.config(value=100)
+                self.status_label.config(text=f"{len(self.df):,} ROWS LOADED, BUILDING AGGREGATES...")
+            elif stage == 'cube':
+                self.cube, self.fingerprint, self.runner = payload
+                self.set_ready('cube')
+                elapsed = time.perf_counter() - self.load_started
+                self.startup_timings['Data ready'] = elapsed
+                self.load_bar.pack_forget()
+                self.status_label.config(text=f"✓ DATASET LOADED SUCCESSFULLY ({elapsed:.1f}s)", fg="#27ae60")
+                if self.prewarm:
+                    self.start_prewarm()
+                self.finish_loading()
+                return
+            elif stage == 'error':
+                self.load_bar.pack_forget()
+                self.status_label.config(text=f"✗ COULD NOT LOAD DATASET: {payload}", fg="#c0392b")
+                self.retry_btn.pack(side=tk.LEFT, padx=(10, 0))
+                self.finish_loading()
+                return
+        self.root.after(POLL_MS, self.poll_loading)
+
+    def set_ready(self, stage):
+        self.ready.add(stage)
+        if stage == 'rows':
+            self.start_title_index(self.df)
+        for name, requirement in CONTROL_REQUIREMENTS.items():
+            if requirement != stage:
+                continue
+            if name in self.cards:
+                self.cards[name]['button'].config(state=tk.NORMAL)
+                self.cards[name]['desc_label'].config(text=self.cards[name]['desc'])
+            elif name in self.controls:
+                self.controls[name].config(state=tk.NORMAL)
+
+    def finish_loading(self):
+        callbacks, self.when_loaded = self.when_loaded, []
+        for callback in callbacks:
+            callback()
+
+    def create_dashboard_card(self, parent, module_name, text, command, color, desc, r, c, colspan=1):
         card = tk.Frame(parent, bg="white", highlightbackground="#bdc3c7", highlightthickness=1, width=300 if colspan==1 else 630, height=90)
         
         if colspan == 2:
@@ -115,27 +351,482 @@ class GreenlightDashboard:
         desc_lbl = tk.Label(card, text=desc, font=("Segoe UI", 9, "italic"), fg="#7f8c8d", bg="white")
         desc_lbl.pack(expand=True)
 
-    def run_module(self, analysis_func):
-        if analysis_func.__name__ == 'run_analysis_wrapper':
-            analysis_func(self.df, self.root)
+        busy_frame = tk.Frame(card, bg="white")
+        progress = ttk.Progressbar(busy_frame, mode='indeterminate', length=120)
+        progress.pack(side=tk.LEFT, padx=(10, 5))
+        status_lbl = tk.Label(busy_frame, text="", font=("Segoe UI", 9), fg="#7f8c8d", bg="white")
+        status_lbl.pack(side=tk.LEFT, expand=True)
+        cancel_btn = tk.Button(
+            busy_frame,
+            text="CANCEL",
+            command=lambda: self.cancel_module(module_name),
+            font=("Segoe UI", 8, "bold"),
+            bg="#ecf0f1",
+            fg="#c0392b",
+            relief="flat",
+            cursor="hand2"
+        )
+        cancel_btn.pack(side=tk.RIGHT, padx=10)
+
+        self.cards[module_name] = {
+            'button': btn,
+            'desc': desc,
+            'desc_label': desc_lbl,
+            'busy_frame': busy_frame,
+            'progress': progress,
+            'status': status_lbl,
+        }
+
+    def set_card_busy(self, module_name, busy, message=None):
+        card = self.cards[module_name]
+        if busy:
+            card['desc_label'].pack_forget()
+            card['busy_frame'].pack(expand=True, fill=tk.X)
+            card['progress'].start(15)
+            card['status'].config(text="Starting...")
         else:
-            analysis_func(self.df)
+            card['progress'].stop()
+            card['busy_frame'].pack_forget()
+            card['desc_label'].config(text=message or card['desc'])
+            card['desc_label'].pack(expand=True)
+
+    def load_module(self, module_name):
+        start = time.perf_counter()
+        module = importlib.import_module(module_name)
+        self.startup_timings.setdefault(f"Import {module_name}", time.perf_counter() - start)
+        return module
+
+    def start_prewarm(self):
+        thread = threading.Thread(target=self.prewarm_modules, name="module-prewarm", daemon=True)
+        thread.start()
+
+    def prewarm_modules(self):
+        if self.runner is not None:
+            self.runner.prewarm([module_name for _, module_name, _, _ in MODULES])
+        for _, module_name, _, _ in MODULES:
+            try:
+                self.load_module(module_name)
+            except Exception as e:
+                print(f"    Pre-warm of '{module_name}' failed: {e}")
+
+    def figure_size(self, module_name):
+        # None keeps the module's own default size.
+        if module_name in FULLSCREEN_MODULES:
+            return (self.root.winfo_screenwidth() / 100, self.root.winfo_screenheight() / 100)
+        return None
+
+    def run_module(self, module_name, interactive=False):
+        # Only the compute phase runs in the worker pool; the figure is built
+        # here on the Tk thread once the results come back. A figure already
+        # drawn for the same data, parameters and screen is shown as a picture
+        # straight away unless the interactive figure is asked for.
+        if module_name in self.jobs:
+            return
+        try:
+            module = self.load_module(module_name)
+        except Exception as e:
+            messagebox.showerror("Error", f"Could not load module '{module_name}': {e}")
+            return
+
+        params = self.module_params.get(module_name)
+        resolved = result_cache.compute_params(module, params)
+        figsize = self.figure_size(module_name)
+        figure_key = figure_cache.figure_key(self.fingerprint, module, resolved, figsize)
+        self.opened_figures[module_name] = figsize
+        if not interactive:
+            png = self.figure_cache.get(figure_key)
+            if png is not None:
+                with tracing.span(f"{module_name}.show_cached"):
+                    self.show_cached_figure(module_name, png)
+                self.set_card_busy(module_name, False, "Ready (cached figure)")
+                return
+
+        cache_key = result_cache.make_key(self.fingerprint, module_name, resolved)
+        results = self.result_cache.get(cache_key)
+        if results is not None:
+            self.show_results(module_name, results)
+            self.set_card_busy(module_name, False, "Ready (cached result)")
+            self.cache_figure(module_name, figure_key, results=results)
+            return
 
-    def load_data(self):
+        job = self.runner.submit(module_name, params=params)
+        job.cache_key = cache_key
+        job.figure_key = figure_key
+        self.jobs[module_name] = job
+        self.set_card_busy(module_name, True)
+        self.root.after(POLL_MS, self.poll_module, module_name)
+
+    def cancel_module(self, module_name):
+        job = self.jobs.pop(module_name, None)
+        if job is not None:
+            job.cancel()
+            self.set_card_busy(module_name, False, "Cancelled")
+
+    def poll_module(self, module_name):
+        job = self.jobs.get(module_name)
+        if job is None or job.cancelled:
+            return
+        if not job.done():
+            self.cards[module_name]['status'].config(text=f"Computing... {job.elapsed():.1f}s")
+            self.root.after(POLL_MS, self.poll_module, module_name)
+            return
+
+        del self.jobs[module_name]
+        try:
+            results = job.result()
+        except Exception as e:
+            self.set_card_busy(module_name, False, "Failed - see error")
+            messagebox.showerror("Error", f"'{module_name}' failed: {e}")
+            return
+
+        if results is None:
+            self.set_card_busy(module_name, False, "No results - see console")
+            return
+
+        self.result_cache.put(job.cache_key, results)
+        self.show_results(module_name, results)
+        self.set_card_busy(module_name, False, f"Ready in {job.elapsed():.1f}s")
+        self.cache_figure(module_name, job.figure_key, results=results)
+
+    def cache_figure(self, module_name, figure_key, results=None, cache_key=None):
+        # Draws the figure again in a worker process and stores it as a PNG,
+        # so the Tk thread pays nothing for it. Without results the worker
+        # recomputes them from the cube and they are cached under cache_key.
+        # With --workers thread nothing is drawn or stored: pyplot is not
+        # thread-safe, so rendering would have to share the Tk thread. Figures
+        # cached by an earlier process-pool session are still shown.
+        if self.runner.mode != 'process' or figure_key in self.render_jobs or figure_key in self.figure_cache:
+            return
+        job = self.runner.submit_render(
+            module_name, params=self.module_params.get(module_name),
+            results=results, figsize=self.opened_figures.get(module_name),
+        )
+        job.cache_key = cache_key
+        self.render_jobs[figure_key] = job
+        self.root.after(POLL_MS, self.poll_render, figure_key)
+
+    def poll_render(self, figure_key):
+        job = self.render_jobs.get(figure_key)
+        if job is None or job.cancelled:
+            return
+        if not job.done():
+            self.root.after(POLL_MS, self.poll_render, figure_key)
+            return
+
+        del self.render_jobs[figure_key]
+        if job.future.cancelled():
+            # Dropped with the old pool when a sales update republished the frame.
+            return
+        try:
+            results, png = job.result()
+        except Exception as e:
+            print(f"    Background render of '{job.module_name}' failed: {e}")
+            return
+        if job.cache_key is not None and results is not None:
+            self.result_cache.put(job.cache_key, results)
+        if png is not None:
+            self.figure_cache.put(figure_key, png)
+
+    def refresh_figures(self):
+        # The data changed, so every figure cached this session is stale: redraw
+        # them in the background, in the order they were opened.
+        for module_name in self.opened_figures:
+            module = self.load_module(module_name)
+            resolved = result_cache.compute_params(module, self.module_params.get(module_name))
+            figure_key = figure_cache.figure_key(self.fingerprint, module, resolved, self.opened_figures[module_name])
+            cache_key = result_cache.make_key(self.fingerprint, module_name, resolved)
+            self.cache_figure(module_name, figure_key, cache_key=cache_key)
+
+    def show_cached_figure(self, module_name, png):
+        title = next(desc for _, name, _, desc in MODULES if name == module_name)
+        window = tk.Toplevel(self.root)
+        window.title(f"{title} (cached)")
+        image = tk.PhotoImage(data=base64.b64encode(png))
+        # Figures drawn larger than the screen are shown scaled down.
+        factor = max(
+            -(-image.width() // self.root.winfo_screenwidth()),
+            -(-image.height() // (self.root.winfo_screenheight() - 60)),
+        )
+        if factor > 1:
+            image = image.subsample(factor)
+
+        bar = tk.Frame(window, bg="#ecf0f1")
+        bar.pack(fill=tk.X, side=tk.BOTTOM)
+        tk.Label(bar, text="Drawn earlier from the same data and settings", font=("Segoe UI", 9), fg="#7f8c8d", bg="#ecf0f1").pack(side=tk.LEFT, padx=10)
+
+        def open_interactive():
+            window.destroy()
+            self.run_module(module_name, interactive=True)
+
+        tk.Button(
+            bar,
+            text="INTERACTIVE VIEW",
+            command=open_interactive,
+            font=("Segoe UI", 9, "bold"),
+            bg="#2c3e50",
+            fg="white",
+            relief="flat",
+            cursor="hand2"
+        ).pack(side=tk.RIGHT, padx=10, pady=5)
+
+        label = tk.Label(window, image=image)
+        # Tk drops the image when the Python object is collected.
+        label.image = image
+        label.pack(expand=True, fill=tk.BOTH)
+
+    def show_results(self, module_name, results):
+        try:
+            module = self.load_module(module_name)
+        except Exception as e:
+            messagebox.showerror("Error", f"Could not load module '{module_name}': {e}")
+            return
+
+        figsize = self.figure_size(module_name)
+        if figsize is not None:
+            fig = module.render(results, figsize=figsize)
+        else:
+            fig = module.render(results)
+        if self.cube is not None:
+            filters.attach(fig, module, self.cube, self.frame(), self.module_params.get(module_name))
+        with tracing.span(f"{module_name}.show"):
+            fig.show()
+
+    def apply_delta(self):
+        if self.jobs:
+            # Thread workers read the cube that the update modifies in place.
+            messagebox.showinfo("Busy", "Wait for the running analyses to finish before applying an update.")
+            return
+        path = filedialog.askopenfilename(
+            title="Select a file of new or changed sales rows",
+            filetypes=[("CSV files", "*.csv"), ("All files", "*.*")],
+        )
+        if not path:
+            return
+
+        start = time.perf_counter()
+        try:
+            if self.updater is None:
+                self.updater = delta.DeltaUpdater(self.df, self.cube, self.fingerprint)
+            with tracing.span('dashboard.apply_delta'):
+                summary = self.updater.apply_file(path)
+        except Exception as e:
+            messagebox.showerror("Error", f"Could not apply '{os.path.basename(path)}': {e}")
+            return
+
+        # The cube is updated in place and shared with the workers again.
+        # Bootstrap intervals and per-title plots read the row-level frame:
+        # workers get the rows the update wrote as an overlay on the frame
+        # they hold, or the whole new frame when the update folded its buffer
+        # of inserted rows into it.
+        self.fingerprint = self.updater.fingerprint
+        if summary['compacted']:
+            self.df = self.updater.frame()
+            self.runner.publish(self.df)
+            self.start_title_index(self.df)
+        else:
+            self.runner.patch(self.updater.overlay())
+            if self.title_index is not None and self.title_source is None:
+                self.title_index.update(summary['rows'], self.updater.take)
+            else:
+                # Still indexing a frame that predates the update.
+                self.start_title_index(self.updater.frame())
+        self.refresh_figures()
+        self.status_label.config(
+            text=f"✓ SALES UPDATE APPLIED: {summary['updated']} CHANGED, {summary['inserted']} NEW ROWS ({time.perf_counter() - start:.2f}s)"
+        )
+
+    def frame(self):
+        # The row-level frame as of the last sales update. Rows an update
+        # inserted are joined to it on first use here, not by the update.
+        return self.updater.frame() if self.updater is not None else self.df
+
+    def start_title_index(self, df):
+        # Built off the Tk thread; searches wait for it until it is ready and
+        # keep using the previous index while a rebuild runs. Sales updates
+        # after that are applied to the index incrementally.
+        self.title_source = df
+
+        def build():
+            index = title_search.TitleIndex(df)
+            if self.title_source is df:
+                self.title_index = index
+                self.title_source = None
+
+        threading.Thread(target=build, name="title-index", daemon=True).start()
+
+    def show_search_panel(self):
+        columns = [
+            ('Platform', "Platform", 80), ('Year_of_Release', "Year", 60),
+            ('NA_Sales', "NA", 70), ('EU_Sales', "EU", 70), ('JP_Sales', "JP", 70), ('Other_Sales', "Other", 70),
+            ('Global_Sales', "Global", 80), ('Critic_Score', "Critic", 60), ('User_Score', "User", 60),
+        ]
+
+        panel = tk.Toplevel(self.root)
+        panel.title("Title Search")
+        panel.geometry("1000x500")
+
+        bar = tk.Frame(panel)
+        bar.pack(fill=tk.X, padx=10, pady=(10, 0))
+        tk.Label(bar, text="Title:").pack(side=tk.LEFT)
+        query = tk.StringVar()
+        entry = tk.Entry(bar, textvariable=query, width=50)
+        entry.pack(side=tk.LEFT, padx=5)
+        status = tk.Label(bar, text="Type part of a title", fg="#7f8c8d")
+        status.pack(side=tk.LEFT, padx=10)
+
+        tree = ttk.Treeview(panel, columns=[key for key, _, _ in columns])
+        tree.heading('#0', text="Title")
+        tree.column('#0', width=300)
+        for key, heading, width in columns:
+            tree.heading(key, text=heading)
+            tree.column(key, width=width, anchor='w' if key == 'Platform' else 'e')
+        tree.pack(expand=True, fill=tk.BOTH, padx=10, pady=10)
+
+        def search(*_):
+            if self.title_index is None:
+                status.config(text="Indexing titles...")
+                panel.after(POLL_MS, search)
+                return
+            start = time.perf_counter()
+            with tracing.span('title_search.lookup'):
+                rows = self.title_index.lookup(query.get())
+            elapsed = time.perf_counter() - start
+
+            # One line per title with its totals, expanding to its platforms.
+            tree.delete(*tree.get_children())
+            platforms = dict(list(rows.groupby('Title', sort=False)))
+            for title in title_search.summarize(rows).itertuples(index=False):
+                parent = tree.insert('', tk.END, text=title.Title, values=[
+                    f"{title.Platforms} platform{'s' if title.Platforms > 1 else ''}", '',
+                    title_search.cell(title.NA_Sales, '.2f'), title_search.cell(title.EU_Sales, '.2f'), title_search.cell(title.JP_Sales, '.2f'),
+                    title_search.cell(title.Other_Sales, '.2f'), title_search.cell(title.Global_Sales, '.2f'),
+                    title_search.cell(title.Critic_Score, '.0f'), title_search.cell(title.User_Score, '.1f'),
+                ])
+                for row in platforms[title.Title].itertuples(index=False):
+                    tree.insert(parent, tk.END, text=row.Name, values=[
+                        row.Platform, title_search.cell(row.Year_of_Release, 'd'),
+                        title_search.cell(row.NA_Sales, '.2f'), title_search.cell(row.EU_Sales, '.2f'), title_search.cell(row.JP_Sales, '.2f'),
+                        title_search.cell(row.Other_Sales, '.2f'), title_search.cell(row.Global_Sales, '.2f'),
+                        title_search.cell(row.Critic_Score, 'd'), title_search.cell(row.User_Score, '.1f'),
+                    ])
+            status.config(text=f"{len(platforms)} titles in {elapsed * 1000:.1f} ms" if query.get().strip() else "Type part of a title")
+
+        query.trace_add('write', search)
+        entry.focus_set()
+
+    def show_trace_panel(self):
+        columns = [
+            ('name', "Stage", 260), ('calls', "Calls", 60), ('total_ms', "Total ms", 90),
+            ('mean_ms', "Mean ms", 80), ('max_ms', "Max ms", 80), ('cpu_ms', "CPU ms", 80),
+            ('rss_growth_mb', "RSS peak +MB", 100), ('alloc_peak_mb', "Alloc peak MB", 100),
+        ]
+
+        panel = tk.Toplevel(self.root)
+        panel.title("Performance Trace")
+        panel.geometry("900x450")
+
+        tree = ttk.Treeview(panel, columns=[key for key, _, _ in columns], show='headings')
+        for key, heading, width in columns:
+            tree.heading(key, text=heading)
+            tree.column(key, width=width, anchor='w' if key == 'name' else 'e')
+        tree.pack(expand=True, fill=tk.BOTH, padx=10, pady=10)
+
+        def refresh():
+            tree.delete(*tree.get_children())
+            for row in tracing.summary():
+                values = []
+                for key, _, _ in columns:
+                    value = row[key]
+                    if value is None:
+                        values.append('-')
+                    elif isinstance(value, float):
+                        values.append(f"{value:.1f}")
+                    else:
+                        values.append(value)
+                tree.insert('', tk.END, values=values)
+
+        def export():
+            path = filedialog.asksaveasfilename(
+                parent=panel,
+                title="Export Chrome/Perfetto trace",
+                defaultextension=".json",
+                filetypes=[("Trace JSON", "*.json")],
+            )
+            if path:
+                tracing.export_chrome_trace(path)
+
+        buttons = tk.Frame(panel)
+        buttons.pack(fill=tk.X, padx=10, pady=(0, 10))
+        tk.Button(buttons, text="Refresh", command=refresh).pack(side=tk.LEFT)
+        tk.Button(buttons, text="Export trace...", command=export).pack(side=tk.LEFT, padx=10)
+        refresh()
+
+    def shutdown(self):
+        for module_name in list(self.jobs):
+            self.cancel_module(module_name)
+        if self.runner is not None:
+            self.runner.shutdown()
+        self.result_cache.flush()
+
+    def data_path(self):
         csv_filename = 'Video_Games_Sales_as_at_22_Dec_2016.csv'
         script_dir = os.path.dirname(os.path.abspath(__file__))
         file_path = os.path.join(script_dir, csv_filename)
 
         if not os.path.exists(file_path):
-            messagebox.showerror("Error", f"Could not find '{csv_filename}'")
-            return None
+            raise FileNotFoundError(f"Could not find '{csv_filename}'")
+        return file_path
+
+    # The loaders below run on the loading thread; errors are raised for
+    # poll_loading to show next to the RETRY button.
+
+    @tracing.traced('dashboard.load_data')
+    def load_data(self, file_path, progress=None):
         try:
-            return pd.read_csv(file_path)
+            return data_cache.load_dataset(file_path, progress=progress)
         except Exception as e:
-            messagebox.showerror("Error", f"Error reading CSV: {e}")
-            return None
+            raise RuntimeError(f"Error reading CSV: {e}") from e
+
+    @tracing.traced('dashboard.stream_data')
+    def stream_data(self, file_path, progress=None):
+        try:
+            return sales_cube.stream_cube(file_path, progress=progress)
+        except Exception as e:
+            raise RuntimeError(f"Error reading CSV: {e}") from e
+
+    @tracing.traced('dashboard.open_store')
+    def open_store(self, file_path, progress=None):
+        try:
+            return sql_store.open_cube(file_path, progress=progress)
+        except Exception as e:
+            raise RuntimeError(f"Error opening SQLite store: {e}") from e
+
+def print_startup_report(app):
+    import startup_report
+    print(startup_report.format_report(startup_report.collect_import_costs(), app.startup_timings))
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Project Greenlight executive dashboard")
+    parser.add_argument('--no-prewarm', action='store_true', help="Do not import analysis modules in the background after start-up")
+    parser.add_argument('--startup-report', action='store_true', help="Print window start-up time and per-dependency import costs")
+    parser.add_argument('--workers', choices=['process', 'thread'], default='process', help="Run module computations in a process pool (default) or a thread pool")
+    parser.add_argument('--stream', action='store_true', help="Aggregate the CSV in bounded chunks instead of loading it into memory")
+    parser.add_argument('--sqlite', action='store_true', help="Query an indexed SQLite copy of the CSV instead of loading it into memory")
+    parser.add_argument('--heat-mode', choices=['dots', 'density'], default='dots', help="Draw the world heatmap as individual dots or as one density raster")
+    parser.add_argument('--scatter-mode', choices=['genres', 'titles'], default='genres', help="Plot the risk scatter as genre averages or as every scored title")
+    parser.add_argument('--trace', metavar='FILE', help="Write the session's timing spans as a Chrome/Perfetto trace on exit")
+    args = parser.parse_args()
+
     root = tk.Tk()
-    app = GreenlightDashboard(root)
-    root.mainloop()
\ No newline at end of file
+    app = GreenlightDashboard(
+        root, prewarm=not args.no_prewarm, worker_mode=args.workers, stream=args.stream, sqlite=args.sqlite,
+        module_params={'heat': {'mode': args.heat_mode, 'allow_download': True}, 'scatter': {'mode': args.scatter_mode}},
+    )
+    root.update_idletasks()
+    app.startup_timings['Window ready'] = time.perf_counter() - _PROCESS_START
+    if args.startup_report:
+        app.when_loaded.append(lambda: print_startup_report(app))
+    root.mainloop()
+    app.shutdown()
+    if args.trace:
+        tracing.export_chrome_trace(args.trace)
\ No newline at end of file
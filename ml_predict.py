@@ -2,62 +2,119 @@ import matplotlib.pyplot as plt
 import pandas as pd
 import numpy as np
 import tkinter as tk
-from sklearn.linear_model import LinearRegression
 import warnings
 
-warnings.filterwarnings('ignore')
-
-def run_analysis(df):
-    print(">>> Initializing AI Prediction Model (Linear Regression)...")
-    print("    (Training on historical data to forecast future trends...)")
-
-    df_recent = df[df['Year_of_Release'] >= 2010].copy()
-    df_recent = df_recent.dropna(subset=['Year_of_Release', 'Global_Sales'])
-
-    def get_top_predictions(group_col, n=5):
-        items = df_recent[group_col].unique()
-        predictions = []
-
-        for item in items:
-            item_data = df_recent[df_recent[group_col] == item]
-            
-            years = item_data['Year_of_Release'].unique()
-            if len(years) < 2:
-                continue
-
-            yearly_sales = item_data.groupby('Year_of_Release')['Global_Sales'].sum().reset_index()
-            
-            X = yearly_sales['Year_of_Release'].values.reshape(-1, 1)
-            y = yearly_sales['Global_Sales'].values
-            
-            model = LinearRegression()
-            model.fit(X, y)
-            
-            next_year = np.array([[yearly_sales['Year_of_Release'].max() + 1]])
-            predicted_sales = model.predict(next_year)[0]
-            
-            if predicted_sales > 0:
-                predictions.append((item, predicted_sales))
-        
-        predictions.sort(key=lambda x: x[1], reverse=True)
-        return pd.DataFrame(predictions[:n], columns=[group_col, 'Predicted_Sales'])
+import sales_cube
+import tracing
 
+warnings.filterwarnings('ignore')
 
-    top_consoles = get_top_predictions('Platform')
+TRAIN_START_YEAR = 2010
+TOP_N = 5
+
+def fit_trends(yearly, group_col):
+    # yearly holds one row per (entity, year) with summed Global_Sales; the
+    # least-squares line for every entity is solved in closed form at once.
+    entity, items = pd.factorize(yearly[group_col], sort=False)
+    x = yearly['Year_of_Release'].to_numpy(dtype='float64')
+    y = yearly['Global_Sales'].to_numpy(dtype='float64')
+
+    n_items = len(items)
+    n = np.bincount(entity, minlength=n_items)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        x_mean = np.bincount(entity, weights=x, minlength=n_items) / n
+        y_mean = np.bincount(entity, weights=y, minlength=n_items) / n
+        dx = x - x_mean[entity]
+        sxx = np.bincount(entity, weights=dx * dx, minlength=n_items)
+        sxy = np.bincount(entity, weights=dx * y, minlength=n_items)
+        slope = sxy / sxx
+
+    last_year = np.full(n_items, -np.inf)
+    np.maximum.at(last_year, entity, x)
+    rows = yearly['First_Row'].to_numpy(dtype='int64') if 'First_Row' in yearly else np.arange(len(yearly))
+    first_row = np.full(n_items, np.iinfo(np.int64).max)
+    np.minimum.at(first_row, entity, rows)
+
+    fitted = n >= 2
+    intercept = y_mean - slope * x_mean
+    next_year = last_year + 1
+    predicted = y_mean + slope * (next_year - x_mean)
+
+    return pd.DataFrame({
+        group_col: items[fitted],
+        'Slope': slope[fitted],
+        'Intercept': intercept[fitted],
+        'Last_Year': last_year[fitted].astype(int),
+        'Predicted_Sales': predicted[fitted],
+        'First_Row': first_row[fitted],
+    })
+
+def top_predictions(trends, group_col, n=5):
+    trends = trends[trends['Predicted_Sales'] > 0]
+    values = trends['Predicted_Sales'].to_numpy()
+    if len(values) > n:
+        # Keep everything tied with the n-th largest value so the final stable
+        # ordering matches a full sort, without sorting every prediction.
+        threshold = np.partition(values, len(values) - n)[len(values) - n]
+        candidates = np.flatnonzero(values >= threshold)
+    else:
+        candidates = np.arange(len(values))
+    order = candidates[np.lexsort((candidates, -values[candidates]))][:n]
+    top = trends.iloc[order]
+    return pd.DataFrame({group_col: top[group_col].to_numpy(), 'Predicted_Sales': top['Predicted_Sales'].to_numpy()})
+
+def entity_trends(cube, group_col, min_year=TRAIN_START_YEAR):
+    key = (group_col, min_year)
+    if key not in cube.trends:
+        with tracing.span('ml_predict.fit_trends', group_col=group_col):
+            cube.trends[key] = fit_trends(cube.entity_yearly(group_col, min_year=min_year), group_col)
+    return cube.trends[key]
+
+def refit_trends(cube, group_col, entities):
+    # Replaces the fits of the given entities in every cached trend table for
+    # group_col, leaving all other entities' lines untouched.
+    entities = list(entities)
+    if not entities:
+        return
+    for (col, min_year), trends in list(cube.trends.items()):
+        if col != group_col:
+            continue
+        with tracing.span('ml_predict.refit_trends', group_col=group_col, entities=len(entities)):
+            refitted = fit_trends(cube.entity_yearly(group_col, min_year=min_year, entities=entities), group_col)
+        kept = trends[~trends[group_col].isin(entities)]
+        merged = pd.concat([kept, refitted], ignore_index=True)
+        cube.trends[(col, min_year)] = merged.sort_values('First_Row', kind='stable').reset_index(drop=True)
+
+def get_top_predictions(cube, group_col, n=TOP_N, min_year=TRAIN_START_YEAR):
+    return top_predictions(entity_trends(cube, group_col, min_year), group_col, n)
+
+@tracing.traced('ml_predict.compute')
+def compute(df, cube=None, min_year=TRAIN_START_YEAR, top_n=TOP_N):
+    cube = cube if cube is not None else sales_cube.build_cube(df)
+
+    top_consoles = get_top_predictions(cube, 'Platform', top_n, min_year)
     
-    top_games = get_top_predictions('Name')
+    top_games = get_top_predictions(cube, 'Name', top_n, min_year)
     
-    top_genres = get_top_predictions('Genre')
+    top_genres = get_top_predictions(cube, 'Genre', top_n, min_year)
     
-    top_publishers = get_top_predictions('Publisher')
-
-    root = tk.Tk()
-    root.withdraw()
-    screen_w = root.winfo_screenwidth()
-    screen_h = root.winfo_screenheight()
-    root.destroy()
-
-    fig, axes = plt.subplots(2, 2, figsize=(screen_w/100, screen_h/100))
+    top_publishers = get_top_predictions(cube, 'Publisher', top_n, min_year)
+
+    return {
+        'top_consoles': top_consoles,
+        'top_games': top_games,
+        'top_genres': top_genres,
+        'top_publishers': top_publishers,
+    }
+
+@tracing.traced('ml_predict.render')
+def render(results, figsize=(19.2, 10.8)):
+    top_consoles = results['top_consoles']
+    top_games = results['top_games']
+    top_genres = results['top_genres']
+    top_publishers = results['top_publishers']
+
+    fig, axes = plt.subplots(2, 2, figsize=figsize)
     plt.subplots_adjust(wspace=0.3, hspace=0.4)
     
     colors = ['#3498db', '#e74c3c', '#2ecc71', '#9b59b6']
@@ -112,6 +169,21 @@ def run_analysis(df):
             pass
 
     fig.suptitle("AI PREDICTIVE ANALYSIS: TOP 5 FUTURE TRENDS", fontsize=16, color='darkblue')
+    return fig
+
+def run_analysis(df, cube=None):
+    print(">>> Initializing AI Prediction Model (Linear Regression)...")
+    print("    (Training on historical data to forecast future trends...)")
+
+    results = compute(df, cube=cube)
+
+    root = tk.Tk()
+    root.withdraw()
+    screen_w = root.winfo_screenwidth()
+    screen_h = root.winfo_screenheight()
+    root.destroy()
+
+    render(results, figsize=(screen_w/100, screen_h/100))
     plt.show()
 
 if __name__ == "__main__":
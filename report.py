@@ -0,0 +1,153 @@
+import matplotlib
+matplotlib.use('Agg')
+
+import os
+import sys
+import json
+import time
+import argparse
+import importlib
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import matplotlib.pyplot as plt
+
+import data_cache
+import sales_cube
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_CSV = os.path.join(SCRIPT_DIR, 'Video_Games_Sales_as_at_22_Dec_2016.csv')
+REPORT_MODULES = ['heat', 'scatter', 'line', 'bar', 'ml_predict']
+FORMATS = ['png', 'svg', 'pdf']
+
+# Each worker's datasets, by CSV path: the memory-mapped frame, opened on
+# first use, and the cube, built once by run_report and handed to every worker
+# as it starts.
+_worker_cubes = {}
+_worker_frames = {}
+
+
+def _init_worker(cubes):
+    _worker_cubes.update(cubes)
+
+
+def _dataset(csv_path):
+    if csv_path not in _worker_frames:
+        _worker_frames[csv_path] = data_cache.load_dataset(csv_path)
+    df = _worker_frames[csv_path]
+    if csv_path not in _worker_cubes:
+        _worker_cubes[csv_path] = sales_cube.build_cube(df)
+    return df, _worker_cubes[csv_path]
+
+
+def render_job(csv_path, module_name, out_dir, formats, dpi, params=None):
+    timings = {}
+    start = time.perf_counter()
+    df, cube = _dataset(csv_path)
+    timings['load'] = time.perf_counter() - start
+
+    module = importlib.import_module(module_name)
+
+    start = time.perf_counter()
+    results = module.compute(df, cube=cube, **(params or {}))
+    timings['compute'] = time.perf_counter() - start
+    if results is None:
+        reason = getattr(module, 'SKIP_REASON', "compute() returned no results")
+        return {'status': 'skipped', 'reason': reason, 'outputs': [], 'timings': timings}
+
+    start = time.perf_counter()
+    fig = module.render(results)
+    timings['render'] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    os.makedirs(out_dir, exist_ok=True)
+    outputs = []
+    for fmt in formats:
+        path = os.path.join(out_dir, f"{module_name}.{fmt}")
+        fig.savefig(path, dpi=dpi, format=fmt)
+        outputs.append(path)
+    plt.close(fig)
+    timings['save'] = time.perf_counter() - start
+
+    return {'status': 'ok', 'outputs': outputs, 'timings': timings}
+
+
+def _timed_job(csv_path, module_name, out_dir, formats, dpi, params=None):
+    start = time.perf_counter()
+    try:
+        result = render_job(csv_path, module_name, out_dir, formats, dpi, params)
+    except Exception as e:
+        result = {'status': 'error', 'error': f"{type(e).__name__}: {e}", 'outputs': [], 'timings': {}}
+    result['timings']['total'] = time.perf_counter() - start
+    result['pid'] = os.getpid()
+    return result
+
+
+def run_report(csv_paths, out_dir, modules=REPORT_MODULES, formats=('png',), dpi=100, jobs=None, module_params=None):
+    module_params = module_params or {}
+    started = time.perf_counter()
+
+    # Build (or validate) each dataset cache up front so workers only ever
+    # memory-map it and never race to convert the same CSV, and build each
+    # cube once here rather than once per job.
+    cubes = {}
+    for csv_path in csv_paths:
+        cubes[csv_path] = sales_cube.build_cube(data_cache.load_dataset(csv_path))
+
+    tasks = []
+    for csv_path in csv_paths:
+        dataset = os.path.splitext(os.path.basename(csv_path))[0]
+        for module_name in modules:
+            tasks.append((dataset, csv_path, module_name, os.path.join(out_dir, dataset)))
+
+    entries = []
+    with ProcessPoolExecutor(max_workers=jobs, initializer=_init_worker, initargs=(cubes,)) as executor:
+        futures = {
+            executor.submit(_timed_job, csv_path, module_name, dataset_dir, list(formats), dpi, module_params.get(module_name)): (dataset, csv_path, module_name)
+            for dataset, csv_path, module_name, dataset_dir in tasks
+        }
+        for future in as_completed(futures):
+            dataset, csv_path, module_name = futures[future]
+            result = future.result()
+            entry = {'dataset': dataset, 'source': os.path.abspath(csv_path), 'module': module_name}
+            entry.update(result)
+            entries.append(entry)
+            print(f"    [{result['status']:>7}] {dataset}/{module_name} ({result['timings']['total']:.2f}s)")
+
+    entries.sort(key=lambda e: (e['dataset'], modules.index(e['module'])))
+    manifest = {
+        'created': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'dpi': dpi,
+        'module_params': module_params,
+        'formats': list(formats),
+        'workers': jobs or os.cpu_count(),
+        'wall_time': time.perf_counter() - started,
+        'jobs': entries,
+    }
+    os.makedirs(out_dir, exist_ok=True)
+    with open(os.path.join(out_dir, 'manifest.json'), 'w') as f:
+        json.dump(manifest, f, indent=2)
+    return manifest
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Render the analysis modules to image files without a display.")
+    parser.add_argument('csv', nargs='*', default=[DEFAULT_CSV], help="Sales CSV file(s) to report on")
+    parser.add_argument('--out', default=os.path.join(SCRIPT_DIR, 'reports'), help="Output directory")
+    parser.add_argument('--modules', nargs='+', choices=REPORT_MODULES, default=REPORT_MODULES)
+    parser.add_argument('--formats', nargs='+', choices=FORMATS, default=['png'])
+    parser.add_argument('--dpi', type=int, default=100)
+    parser.add_argument('--heat-mode', choices=['dots', 'density'], default='dots', help="Draw the world heatmap as individual dots or as one density raster")
+    parser.add_argument('--scatter-mode', choices=['genres', 'titles'], default='genres', help="Plot the risk scatter as genre averages or as every scored title")
+    parser.add_argument('--jobs', type=int, default=None, help="Worker processes (default: CPU count)")
+    args = parser.parse_args()
+
+    print(f">>> Rendering {len(args.csv) * len(args.modules)} report job(s)...")
+    manifest = run_report(args.csv, args.out, args.modules, args.formats, args.dpi, args.jobs, {'heat': {'mode': args.heat_mode}, 'scatter': {'mode': args.scatter_mode}})
+    failed = [job for job in manifest['jobs'] if job['status'] == 'error']
+    # A requested module that could not run (heat without its map data) fails
+    # the report too, rather than leaving a quiet gap in the output.
+    skipped = [job for job in manifest['jobs'] if job['status'] == 'skipped']
+    for job in skipped:
+        print(f"    Skipped {job['dataset']}/{job['module']}: {job['reason']}")
+    print(f"    Wrote {os.path.join(args.out, 'manifest.json')} in {manifest['wall_time']:.2f}s")
+    sys.exit(1 if failed or skipped else 0)
\ No newline at end of file
@@ -0,0 +1,165 @@
+import os
+import json
+import pickle
+import hashlib
+import inspect
+import threading
+from collections import OrderedDict
+import pandas as pd
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_CACHE_DIR = os.path.join(SCRIPT_DIR, '.greenlight_cache', 'results')
+MEMORY_ITEMS = 16
+DISK_BUDGET_BYTES = 256 * 1024 * 1024
+
+
+def dataset_fingerprint(df):
+    digest = hashlib.sha1()
+    digest.update(json.dumps([list(map(str, df.columns)), list(map(str, df.dtypes))]).encode())
+    digest.update(pd.util.hash_pandas_object(df, index=False).to_numpy().tobytes())
+    return digest.hexdigest()
+
+
+def cube_fingerprint(cube):
+    # Streaming mode has no row-level frame; every module result is derived
+    # from the cube alone, so its two tables identify the dataset.
+    digest = hashlib.sha1()
+    for frame in (cube.frame, cube.titles):
+        digest.update(dataset_fingerprint(frame).encode())
+    return digest.hexdigest()
+
+
+def source_stamp(module):
+    # The modification time of the module's source file, so results (and
+    # figures) computed by an older version of it are not reused.
+    source = getattr(module, '__file__', None)
+    return os.stat(source).st_mtime_ns if source and os.path.exists(source) else None
+
+
+def compute_params(module, params=None):
+    # Resolve the module's compute() defaults too, so changing a default such
+    # as SALES_PER_DOT or the training cutoff year invalidates old entries, as
+    # does editing the module (see source_stamp).
+    signature = inspect.signature(module.compute)
+    bound = signature.bind_partial(**(params or {}))
+    bound.apply_defaults()
+    resolved = {k: v for k, v in bound.arguments.items() if k not in ('df', 'cube')}
+    # Modules that read other inputs (e.g. heat's geometry store) expose a
+    # token that changes when those inputs do.
+    if hasattr(module, 'cache_token'):
+        resolved['_token'] = module.cache_token()
+    resolved['_source'] = source_stamp(module)
+    return resolved
+
+
+def make_key(fingerprint, module_name, params):
+    payload = json.dumps([fingerprint, module_name, params], sort_keys=True, default=str)
+    return hashlib.sha1(payload.encode()).hexdigest()
+
+
+class ResultCache:
+    def __init__(self, cache_dir=DEFAULT_CACHE_DIR, memory_items=MEMORY_ITEMS, disk_budget=DISK_BUDGET_BYTES):
+        self.cache_dir = cache_dir
+        self.memory_items = memory_items
+        self.disk_budget = disk_budget
+        self.memory = OrderedDict()
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def _path(self, key):
+        return os.path.join(self.cache_dir, f"{key}.pkl")
+
+    def get(self, key):
+        with self.lock:
+            if key in self.memory:
+                self.memory.move_to_end(key)
+                self.hits += 1
+                return self.memory[key]
+
+        path = self._path(key)
+        try:
+            with open(path, 'rb') as f:
+                value = pickle.load(f)
+            os.utime(path)
+        except (OSError, pickle.UnpicklingError, EOFError):
+            with self.lock:
+                self.misses += 1
+            return None
+
+        self.put(key, value)
+        with self.lock:
+            self.hits += 1
+        return value
+
+    def put(self, key, value):
+        evicted = []
+        with self.lock:
+            self.memory[key] = value
+            self.memory.move_to_end(key)
+            while len(self.memory) > self.memory_items:
+                evicted.append(self.memory.popitem(last=False))
+        for old_key, old_value in evicted:
+            self._spill(old_key, old_value)
+
+    def _spill(self, key, value):
+        path = self._path(key)
+        if os.path.exists(path):
+            return
+        os.makedirs(self.cache_dir, exist_ok=True)
+        tmp_path = path + '.tmp'
+        try:
+            with open(tmp_path, 'wb') as f:
+                pickle.dump(value, f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp_path, path)
+        except (OSError, pickle.PicklingError, TypeError, AttributeError):
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            return
+        self.enforce_disk_budget()
+
+    def enforce_disk_budget(self):
+        evict_to_budget(self.cache_dir, '.pkl', self.disk_budget)
+
+    def flush(self):
+        # Spill everything still held in memory so the next session can reuse it.
+        with self.lock:
+            items = list(self.memory.items())
+        for key, value in items:
+            self._spill(key, value)
+
+    def clear(self):
+        with self.lock:
+            self.memory.clear()
+        if os.path.isdir(self.cache_dir):
+            for name in os.listdir(self.cache_dir):
+                if name.endswith('.pkl'):
+                    os.remove(os.path.join(self.cache_dir, name))
+
+
+def evict_to_budget(cache_dir, suffix, budget):
+    # Least recently used first: reads touch a file's mtime.
+    if not os.path.isdir(cache_dir):
+        return
+    entries = []
+    for name in os.listdir(cache_dir):
+        if name.endswith(suffix):
+            path = os.path.join(cache_dir, name)
+            stat = os.stat(path)
+            entries.append((stat.st_mtime, stat.st_size, path))
+    total = sum(size for _, size, _ in entries)
+    for _, size, path in sorted(entries):
+        if total <= budget:
+            break
+        os.remove(path)
+        total -= size
+
+
+def cached_compute(cache, fingerprint, module, df, cube=None, params=None):
+    key = make_key(fingerprint, module.__name__, compute_params(module, params))
+    results = cache.get(key)
+    if results is None:
+        results = module.compute(df, cube=cube, **(params or {}))
+        if results is not None:
+            cache.put(key, results)
+    return results
\ No newline at end of file
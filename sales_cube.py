@@ -0,0 +1,260 @@
+import numpy as np
+import pandas as pd
+
+import data_cache
+import tracing
+
+CUBE_KEYS = ['Platform', 'Year_of_Release', 'Genre', 'Publisher']
+TITLE_KEYS = ['Name', 'Year_of_Release']
+SALES_COLUMNS = ['NA_Sales', 'EU_Sales', 'JP_Sales', 'Other_Sales', 'Global_Sales']
+REGION_COLUMNS = ['NA_Sales', 'EU_Sales', 'JP_Sales', 'Other_Sales']
+
+# How each cube measure rolls up when cells are merged.
+MEASURES = {
+    'NA_Sales': 'sum',
+    'EU_Sales': 'sum',
+    'JP_Sales': 'sum',
+    'Other_Sales': 'sum',
+    'Global_Sales': 'sum',
+    'Rows': 'sum',
+    'Sales_Count': 'sum',
+    'Name_Count': 'sum',
+    'Critic_Sum': 'sum',
+    'Critic_Max': 'max',
+    'Critic_Count': 'sum',
+    'Scored_Sales_Sum': 'sum',
+    'Scored_Count': 'sum',
+    'Scored_Critic_Sum': 'sum',
+    'First_Row': 'min',
+}
+
+TITLE_MEASURES = {
+    'Global_Sales': 'sum',
+    'Rows': 'sum',
+    'Sales_Count': 'sum',
+    'First_Row': 'min',
+}
+
+# Streaming ingest reads only what the cube needs, a bounded chunk at a time.
+STREAM_COLUMNS = ['Name', 'Platform', 'Year_of_Release', 'Genre', 'Publisher'] + SALES_COLUMNS + ['Critic_Score']
+CHUNK_ROWS = 200_000
+
+
+class SalesCube:
+    def __init__(self, frame, titles):
+        # frame: one row per (Platform, Year_of_Release, Genre, Publisher) cell.
+        # titles: one row per (Name, Year_of_Release) for title-level forecasts.
+        self.frame = frame
+        self.titles = titles
+        # Per-entity trend fits kept by ml_predict, keyed by (group_col, min_year),
+        # so a delta update only has to refit the entities it touched.
+        self.trends = {}
+        # Bumped by each delta update, which edits the tables in place.
+        self.version = 0
+        # Cells and titles a delta update left without rows (all of them moved
+        # to other keys). They stay in the tables, with zero sums, until the
+        # updater compacts; queries read cells() instead of frame.
+        self.emptied = 0
+
+    def cells(self):
+        # The cells that hold rows.
+        if not self.emptied:
+            return self.frame
+        return self.frame[self.frame['Rows'] > 0]
+
+    def filtered(self, years=None, platforms=None, genres=None, publishers=None):
+        # A cube over the cells matching every given filter. Cells are
+        # aggregates, so this never touches rows. Titles carry no platform,
+        # genre or publisher and are narrowed by year only.
+        mask = self.frame['Rows'].to_numpy() > 0
+        title_mask = self.titles['Rows'].to_numpy() > 0
+        if years is not None:
+            low, high = years
+            mask &= self.frame['Year_of_Release'].between(low, high).to_numpy()
+            title_mask &= self.titles['Year_of_Release'].between(low, high).to_numpy()
+        for col, values in (('Platform', platforms), ('Genre', genres), ('Publisher', publishers)):
+            if values is not None:
+                mask &= self.frame[col].isin(list(values)).to_numpy()
+        return SalesCube(self.frame[mask], self.titles[title_mask])
+
+    def values(self, col):
+        return sorted(self.cells()[col].dropna().unique().tolist())
+
+    def rollup(self, by, measures=None):
+        measures = measures or list(MEASURES)
+        return self.cells().groupby(by, sort=True, observed=True).agg({m: MEASURES[m] for m in measures})
+
+    def publisher_stats(self):
+        stats = self.rollup('Publisher', ['Global_Sales', 'Name_Count', 'Critic_Max']).reset_index()
+        return stats.rename(columns={
+            'Global_Sales': 'Total_Revenue',
+            'Name_Count': 'Game_Count',
+            'Critic_Max': 'Max_Critic_Score',
+        })
+
+    def platform_year_sales(self):
+        cells = self.frame[self.frame['Sales_Count'] > 0]
+        sales = cells.groupby(['Platform', 'Year_of_Release'], sort=True, observed=True)['Global_Sales'].sum().reset_index()
+        sales['Year_of_Release'] = sales['Year_of_Release'].astype(int)
+        return sales
+
+    def genre_means(self):
+        # Means over the rows with both a critic score and sales, as the
+        # row-level dropna(subset=['Critic_Score', 'Global_Sales']) had it.
+        stats = self.rollup('Genre', ['Scored_Critic_Sum', 'Scored_Sales_Sum', 'Scored_Count'])
+        stats = stats[stats['Scored_Count'] > 0]
+        return pd.DataFrame({
+            'Genre': stats.index,
+            'Critic_Score': (stats['Scored_Critic_Sum'] / stats['Scored_Count']).to_numpy(),
+            'Global_Sales': (stats['Scored_Sales_Sum'] / stats['Scored_Count']).to_numpy(),
+        })
+
+    def genre_region_sales(self, columns=REGION_COLUMNS):
+        return self.rollup('Genre', list(columns))
+
+    def entity_yearly(self, group_col, min_year=None, entities=None):
+        # Yearly Global_Sales per entity, ordered by each entity's first row in
+        # the source frame so ties rank the same way a row scan would.
+        source = self.titles if group_col == 'Name' else self.frame
+        if entities is not None:
+            source = source[source[group_col].isin(list(entities))]
+        if min_year is not None:
+            source = source[source['Year_of_Release'] >= min_year]
+        source = source[source['Sales_Count'] > 0]
+
+        yearly = source.groupby([group_col, 'Year_of_Release'], sort=False, observed=True).agg(
+            Global_Sales=('Global_Sales', 'sum'),
+            First_Row=('First_Row', 'min'),
+        ).reset_index()
+        return first_seen_order(yearly, group_col)
+
+
+def row_mask(df, years=None, platforms=None, genres=None, publishers=None):
+    # SalesCube.filtered's filters over the row-level frame, for statistics
+    # that need individual rows (bootstrap intervals, per-title plots).
+    mask = np.ones(len(df), dtype=bool)
+    if years is not None:
+        low, high = years
+        mask &= df['Year_of_Release'].between(low, high).fillna(False).to_numpy(dtype=bool)
+    for col, values in (('Platform', platforms), ('Genre', genres), ('Publisher', publishers)):
+        if values is not None:
+            mask &= df[col].isin(list(values)).to_numpy()
+    return mask
+
+
+def first_seen_order(yearly, group_col):
+    first_seen = yearly.groupby(group_col, observed=True)['First_Row'].transform('min')
+    order = np.lexsort((yearly['Year_of_Release'].to_numpy(), first_seen.to_numpy()))
+    return yearly.iloc[order].reset_index(drop=True)
+
+
+def _numeric(series):
+    # Measures accumulate in float64 whatever the frame stores (float32 sales,
+    # nullable Int16 scores); missing values become NaN.
+    return pd.to_numeric(series, errors='coerce').astype('float64')
+
+
+def _measure_inputs(df, row_offset=0, positions=None):
+    global_sales = _numeric(df['Global_Sales'])
+    critic = _numeric(df['Critic_Score'])
+    scored = critic.notna()
+
+    inputs = pd.DataFrame({col: _numeric(df[col]) for col in REGION_COLUMNS})
+    inputs['Global_Sales'] = global_sales
+    inputs['Rows'] = 1
+    inputs['Sales_Count'] = global_sales.notna().astype(np.int64)
+    inputs['Name_Count'] = df['Name'].notna().astype(np.int64)
+    inputs['Critic_Sum'] = critic.fillna(0)
+    inputs['Critic_Max'] = critic
+    inputs['Critic_Count'] = scored.astype(np.int64)
+    inputs['Scored_Sales_Sum'] = global_sales.where(scored, 0).fillna(0)
+    both = scored & global_sales.notna()
+    inputs['Scored_Count'] = both.astype(np.int64)
+    inputs['Scored_Critic_Sum'] = critic.where(both, 0)
+    if positions is None:
+        positions = np.arange(row_offset, row_offset + len(df), dtype=np.int64)
+    inputs['First_Row'] = np.asarray(positions, dtype=np.int64)
+    return inputs
+
+
+def _plain_keys(frame):
+    # Categorical keys (as in prepared frames) would carry every unused
+    # category into the rollups, and seaborn plots those too. Nullable years
+    # become float64 with NaN so downstream arithmetic stays plain NumPy.
+    for col in frame.columns:
+        dtype = frame[col].dtype
+        if isinstance(dtype, pd.CategoricalDtype):
+            frame[col] = frame[col].astype(dtype.categories.dtype)
+        elif pd.api.types.is_extension_array_dtype(dtype) and pd.api.types.is_numeric_dtype(dtype):
+            frame[col] = frame[col].astype('float64')
+    return frame
+
+
+@tracing.traced('sales_cube.build')
+def build_cube(df, row_offset=0, positions=None):
+    # row_offset is the position of df's first row in the full dataset, so
+    # cubes built from consecutive chunks merge with the same First_Row values.
+    # positions gives every row's position instead, for scattered subsets.
+    inputs = _measure_inputs(df, row_offset, positions)
+
+    keys = [df[k] for k in CUBE_KEYS]
+    frame = inputs.groupby(keys, dropna=False, sort=False, observed=True).agg(MEASURES).reset_index()
+
+    title_inputs = inputs[list(TITLE_MEASURES)]
+    titles = title_inputs.groupby([df[k] for k in TITLE_KEYS], sort=False, observed=True).agg(TITLE_MEASURES).reset_index()
+
+    return SalesCube(_plain_keys(frame), _plain_keys(titles))
+
+
+@tracing.traced('sales_cube.merge')
+def merge_cubes(cubes):
+    # Every measure is a sum, max or min, so cells from different row ranges
+    # combine exactly; the result equals the cube of the concatenated rows.
+    cubes = list(cubes)
+    if len(cubes) == 1:
+        return cubes[0]
+    frame = pd.concat([cube.frame for cube in cubes], ignore_index=True)
+    frame = frame.groupby(CUBE_KEYS, dropna=False, sort=False).agg(MEASURES).reset_index()
+    titles = pd.concat([cube.titles for cube in cubes], ignore_index=True)
+    titles = titles.groupby(TITLE_KEYS, sort=False).agg(TITLE_MEASURES).reset_index()
+    return SalesCube(frame, titles)
+
+
+@tracing.traced('sales_cube.stream')
+def stream_cube(csv_path, chunk_rows=CHUNK_ROWS, progress=None):
+    # Builds the cube without ever holding the whole file: memory is bounded
+    # by one chunk plus the cube itself, which grows with the number of
+    # distinct cells and titles rather than with the number of rows.
+    # progress(rows_parsed, bytes_read) is called after each chunk.
+    cube = None
+    rows = 0
+    chunks = data_cache.read_source_chunks(csv_path, chunk_rows, progress, usecols=STREAM_COLUMNS)
+    for chunk in chunks:
+        # Same dtypes as the in-memory frame, so both paths sum identical values.
+        chunk = data_cache.prepare_frame(chunk)
+        part = build_cube(chunk, row_offset=rows)
+        cube = part if cube is None else merge_cubes([cube, part])
+        rows += len(chunk)
+    if cube is None:
+        cube = build_cube(pd.DataFrame({col: pd.Series(dtype='float64') for col in STREAM_COLUMNS}))
+    return cube
+
+
+if __name__ == "__main__":
+    import os
+    import sys
+    import time
+
+    script_dir = os.path.dirname(os.path.abspath(__file__))
+    csv_path = sys.argv[1] if len(sys.argv) > 1 else os.path.join(script_dir, 'Video_Games_Sales_as_at_22_Dec_2016.csv')
+
+    df = data_cache.load_dataset(csv_path)
+    start = time.perf_counter()
+    cube = build_cube(df)
+    elapsed = time.perf_counter() - start
+    print(f"Cube: {len(cube.frame)} cells from {len(df)} rows in {elapsed * 1000:.1f} ms (in memory)")
+
+    start = time.perf_counter()
+    cube = stream_cube(csv_path)
+    elapsed = time.perf_counter() - start
+    print(f"Cube: {len(cube.frame)} cells in {elapsed * 1000:.1f} ms (streamed in {CHUNK_ROWS:,}-row chunks)")
\ No newline at end of file
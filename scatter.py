@@ -4,22 +4,149 @@ import pandas as pd
 import numpy as np
 import tkinter as tk
 
-def run_analysis(df):
-    print(">>> Generating Risk Assessment Scatter Plot (All Genres)...")
-    
-    df_scored = df.dropna(subset=['Critic_Score', 'Global_Sales']).copy()
-    
-    df_scored['Critic_Score'] = pd.to_numeric(df_scored['Critic_Score'], errors='coerce')
-    
-    genre_stats = df_scored.groupby('Genre').agg({
-        'Critic_Score': 'mean',
-        'Global_Sales': 'mean'
-    }).reset_index()
-    
-    print(f"    Plotting {len(genre_stats)} genres...")
-    
-    plt.figure(figsize=(12, 8)) 
-    
+import sales_cube
+import bootstrap
+import tracing
+
+FILTERS = ['years', 'platforms', 'publishers']
+
+# 'genres' plots each genre's average title; 'titles' plots every scored
+# title, which needs the row-level frame (it falls back to genres without).
+RENDER_MODES = ['genres', 'titles']
+RENDER_MODE = 'genres'
+
+# Title mode draws the titles in view as individual points up to
+# RAW_POINT_LIMIT, as a hexbin of counts up to HEXBIN_POINT_LIMIT and as
+# density contours beyond that.
+RAW_POINT_LIMIT = 20_000
+HEXBIN_POINT_LIMIT = 500_000
+HEX_GRID = 60
+CONTOUR_BINS = 120
+CONTOUR_LEVELS = 8
+# Box blur radius, in bins, over the contour grid; sales are reported in
+# steps of 0.01, which leave gaps between low-sales bins on a log axis.
+CONTOUR_SMOOTH = 2
+# The detail level is recomputed once the view has been still this long.
+LOD_DELAY_MS = 150
+# Top sellers and over-performers labelled in title mode (each), and the
+# box around a label, as a fraction of the score and log-sales ranges, that
+# no other label's point may fall in.
+LABEL_COUNT = 8
+LABEL_BOX = (0.15, 0.04)
+
+def _values(series):
+    return pd.to_numeric(series, errors='coerce').to_numpy(dtype='float64', na_value=np.nan)
+
+def title_points(df, filters=None):
+    # Every title row with a critic score and sales, after the dashboard
+    # filters, as arrays: critic score, sales and genre code.
+    critic = _values(df['Critic_Score'])
+    sales = _values(df['Global_Sales'])
+    keep = ~np.isnan(critic) & (sales > 0) & sales_cube.row_mask(df, **(filters or {}))
+    genres = _genres(df)
+    rows = np.flatnonzero(keep)
+    return rows, critic[rows], sales[rows], np.asarray(genres.codes)[rows].astype(np.int16), list(genres.categories)
+
+def _genres(df):
+    return df['Genre'].array if isinstance(df['Genre'].dtype, pd.CategoricalDtype) else pd.Categorical(df['Genre'])
+
+def genre_intervals(df, genre_stats, filters=None, resamples=bootstrap.RESAMPLES):
+    # Bootstrap intervals for each genre's mean sales, mean critic score and
+    # the correlation between the two, over the same scored rows the cube's
+    # genre means are taken from (missing sales count as zero there too).
+    critic = _values(df['Critic_Score'])
+    sales = np.nan_to_num(_values(df['Global_Sales']))
+    genres = _genres(df)
+    codes = np.asarray(genres.codes)
+    keep = ~np.isnan(critic) & (codes >= 0) & sales_cube.row_mask(df, **(filters or {}))
+    intervals = bootstrap.bootstrap_groups(codes[keep], sales[keep], critic[keep], resamples=resamples)
+    intervals = intervals.rename(columns={
+        'X_Mean_Low': 'Sales_Low', 'X_Mean_High': 'Sales_High',
+        'Y_Mean_Low': 'Critic_Low', 'Y_Mean_High': 'Critic_High',
+        'R': 'Correlation', 'R_Low': 'Correlation_Low', 'R_High': 'Correlation_High',
+    })
+    intervals.index = np.asarray(genres.categories, dtype=object)[intervals.index]
+    columns = ['Sales_Low', 'Sales_High', 'Critic_Low', 'Critic_High', 'Correlation', 'Correlation_Low', 'Correlation_High']
+    return genre_stats.join(intervals[columns], on='Genre')
+
+def _largest(values, count):
+    count = min(count, len(values))
+    if count == 0:
+        return np.empty(0, dtype=np.int64)
+    picked = np.argpartition(-values, count - 1)[:count]
+    return picked[np.argsort(-values[picked], kind='stable')]
+
+def label_rows(critic, sales, count=LABEL_COUNT):
+    # Positions of the titles worth naming: the best sellers, and those that
+    # sold furthest above what their critic score predicts (largest residuals
+    # of a log-linear fit of sales on score). Candidates are ranked in one
+    # pass over all titles; a candidate is then skipped if its point would
+    # sit under a higher-ranked label.
+    if len(sales) == 0:
+        return np.empty(0, dtype=np.int64), np.empty(0, dtype=object)
+    log_sales = np.log10(sales)
+    top = _largest(sales, 3 * count)
+    if len(sales) > 1 and np.ptp(critic) > 0:
+        slope, intercept = np.polyfit(critic, log_sales, 1)
+        residual = log_sales - (intercept + slope * critic)
+        residual[top] = -np.inf
+        outliers = _largest(residual, 3 * count)
+        outliers = outliers[np.isfinite(residual[outliers])]
+    else:
+        outliers = np.empty(0, dtype=np.int64)
+
+    candidates = np.concatenate([top, outliers])
+    reasons = np.array(['top'] * len(top) + ['outlier'] * len(outliers), dtype=object)
+    scale = np.array([max(np.ptp(critic), 1e-9), max(np.ptp(log_sales), 1e-9)])
+    points = np.column_stack([critic[candidates], log_sales[candidates]]) / scale
+    apart = (np.abs(points[:, None, :] - points[None, :, :]) > LABEL_BOX).any(axis=2)
+
+    kept = []
+    quota = {'top': count, 'outlier': count}
+    for i, reason in enumerate(reasons):
+        if quota[reason] and apart[i, kept].all():
+            kept.append(i)
+            quota[reason] -= 1
+    return candidates[kept], reasons[kept]
+
+@tracing.traced('scatter.compute')
+def compute(df, cube=None, filters=None, mode=RENDER_MODE, resamples=bootstrap.RESAMPLES):
+    # resamples=0 skips the bootstrap intervals; they need the row-level
+    # frame, so streamed and SQLite sessions plot the means alone.
+    if mode not in RENDER_MODES:
+        raise ValueError(f"Unknown scatter mode '{mode}'; expected one of {RENDER_MODES}")
+    cube = cube if cube is not None else sales_cube.build_cube(df)
+    filtered = cube.filtered(**filters) if filters else cube
+    with tracing.span('scatter.genre_means'):
+        genre_stats = filtered.genre_means()
+    if df is not None and resamples:
+        with tracing.span('scatter.bootstrap'):
+            genre_stats = genre_intervals(df, genre_stats, filters, resamples)
+    if mode == 'genres' or df is None:
+        return {'genre_stats': genre_stats}
+
+    with tracing.span('scatter.title_points'):
+        rows, critic, sales, codes, genres = title_points(df, filters)
+    with tracing.span('scatter.label_rows'):
+        picked, reasons = label_rows(critic, sales)
+    labels = pd.DataFrame({
+        'Name': df['Name'].iloc[rows[picked]].to_numpy(),
+        'Platform': df['Platform'].iloc[rows[picked]].to_numpy(),
+        'Critic_Score': critic[picked],
+        'Global_Sales': sales[picked],
+        'Reason': reasons,
+    })
+    return {
+        'mode': 'titles',
+        'genre_stats': genre_stats,
+        'genres': genres,
+        'critic': critic.astype(np.float32),
+        'sales': sales.astype(np.float32),
+        'genre_codes': codes,
+        'labels': labels,
+    }
+
+def _show_maximized():
     manager = plt.get_current_fig_manager()
     if hasattr(manager, 'window'):
         if hasattr(manager.window, 'state'):
@@ -33,34 +160,340 @@ def run_analysis(df):
             manager.window.focus_force()
         except:
             pass    
-    sns.scatterplot(
-        data=genre_stats, 
-        x='Critic_Score', 
-        y='Global_Sales', 
-        s=150, 
-        color='#ff7f50', 
-        edgecolor='black',
-        alpha=0.8
-    )
+
+@tracing.traced('scatter.render')
+def render(results, figsize=(12, 8)):
+    if results.get('mode') == 'titles':
+        return render_titles(results, figsize)
+    genre_stats = results['genre_stats']
+    
+    print(f"    Plotting {len(genre_stats)} genres...")
     
-    for i in range(len(genre_stats)):
-        plt.text(
-            genre_stats.iloc[i]['Critic_Score'] + 0.2, 
-            genre_stats.iloc[i]['Global_Sales'], 
-            genre_stats.iloc[i]['Genre'], 
-            fontsize=10, 
-            weight='bold',
-            va='center' 
+    fig = plt.figure(figsize=figsize) 
+    
+    _show_maximized()
+    with tracing.span('scatter.render.scatterplot'):
+        ax = sns.scatterplot(
+            data=genre_stats, 
+            x='Critic_Score', 
+            y='Global_Sales', 
+            s=150, 
+            color='#ff7f50', 
+            edgecolor='black',
+            alpha=0.8
         )
+    
+    intervals = _interval_bars(ax, genre_stats)
+    labels = {}
+    with tracing.span('scatter.render.labels'):
+        for genre, critic, sales, text in zip(genre_stats['Genre'], genre_stats['Critic_Score'], genre_stats['Global_Sales'], _genre_label_texts(genre_stats)):
+            labels[genre] = plt.text(
+                critic + 0.2, 
+                sales, 
+                text, 
+                fontsize=10, 
+                weight='bold',
+                va='center' 
+            )
         
-    plt.title('Risk Assessment: Critical Praise vs. Financial Return (All Genres)', fontsize=16)
+    title = 'Risk Assessment: Critical Praise vs. Financial Return (All Genres)'
+    if intervals is not None:
+        title += f'\nBars: {bootstrap.CONFIDENCE:.0%} bootstrap intervals of the means; r: score-sales correlation'
+    plt.title(title, fontsize=16)
     plt.xlabel('Average Critic Score (Quality)', fontsize=12)
     plt.ylabel('Average Global Sales (Revenue in Millions)', fontsize=12)
     plt.grid(True, linestyle=':', alpha=0.5)
+    with tracing.span('scatter.render.layout'):
+        plt.tight_layout()
+    points = ax.collections[0]
+    bars = list(intervals.lines[2]) if intervals is not None else []
+    fig.filter_artists = {
+        'ax': ax,
+        'points': points,
+        'labels': labels,
+        'bars': bars,
+        'animated': [points] + bars + list(labels.values()),
+    }
+    return fig
+
+def _interval_segments(stats):
+    # One horizontal segment per genre across its critic score interval and
+    # one vertical segment across its sales interval.
+    # Segments always reach the marker, even if float rounding puts a mean a
+    # hair outside its interval.
+    critic, sales = stats['Critic_Score'].to_numpy(), stats['Global_Sales'].to_numpy()
+    critic_low = np.minimum(stats['Critic_Low'].fillna(stats['Critic_Score']).to_numpy(), critic)
+    critic_high = np.maximum(stats['Critic_High'].fillna(stats['Critic_Score']).to_numpy(), critic)
+    sales_low = np.minimum(stats['Sales_Low'].fillna(stats['Global_Sales']).to_numpy(), sales)
+    sales_high = np.maximum(stats['Sales_High'].fillna(stats['Global_Sales']).to_numpy(), sales)
+    return (
+        np.stack([np.column_stack([critic_low, sales]), np.column_stack([critic_high, sales])], axis=1),
+        np.stack([np.column_stack([critic, sales_low]), np.column_stack([critic, sales_high])], axis=1),
+    )
+
+def _interval_bars(ax, stats):
+    # Error bars for the genre means, when compute() bootstrapped them.
+    if 'Sales_Low' not in stats or not len(stats):
+        return None
+    critic, sales = stats['Critic_Score'].to_numpy(), stats['Global_Sales'].to_numpy()
+    horizontal, vertical = _interval_segments(stats)
+    return ax.errorbar(
+        critic, sales,
+        xerr=[critic - horizontal[:, 0, 0], horizontal[:, 1, 0] - critic],
+        yerr=[sales - vertical[:, 0, 1], vertical[:, 1, 1] - sales],
+        fmt='none', ecolor='#555555', elinewidth=1.2, capsize=0, zorder=4,
+    )
+
+def _genre_label_texts(stats):
+    if 'Correlation' not in stats:
+        return list(stats['Genre'])
+    return [
+        genre if np.isnan(r) else f"{genre}\nr = {r:.2f} [{low:.2f}, {high:.2f}]"
+        for genre, r, low, high in zip(stats['Genre'], stats['Correlation'], stats['Correlation_Low'], stats['Correlation_High'])
+    ]
+
+def genre_palette(genres):
+    # One colour per genre, plus grey (index -1) for titles without one.
+    colors = sns.color_palette('tab20', len(genres)) if len(genres) > 10 else sns.color_palette('tab10', len(genres))
+    return np.array([(*color, 1.0) for color in colors] + [(0.6, 0.6, 0.6, 1.0)])
+
+def box_blur(grid, radius=CONTOUR_SMOOTH):
+    # Mean over a (2 * radius + 1)-cell window along each axis, from running
+    # sums, with the edges extended.
+    width = 2 * radius + 1
+    for axis in (0, 1):
+        pad = [(radius, radius) if a == axis else (0, 0) for a in (0, 1)]
+        sums = np.cumsum(np.pad(grid, pad, mode='edge'), axis=axis)
+        sums = np.concatenate([np.zeros_like(np.take(sums, [0], axis=axis)), sums], axis=axis)
+        grid = (np.take(sums, np.arange(width, sums.shape[axis]), axis=axis)
+                - np.take(sums, np.arange(sums.shape[axis] - width), axis=axis)) / width
+    return grid
+
+class TitleLayers:
+    # Draws the titles inside the current view at the detail their number
+    # allows: points coloured by genre, a hexbin of counts, or density
+    # contours, each computed for the visible range only, so zooming in
+    # turns contours into hexagons and then into points. While the view
+    # moves the existing artists are just redrawn; the layer is rebuilt once
+    # it has been still for LOD_DELAY_MS.
+    def __init__(self, ax, critic, sales, codes, palette):
+        self.ax = ax
+        self.palette = palette
+        self.artists = []
+        self.drawn = None
+        self.mode = None
+        self.timer = None
+        self.status = ax.text(
+            0.01, 0.99, "", transform=ax.transAxes, ha='left', va='top', fontsize=9, color='#555555', zorder=6,
+            bbox={'facecolor': 'white', 'alpha': 0.8, 'edgecolor': 'none'},
+        )
+        self.set_data(critic, sales, codes)
+        ax.callbacks.connect('xlim_changed', self.schedule)
+        ax.callbacks.connect('ylim_changed', self.schedule)
+
+    def set_data(self, critic, sales, codes):
+        self.critic = critic
+        self.sales = sales
+        self.log_sales = np.log10(sales)
+        self.codes = codes
+        self.drawn = None
+
+    def schedule(self, ax):
+        if self.timer is None:
+            self.timer = self.ax.figure.canvas.new_timer(interval=LOD_DELAY_MS)
+            self.timer.single_shot = True
+            self.timer.add_callback(self.redraw)
+        self.timer.stop()
+        self.timer.start()
+
+    def redraw(self):
+        if self.refresh():
+            self.ax.figure.canvas.draw_idle()
+
+    @staticmethod
+    def level_of_detail(count):
+        if count <= RAW_POINT_LIMIT:
+            return 'points'
+        return 'hexbin' if count <= HEXBIN_POINT_LIMIT else 'contours'
+
+    def refresh(self):
+        # Returns False when the layer already matches the view.
+        view = (self.ax.get_xlim(), self.ax.get_ylim())
+        if view == self.drawn:
+            return False
+        (x0, x1), (y0, y1) = view
+        with tracing.span('scatter.lod_refresh'):
+            visible = (self.critic >= x0) & (self.critic <= x1) & (self.sales >= y0) & (self.sales <= y1)
+            count = int(visible.sum())
+            self.mode = self.level_of_detail(count)
+            for artist in self.artists:
+                artist.remove()
+            x = self.critic[visible]
+            if self.mode == 'points':
+                self.artists = [self.ax.scatter(
+                    x, self.sales[visible], s=8, c=self.palette[self.codes[visible]],
+                    linewidths=0, alpha=0.6, rasterized=True, zorder=2,
+                )]
+                detail = "points coloured by genre"
+            elif self.mode == 'hexbin':
+                self.artists = [self.ax.hexbin(
+                    x, self.sales[visible], gridsize=HEX_GRID, yscale='log', bins='log', mincnt=1,
+                    extent=(x0, x1, np.log10(y0), np.log10(y1)), cmap='viridis', linewidths=0, zorder=1,
+                )]
+                detail = "hexagons shaded by title count (log)"
+            else:
+                # Critic scores are whole numbers; narrower bins would leave
+                # empty stripes between them.
+                x_bins = int(min(CONTOUR_BINS, max(x1 - x0, 2)))
+                counts, x_edges, y_edges = np.histogram2d(
+                    x, self.log_sales[visible], bins=[x_bins, CONTOUR_BINS], range=[[x0, x1], [np.log10(y0), np.log10(y1)]],
+                )
+                density = np.log10(box_blur(counts.T) + 1)
+                levels = np.linspace(density.max() / CONTOUR_LEVELS, density.max(), CONTOUR_LEVELS)
+                self.artists = [self.ax.contourf(
+                    (x_edges[:-1] + x_edges[1:]) / 2, 10 ** ((y_edges[:-1] + y_edges[1:]) / 2), density,
+                    levels=levels, cmap='viridis', alpha=0.85, zorder=1,
+                )]
+                detail = "density contours (log)"
+            self.status.set_text(f"{count:,} titles in view: {detail}")
+        self.drawn = view
+        return True
+
+def _genre_means(ax, stats, palette, genres):
+    code = {genre: i for i, genre in enumerate(genres)}
+    colors = palette[[code.get(genre, -1) for genre in stats['Genre']]] if len(stats) else 'none'
+    return ax.scatter(
+        stats['Critic_Score'], stats['Global_Sales'], s=150, c=colors, marker='D',
+        edgecolor='black', linewidths=1.2, zorder=4,
+    )
+
+def _title_labels(ax, labels):
+    # Neighbouring labels alternate above and below their points, and points
+    # in the right part of the axes are labelled to their left.
+    right = ax.get_xlim()[0] + 0.7 * (ax.get_xlim()[1] - ax.get_xlim()[0])
+    texts = []
+    for i, (name, platform, critic, sales, reason) in enumerate(zip(
+        labels['Name'], labels['Platform'], labels['Critic_Score'], labels['Global_Sales'], labels['Reason'],
+    )):
+        left = critic > right
+        texts.append(ax.annotate(
+            f"{name} ({platform})", (critic, sales),
+            xytext=(-4 if left else 4, 4 if i % 2 == 0 else -4), textcoords='offset points',
+            ha='right' if left else 'left', va='bottom' if i % 2 == 0 else 'top',
+            fontsize=8, weight='bold' if reason == 'top' else 'normal', clip_on=True, zorder=5,
+        ))
+    return texts
+
+def render_titles(results, figsize):
+    critic = results['critic']
+    sales = results['sales']
+    genres = results['genres']
+    print(f"    Plotting {len(critic):,} scored titles...")
+
+    fig, ax = plt.subplots(figsize=figsize)
+    _show_maximized()
+    palette = genre_palette(genres)
+
+    ax.set_yscale('log')
+    if len(critic):
+        ax.set_xlim(critic.min() - 1, critic.max() + 1)
+        ax.set_ylim(sales.min() / 1.5, sales.max() * 1.5)
+    else:
+        ax.set_xlim(0, 100)
+        ax.set_ylim(0.01, 100)
+    # Limits only change when the user pans or zooms, not when layers swap.
+    ax.set_autoscale_on(False)
+
+    with tracing.span('scatter.render.layers'):
+        layers = TitleLayers(ax, critic, sales, results['genre_codes'], palette)
+        layers.refresh()
+    means = _genre_means(ax, results['genre_stats'], palette, genres)
+    intervals = _interval_bars(ax, results['genre_stats'])
+    with tracing.span('scatter.render.labels'):
+        labels = _title_labels(ax, results['labels'])
+
+    handles = [
+        plt.Line2D([], [], marker='o', linestyle='', color=palette[i], label=genre)
+        for i, genre in enumerate(genres)
+    ] + [plt.Line2D([], [], marker='D', linestyle='', color='white', markeredgecolor='black', label='Genre average')]
+    ax.legend(handles=handles, loc='lower right', fontsize=8, ncol=2, title='Genre')
+
+    ax.set_title(f'Risk Assessment: Critic Score vs. Sales per Title ({len(critic):,} Scored Titles)', fontsize=16)
+    ax.set_xlabel('Critic Score (Quality)', fontsize=12)
+    ax.set_ylabel('Global Sales (Millions, log scale)', fontsize=12)
+    ax.grid(True, linestyle=':', alpha=0.5)
+    with tracing.span('scatter.render.layout'):
+        fig.tight_layout()
+    fig.filter_artists = {
+        'ax': ax,
+        'layers': layers,
+        'means': means,
+        'intervals': intervals,
+        'labels': labels,
+        'palette': palette,
+        'genres': genres,
+    }
+    return fig
+
+@tracing.traced('scatter.update')
+def update(fig, results):
+    # Moves the existing genre markers and labels to the filtered means; a
+    # genre with no scored games left is hidden. Returns True when a point
+    # falls outside the current limits and the axes had to rescale.
+    artists = fig.filter_artists
+    if 'layers' in artists:
+        return update_titles(fig, results)
+    ax = artists['ax']
+    stats = results['genre_stats'].set_index('Genre')
+    genres = [genre for genre in artists['labels'] if genre in stats.index]
+    positions = stats.loc[genres, ['Critic_Score', 'Global_Sales']].to_numpy()
+    artists['points'].set_offsets(positions.reshape(-1, 2))
+    texts = dict(zip(stats.index, _genre_label_texts(stats.reset_index())))
+    for genre, label in artists['labels'].items():
+        label.set_visible(genre in stats.index)
+        if genre in stats.index:
+            label.set_position((stats.at[genre, 'Critic_Score'] + 0.2, stats.at[genre, 'Global_Sales']))
+            label.set_text(texts[genre])
+    if artists['bars'] and 'Sales_Low' in stats:
+        segments = _interval_segments(stats.loc[genres].reset_index())
+        for bars, lines in zip(artists['bars'], segments):
+            bars.set_segments(lines)
+        # The limits have to fit the bars as well as the points.
+        positions = np.concatenate([positions.reshape(-1, 2)] + [lines.reshape(-1, 2) for lines in segments])
+
+    (x0, x1), (y0, y1) = ax.get_xlim(), ax.get_ylim()
+    inside = ((positions[:, 0] >= x0) & (positions[:, 0] <= x1) & (positions[:, 1] >= y0) & (positions[:, 1] <= y1)).all()
+    if inside:
+        return False
+    ax.ignore_existing_data_limits = True
+    ax.update_datalim(positions)
+    ax.autoscale_view()
+    return True
+
+def update_titles(fig, results):
+    # Title mode redraws its layer, genre averages and labels from the
+    # filtered titles in the current view, so it always needs a full redraw.
+    artists = fig.filter_artists
+    ax = artists['ax']
+    artists['layers'].set_data(results['critic'], results['sales'], results['genre_codes'])
+    artists['layers'].refresh()
+    artists['means'].remove()
+    artists['means'] = _genre_means(ax, results['genre_stats'], artists['palette'], artists['genres'])
+    if artists['intervals'] is not None:
+        artists['intervals'].remove()
+    artists['intervals'] = _interval_bars(ax, results['genre_stats'])
+    for label in artists['labels']:
+        label.remove()
+    artists['labels'] = _title_labels(ax, results['labels'])
+    return True
+
+def run_analysis(df, cube=None):
+    print(">>> Generating Risk Assessment Scatter Plot (All Genres)...")
+    
+    render(compute(df, cube=cube))
     
     print("   Insight: Visualizing the relationship between critical reception and sales across all genres.")
     print("   (Close the graph window to continue)")
-    plt.tight_layout()
     plt.show()
 
 if __name__ == "__main__":
@@ -0,0 +1,329 @@
+import matplotlib
+matplotlib.use('Agg')
+
+import os
+import json
+import time
+import asyncio
+import argparse
+import importlib
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlsplit, parse_qs
+
+import numpy as np
+import pandas as pd
+
+import data_cache
+import sales_cube
+import sql_store
+import result_cache
+import tracing
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_CSV = os.path.join(SCRIPT_DIR, 'Video_Games_Sales_as_at_22_Dec_2016.csv')
+CACHE_DIR = os.path.join(SCRIPT_DIR, '.greenlight_cache', 'service')
+DEFAULT_PORT = 8765
+RESPONSE_CACHE_ITEMS = 256
+MAX_TOP_N = 1000
+
+# Endpoint -> (module whose compute() it serves, extra query parameters). The
+# year and entity filters an endpoint accepts are the module's FILTERS.
+ENDPOINTS = {
+    '/publishers': ('bar', ['top']),
+    '/lifecycles': ('line', []),
+    '/risk': ('scatter', []),
+    '/forecast': ('ml_predict', ['top', 'entity', 'min_year']),
+}
+
+FILTER_COLUMNS = {'platforms': 'Platform', 'genres': 'Genre', 'publishers': 'Publisher'}
+
+# Forecast entity types, as named in the dashboard, and the column each fits.
+ENTITY_COLUMNS = {
+    'platform': 'Platform',
+    'game': 'Name',
+    'genre': 'Genre',
+    'publisher': 'Publisher',
+}
+
+
+class BadRequest(ValueError):
+    pass
+
+
+def _single(query, name):
+    values = query.get(name)
+    return values[-1].strip() if values else None
+
+
+def _int(query, name, low, high):
+    text = _single(query, name)
+    if text is None:
+        return None
+    try:
+        value = int(text)
+    except ValueError:
+        raise BadRequest(f"'{name}' must be an integer")
+    if not low <= value <= high:
+        raise BadRequest(f"'{name}' must be between {low} and {high}")
+    return value
+
+
+def parse_years(text):
+    # "2005" or "2000-2010"; either end may be left open ("-2005", "2010-").
+    low, sep, high = text.partition('-')
+    try:
+        low = int(low) if low.strip() else 0
+        high = int(high) if high.strip() else 9999
+        if not sep:
+            high = low
+    except ValueError:
+        raise BadRequest("'years' must look like 2005 or 2000-2010")
+    if low > high:
+        raise BadRequest("'years' starts after it ends")
+    return (low, high)
+
+
+def accepted_params(module, extras):
+    return list(getattr(module, 'FILTERS', [])) + list(extras)
+
+
+def parse_params(module, extras, query):
+    # Query string -> compute() keyword arguments in a canonical form, so
+    # equivalent requests share one cache entry.
+    fields = getattr(module, 'FILTERS', [])
+    unknown = sorted(set(query) - set(accepted_params(module, extras)))
+    if unknown:
+        raise BadRequest(f"Unknown parameter(s): {', '.join(unknown)}")
+
+    filters = {}
+    if 'years' in fields and _single(query, 'years'):
+        filters['years'] = parse_years(_single(query, 'years'))
+    for field in fields:
+        if field in FILTER_COLUMNS and _single(query, field):
+            values = {value.strip() for value in ','.join(query[field]).split(',') if value.strip()}
+            filters[field] = sorted(values)
+
+    params = {}
+    if filters:
+        params['filters'] = filters
+    top_n = _int(query, 'top', 1, MAX_TOP_N)
+    if top_n is not None:
+        params['top_n'] = top_n
+    min_year = _int(query, 'min_year', 1900, 2100)
+    if min_year is not None:
+        params['min_year'] = min_year
+    entity = _single(query, 'entity')
+    if entity is not None:
+        if entity.lower() not in ENTITY_COLUMNS:
+            raise BadRequest(f"'entity' must be one of {', '.join(ENTITY_COLUMNS)}")
+        params['entity'] = entity.lower()
+    return params
+
+
+def jsonable(value):
+    if isinstance(value, pd.DataFrame):
+        # NaN becomes null; NumPy scalars become plain numbers.
+        frame = value.astype(object).where(value.notna(), None)
+        return [{col: jsonable(v) for col, v in row.items()} for row in frame.to_dict('records')]
+    if isinstance(value, pd.Series):
+        return jsonable(value.to_frame())
+    if isinstance(value, dict):
+        return {str(k): jsonable(v) for k, v in value.items()}
+    if isinstance(value, (list, tuple, np.ndarray)):
+        return [jsonable(v) for v in value]
+    if isinstance(value, np.generic):
+        value = value.item()
+    if isinstance(value, float) and not np.isfinite(value):
+        return None
+    return value
+
+
+class AnalyticsService:
+    # Holds one sales cube and answers every request from it; the CSV is read
+    # once at start-up. Computations run on a thread pool so the event loop
+    # keeps accepting clients, identical concurrent requests share a single
+    # computation, and encoded responses are cached by dataset fingerprint
+    # and canonical parameters.
+    def __init__(self, cube, fingerprint, rows=None, workers=None):
+        self.cube = cube
+        self.fingerprint = fingerprint
+        self.rows = rows
+        self.executor = ThreadPoolExecutor(max_workers=workers or min(4, os.cpu_count() or 1), thread_name_prefix='service')
+        self.cache = result_cache.ResultCache(cache_dir=CACHE_DIR, memory_items=RESPONSE_CACHE_ITEMS)
+        self.pending = {}
+        self.started = time.time()
+        self.requests = 0
+
+    def compute(self, module_name, params):
+        module = importlib.import_module(module_name)
+        params = dict(params)
+        entity = params.pop('entity', None)
+        with tracing.span(f"service.{module_name}"):
+            if entity is not None:
+                # One entity type's forecast instead of all four.
+                predictions = module.get_top_predictions(
+                    self.cube, ENTITY_COLUMNS[entity],
+                    params.get('top_n', module.TOP_N), params.get('min_year', module.TRAIN_START_YEAR),
+                )
+                results = {'entity': entity, 'predictions': predictions}
+            else:
+                results = module.compute(None, cube=self.cube, **params)
+            return json.dumps(jsonable(results)).encode()
+
+    async def respond(self, module_name, params):
+        # Responses from an older version of the module are not reused.
+        stamp = result_cache.source_stamp(importlib.import_module(module_name))
+        key = result_cache.make_key(self.fingerprint, module_name, dict(params, _source=stamp))
+        body = self.cache.get(key)
+        if body is not None:
+            return body, 'hit'
+        if key in self.pending:
+            return await asyncio.shield(self.pending[key]), 'shared'
+
+        loop = asyncio.get_running_loop()
+        future = loop.run_in_executor(self.executor, self.compute, module_name, params)
+        self.pending[key] = future
+
+        def finished(future):
+            self.pending.pop(key, None)
+            if not future.cancelled() and future.exception() is None:
+                self.cache.put(key, future.result())
+
+        future.add_done_callback(finished)
+        # Shielded, so a client hanging up does not cancel the computation
+        # for the others waiting on it.
+        return await asyncio.shield(future), 'miss'
+
+    def info(self):
+        return {
+            'rows': self.rows,
+            'cells': len(self.cube.frame),
+            'titles': len(self.cube.titles),
+            'fingerprint': self.fingerprint,
+            'uptime_s': round(time.time() - self.started, 1),
+            'requests': self.requests,
+            'cache': {'hits': self.cache.hits, 'misses': self.cache.misses},
+            'endpoints': {
+                path: accepted_params(importlib.import_module(module_name), extras)
+                for path, (module_name, extras) in ENDPOINTS.items()
+            },
+        }
+
+    async def dispatch(self, method, target):
+        if method not in ('GET', 'HEAD'):
+            return 405, json.dumps({'error': 'Only GET is supported'}).encode(), None
+        url = urlsplit(target)
+        query = parse_qs(url.query, keep_blank_values=False)
+        path = url.path.rstrip('/') or '/'
+        if path in ('/', '/health'):
+            return 200, json.dumps(self.info()).encode(), None
+        if path not in ENDPOINTS:
+            return 404, json.dumps({'error': f"No endpoint {path}", 'endpoints': list(ENDPOINTS)}).encode(), None
+
+        module_name, extras = ENDPOINTS[path]
+        try:
+            params = parse_params(importlib.import_module(module_name), extras, query)
+            body, cache_status = await self.respond(module_name, params)
+        except BadRequest as e:
+            return 400, json.dumps({'error': str(e)}).encode(), None
+        except Exception as e:
+            return 500, json.dumps({'error': f"{type(e).__name__}: {e}"}).encode(), None
+        return 200, body, cache_status
+
+    async def handle(self, reader, writer):
+        # Minimal HTTP/1.1: GET requests, keep-alive unless the client asks to
+        # close, and request bodies are ignored.
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line:
+                    break
+                parts = request_line.decode('latin-1').split()
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b'\r\n', b'\n', b''):
+                        break
+                    name, _, value = line.decode('latin-1').partition(':')
+                    headers[name.strip().lower()] = value.strip()
+                if len(parts) != 3:
+                    await self.send(writer, 400, json.dumps({'error': 'Malformed request line'}).encode(), None, False)
+                    break
+                method, target, version = parts
+                length = headers.get('content-length', '0')
+                if length.isdigit() and int(length):
+                    await reader.readexactly(int(length))
+
+                self.requests += 1
+                status, body, cache_status = await self.dispatch(method, target)
+                keep_alive = version == 'HTTP/1.1' and headers.get('connection', '').lower() != 'close'
+                await self.send(writer, status, body, cache_status, keep_alive, head=method == 'HEAD')
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError, asyncio.LimitOverrunError, ValueError):
+            pass
+        finally:
+            writer.close()
+
+    async def send(self, writer, status, body, cache_status, keep_alive, head=False):
+        reason = {200: 'OK', 400: 'Bad Request', 404: 'Not Found', 405: 'Method Not Allowed', 500: 'Internal Server Error'}[status]
+        headers = [
+            f"HTTP/1.1 {status} {reason}",
+            "Content-Type: application/json",
+            f"Content-Length: {len(body)}",
+            f"Connection: {'keep-alive' if keep_alive else 'close'}",
+        ]
+        if cache_status is not None:
+            headers.append(f"X-Cache: {cache_status}")
+        writer.write(("\r\n".join(headers) + "\r\n\r\n").encode('latin-1'))
+        if not head:
+            writer.write(body)
+        await writer.drain()
+
+    async def serve(self, host='127.0.0.1', port=DEFAULT_PORT, ready=None):
+        server = await asyncio.start_server(self.handle, host, port)
+        if ready is not None:
+            ready(server)
+        async with server:
+            await server.serve_forever()
+
+    def close(self):
+        self.executor.shutdown(wait=False, cancel_futures=True)
+
+
+def load_service(csv_path=DEFAULT_CSV, stream=False, sqlite=False, workers=None):
+    # Import the modules up front so the first request does not pay for it.
+    for module_name, _ in ENDPOINTS.values():
+        importlib.import_module(module_name)
+    if sqlite:
+        cube = sql_store.open_cube(csv_path)
+        return AnalyticsService(cube, cube.store.fingerprint, rows=cube.store.meta['rows'], workers=workers)
+    if stream:
+        cube = sales_cube.stream_cube(csv_path)
+        return AnalyticsService(cube, result_cache.cube_fingerprint(cube), workers=workers)
+    df = data_cache.load_dataset(csv_path)
+    cube = sales_cube.build_cube(df)
+    # Every endpoint reads the cube alone, so the row-level frame is dropped.
+    return AnalyticsService(cube, result_cache.cube_fingerprint(cube), rows=len(df), workers=workers)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Serve the dashboard's publisher, lifecycle, risk and forecast numbers as JSON over local HTTP.")
+    parser.add_argument('csv', nargs='?', default=DEFAULT_CSV, help="Sales CSV file")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=DEFAULT_PORT)
+    parser.add_argument('--stream', action='store_true', help="Aggregate the CSV in bounded chunks instead of loading it into memory")
+    parser.add_argument('--sqlite', action='store_true', help="Query an indexed SQLite copy of the CSV instead of loading it into memory")
+    parser.add_argument('--workers', type=int, default=None, help="Computation threads (default: up to 4)")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    service = load_service(args.csv, args.stream, args.sqlite, args.workers)
+    print(f">>> Loaded {len(service.cube.frame):,} cube cells in {time.perf_counter() - start:.2f}s")
+    print(f"    Serving on http://{args.host}:{args.port}/ ({', '.join(ENDPOINTS)})")
+    try:
+        asyncio.run(service.serve(args.host, args.port))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        service.close()
\ No newline at end of file
@@ -0,0 +1,336 @@
+import os
+import sys
+import json
+import time
+import sqlite3
+import threading
+import numpy as np
+import pandas as pd
+
+import data_cache
+import sales_cube
+import tracing
+
+STORE_VERSION = 4
+TEXT_COLUMNS = ['Name', 'Platform', 'Genre', 'Publisher']
+# Indexes per table: the filter columns on the cells, the title keys on the
+# titles, the only tables the database keeps.
+INDEXES = {
+    'cells': sales_cube.CUBE_KEYS,
+    'titles': sales_cube.TITLE_KEYS,
+}
+
+# Each cube measure as an SQL aggregate over rows. TOTAL() is SUM() that
+# returns 0.0 for no values, as pandas does.
+MEASURE_SQL = {
+    'NA_Sales': 'TOTAL(NA_Sales)',
+    'EU_Sales': 'TOTAL(EU_Sales)',
+    'JP_Sales': 'TOTAL(JP_Sales)',
+    'Other_Sales': 'TOTAL(Other_Sales)',
+    'Global_Sales': 'TOTAL(Global_Sales)',
+    'Rows': 'COUNT(*)',
+    'Sales_Count': 'COUNT(Global_Sales)',
+    'Name_Count': 'COUNT(Name)',
+    'Critic_Sum': 'TOTAL(Critic_Score)',
+    'Critic_Max': 'MAX(Critic_Score)',
+    'Critic_Count': 'COUNT(Critic_Score)',
+    'Scored_Sales_Sum': 'TOTAL(CASE WHEN Critic_Score IS NOT NULL THEN Global_Sales END)',
+    'Scored_Count': 'COUNT(CASE WHEN Critic_Score IS NOT NULL THEN Global_Sales END)',
+    'Scored_Critic_Sum': 'TOTAL(CASE WHEN Global_Sales IS NOT NULL THEN Critic_Score END)',
+    'First_Row': 'MIN(Row)',
+}
+INT_MEASURES = ['Rows', 'Sales_Count', 'Name_Count', 'Critic_Count', 'Scored_Count', 'First_Row']
+
+# How a measure rolls up over cells, as SQL (see sales_cube.MEASURES).
+ROLLUP_SQL = {'sum': 'TOTAL({0})', 'max': 'MAX({0})', 'min': 'MIN({0})'}
+
+
+def default_db_path(csv_path):
+    return data_cache.default_cache_dir(csv_path) + '.sqlite'
+
+
+def _column_values(series):
+    # Prepared-frame values as plain Python objects, missing values as None.
+    if isinstance(series.dtype, pd.CategoricalDtype):
+        values = series.astype(object)
+    else:
+        values = series.astype('float64').astype(object)
+    return values.where(series.notna(), None)
+
+
+@tracing.traced('sql_store.build')
+def build_database(csv_path, db_path=None, chunk_rows=sales_cube.CHUNK_ROWS, progress=None):
+    # Streams the CSV into a SQLite table of the columns the cube needs, with
+    # the same values as the prepared in-memory frame (float32 sales, integer
+    # years and scores). The cube's cells and titles are then aggregated from
+    # it into their own tables, so queries read thousands of cells rather
+    # than every row. The row table is a temporary one: nothing queries it
+    # afterwards, so it never reaches the database file.
+    db_path = db_path or default_db_path(csv_path)
+    os.makedirs(os.path.dirname(db_path), exist_ok=True)
+    tmp_path = db_path + '.tmp'
+    if os.path.exists(tmp_path):
+        os.remove(tmp_path)
+
+    columns = sales_cube.STREAM_COLUMNS
+    types = {col: 'TEXT' if col in TEXT_COLUMNS else 'INTEGER' if col in data_cache.INT_COLUMNS else 'REAL' for col in columns}
+    conn = sqlite3.connect(tmp_path)
+    try:
+        conn.execute("PRAGMA journal_mode = OFF")
+        conn.execute("PRAGMA synchronous = OFF")
+        conn.execute(f"CREATE TEMP TABLE sales (Row INTEGER PRIMARY KEY, {', '.join(f'{col} {types[col]}' for col in columns)})")
+        insert = f"INSERT INTO sales VALUES ({', '.join('?' * (len(columns) + 1))})"
+
+        rows = 0
+        for chunk in data_cache.read_source_chunks(csv_path, chunk_rows, progress, usecols=columns):
+            chunk = data_cache.prepare_frame(chunk[columns])
+            values = [range(rows, rows + len(chunk))] + [_column_values(chunk[col]) for col in columns]
+            conn.executemany(insert, zip(*values))
+            rows += len(chunk)
+
+        for table, keys, measures, where in (
+            ('cells', sales_cube.CUBE_KEYS, sales_cube.MEASURES, ""),
+            ('titles', sales_cube.TITLE_KEYS, sales_cube.TITLE_MEASURES, "WHERE Name IS NOT NULL AND Year_of_Release IS NOT NULL"),
+        ):
+            key_sql = ', '.join(keys)
+            select = ', '.join(f"{MEASURE_SQL[m]} AS {m}" for m in measures)
+            conn.execute(f"CREATE TABLE {table} AS SELECT {key_sql}, {select} FROM sales {where} GROUP BY {key_sql} ORDER BY First_Row")
+        for table, keys in INDEXES.items():
+            for col in keys:
+                conn.execute(f"CREATE INDEX idx_{table}_{col.lower()} ON {table} ({col})")
+        conn.execute("ANALYZE")
+
+        state = data_cache.source_state(csv_path)
+        meta = {
+            'version': STORE_VERSION,
+            'rows': rows,
+            'source_size': state['size'],
+            'source_mtime_ns': state['mtime_ns'],
+            'source_sha1': data_cache.file_digest(csv_path),
+        }
+        conn.execute("CREATE TABLE meta (key TEXT PRIMARY KEY, value TEXT)")
+        conn.executemany("INSERT INTO meta VALUES (?, ?)", [(k, json.dumps(v)) for k, v in meta.items()])
+        conn.commit()
+    finally:
+        conn.close()
+    os.replace(tmp_path, db_path)
+    return meta
+
+
+def read_meta(db_path):
+    if not os.path.exists(db_path):
+        return None
+    try:
+        conn = sqlite3.connect(f"file:{db_path}?mode=ro", uri=True)
+        try:
+            meta = {key: json.loads(value) for key, value in conn.execute("SELECT key, value FROM meta")}
+        finally:
+            conn.close()
+    except (sqlite3.Error, ValueError):
+        return None
+    if meta.get('version') != STORE_VERSION:
+        return None
+    return meta
+
+
+def database_is_fresh(csv_path, meta):
+    # Same rule as the binary cache: size and mtime, then the content digest
+    # if only the mtime changed.
+    state = data_cache.source_state(csv_path)
+    if meta['source_size'] != state['size']:
+        return False
+    return meta['source_mtime_ns'] == state['mtime_ns'] or data_cache.file_digest(csv_path) == meta['source_sha1']
+
+
+class SqlStore:
+    # A read-only handle on the database. SQLite connections belong to the
+    # thread that opened them, so each thread gets its own; pickling (for
+    # worker processes) keeps only the path.
+    def __init__(self, db_path, meta):
+        self.db_path = db_path
+        self.meta = meta
+        self.fingerprint = f"sqlite:{meta['source_sha1']}"
+        self._local = threading.local()
+
+    def connection(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = self._local.conn = sqlite3.connect(f"file:{self.db_path}?mode=ro", uri=True)
+        return conn
+
+    def query(self, sql, params=()):
+        return pd.read_sql_query(sql, self.connection(), params=list(params))
+
+    def __getstate__(self):
+        return {'db_path': self.db_path, 'meta': self.meta}
+
+    def __setstate__(self, state):
+        self.__init__(state['db_path'], state['meta'])
+
+
+class SqlCube(sales_cube.SalesCube):
+    # The SalesCube interface answered by SQL over the cells and titles
+    # tables: rollups, platform-year sums and per-entity yearly series are
+    # GROUP BY queries, and filtered() adds WHERE clauses instead of copying
+    # cells. frame and titles are only read into memory when something asks
+    # for them, such as the filter controls' year range.
+    def __init__(self, store, filters=None):
+        self.store = store
+        self.filters = filters or {}
+        self.trends = {}
+        self.version = 0
+        self.emptied = 0
+        self._frame = None
+        self._titles = None
+
+    def __getstate__(self):
+        return {'store': self.store, 'filters': self.filters, 'trends': self.trends}
+
+    def __setstate__(self, state):
+        self.__init__(state['store'], state['filters'])
+        self.trends = state['trends']
+
+    def _where(self, conditions=(), params=(), titles=False):
+        # Titles carry no platform, genre or publisher, so like SalesCube they
+        # are narrowed by year only.
+        conditions = list(conditions)
+        params = list(params)
+        years = self.filters.get('years')
+        if years is not None:
+            conditions.append("Year_of_Release BETWEEN ? AND ?")
+            params.extend(years)
+        if not titles:
+            for field, col in (('platforms', 'Platform'), ('genres', 'Genre'), ('publishers', 'Publisher')):
+                values = self.filters.get(field)
+                if values is not None:
+                    conditions.append(f"{col} IN ({', '.join('?' * len(values))})" if len(values) else "0")
+                    params.extend(values)
+        clause = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+        return clause, params
+
+    def _query(self, sql, params=()):
+        with tracing.span('sql_store.query'):
+            result = self.store.query(sql, params)
+        # SQLite returns integer years and, for empty results, untyped
+        # columns; match the in-memory cube's dtypes.
+        if 'Year_of_Release' in result.columns:
+            result['Year_of_Release'] = result['Year_of_Release'].astype('float64')
+        for m in result.columns.intersection(list(MEASURE_SQL)):
+            result[m] = result[m].astype('int64' if m in INT_MEASURES else 'float64')
+        return result
+
+    @property
+    def frame(self):
+        if self._frame is None:
+            where, params = self._where()
+            self._frame = self._query(f"SELECT * FROM cells {where} ORDER BY First_Row", params)
+        return self._frame
+
+    @frame.setter
+    def frame(self, frame):
+        self._frame = frame
+
+    @property
+    def titles(self):
+        if self._titles is None:
+            where, params = self._where(titles=True)
+            self._titles = self._query(f"SELECT * FROM titles {where} ORDER BY First_Row", params)
+        return self._titles
+
+    @titles.setter
+    def titles(self, titles):
+        self._titles = titles
+
+    def filtered(self, years=None, platforms=None, genres=None, publishers=None):
+        # Filters on top of existing ones narrow them, as filtering an already
+        # filtered SalesCube would.
+        filters = dict(self.filters)
+        if years is not None:
+            low, high = years
+            if 'years' in filters:
+                low, high = max(low, filters['years'][0]), min(high, filters['years'][1])
+            filters['years'] = (low, high)
+        for field, values in (('platforms', platforms), ('genres', genres), ('publishers', publishers)):
+            if values is not None:
+                values = list(values)
+                if field in filters:
+                    values = [v for v in values if v in set(filters[field])]
+                filters[field] = values
+        return SqlCube(self.store, filters)
+
+    def values(self, col):
+        where, params = self._where([f"{col} IS NOT NULL"])
+        return self._query(f"SELECT DISTINCT {col} FROM cells {where} ORDER BY {col}", params)[col].tolist()
+
+    def rollup(self, by, measures=None):
+        measures = measures or list(sales_cube.MEASURES)
+        keys = [by] if isinstance(by, str) else list(by)
+        key_sql = ', '.join(keys)
+        select = ', '.join(f"{ROLLUP_SQL[sales_cube.MEASURES[m]].format(m)} AS {m}" for m in measures)
+        where, params = self._where([f"{k} IS NOT NULL" for k in keys])
+        result = self._query(f"SELECT {key_sql}, {select} FROM cells {where} GROUP BY {key_sql} ORDER BY {key_sql}", params)
+        return result.set_index(by)
+
+    def platform_year_sales(self):
+        where, params = self._where(["Sales_Count > 0", "Platform IS NOT NULL", "Year_of_Release IS NOT NULL"])
+        sales = self._query(
+            f"SELECT Platform, Year_of_Release, TOTAL(Global_Sales) AS Global_Sales FROM cells {where} "
+            f"GROUP BY Platform, Year_of_Release ORDER BY Platform, Year_of_Release",
+            params,
+        )
+        sales['Year_of_Release'] = sales['Year_of_Release'].astype(int)
+        return sales
+
+    def entity_yearly(self, group_col, min_year=None, entities=None):
+        titles = group_col == 'Name'
+        conditions = ["Sales_Count > 0", f"{group_col} IS NOT NULL", "Year_of_Release IS NOT NULL"]
+        params = []
+        if entities is not None:
+            entities = list(entities)
+            conditions.append(f"{group_col} IN ({', '.join('?' * len(entities))})" if entities else "0")
+            params.extend(entities)
+        if min_year is not None:
+            conditions.append("Year_of_Release >= ?")
+            params.append(min_year)
+        where, params = self._where(conditions, params, titles=titles)
+        yearly = self._query(
+            f"SELECT {group_col}, Year_of_Release, TOTAL(Global_Sales) AS Global_Sales, MIN(First_Row) AS First_Row "
+            f"FROM {'titles' if titles else 'cells'} {where} GROUP BY {group_col}, Year_of_Release",
+            params,
+        )
+        return sales_cube.first_seen_order(yearly, group_col)
+
+
+@tracing.traced('sql_store.open')
+def open_cube(csv_path, db_path=None, progress=None):
+    # Builds the database on first use (or when the CSV changed); later starts
+    # only open it, without parsing the CSV. progress is passed to
+    # build_database.
+    db_path = db_path or default_db_path(csv_path)
+    meta = read_meta(db_path)
+    if meta is None or not database_is_fresh(csv_path, meta):
+        print(">>> Building SQLite sales store (one-time conversion)...")
+        meta = build_database(csv_path, db_path, progress=progress)
+    return SqlCube(SqlStore(db_path, meta))
+
+
+if __name__ == "__main__":
+    script_dir = os.path.dirname(os.path.abspath(__file__))
+    csv_path = sys.argv[1] if len(sys.argv) > 1 else os.path.join(script_dir, 'Video_Games_Sales_as_at_22_Dec_2016.csv')
+
+    start = time.perf_counter()
+    meta = build_database(csv_path)
+    print(f"Built {default_db_path(csv_path)}: {meta['rows']:,} rows in {time.perf_counter() - start:.2f}s")
+
+    start = time.perf_counter()
+    cube = open_cube(csv_path)
+    print(f"Opened in {(time.perf_counter() - start) * 1000:.1f} ms")
+    for name, query in (
+        ('publisher_stats', cube.publisher_stats),
+        ('platform_year_sales', cube.platform_year_sales),
+        ('genre_means', cube.genre_means),
+        ('entity_yearly(Name)', lambda: cube.entity_yearly('Name', min_year=2010)),
+    ):
+        start = time.perf_counter()
+        result = query()
+        print(f"    {name:<22} {len(result):>7,} rows in {(time.perf_counter() - start) * 1000:8.1f} ms")
\ No newline at end of file
@@ -0,0 +1,76 @@
+import os
+import sys
+import json
+import time
+import subprocess
+
+# Third-party dependencies in the order the dashboard modules pull them in.
+DEPENDENCIES = [
+    'numpy',
+    'pandas',
+    'matplotlib',
+    'matplotlib.pyplot',
+    'seaborn',
+    'shapely',
+    'geopandas',
+]
+
+ANALYSIS_MODULES = ['heat', 'scatter', 'line', 'bar', 'ml_predict']
+
+_MEASURE_SNIPPET = (
+    "import sys, time\n"
+    "start = time.perf_counter()\n"
+    "import {name}\n"
+    "sys.stdout.write(repr(time.perf_counter() - start))\n"
+)
+
+
+def measure_import(name, cwd=None):
+    # Each import is timed in a fresh interpreter so earlier imports in this
+    # process (or a pre-warm thread) do not hide its real cost.
+    result = subprocess.run(
+        [sys.executable, '-c', _MEASURE_SNIPPET.format(name=name)],
+        cwd=cwd,
+        capture_output=True,
+        text=True,
+    )
+    if result.returncode != 0:
+        return None
+    return float(result.stdout.strip())
+
+
+def collect_import_costs(names=None, cwd=None):
+    cwd = cwd or os.path.dirname(os.path.abspath(__file__))
+    names = names or DEPENDENCIES + ANALYSIS_MODULES
+    return {name: measure_import(name, cwd=cwd) for name in names}
+
+
+def format_report(costs, startup_timings=None):
+    lines = ["=== STARTUP TIME REPORT ==="]
+    if startup_timings:
+        for label, seconds in startup_timings.items():
+            lines.append(f"  {label:<28} {seconds * 1000:9.1f} ms")
+        lines.append("")
+    lines.append(f"  {'Import (fresh interpreter)':<28} {'Cost':>12}")
+    for name, seconds in costs.items():
+        cost = "not installed" if seconds is None else f"{seconds * 1000:9.1f} ms"
+        lines.append(f"  {name:<28} {cost:>12}")
+    return "\n".join(lines)
+
+
+def write_report(path, costs, startup_timings=None):
+    record = {
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'python': sys.version.split()[0],
+        'startup': startup_timings or {},
+        'imports': costs,
+    }
+    with open(path, 'a') as f:
+        f.write(json.dumps(record) + "\n")
+
+
+if __name__ == "__main__":
+    costs = collect_import_costs()
+    print(format_report(costs))
+    if len(sys.argv) > 1:
+        write_report(sys.argv[1], costs)
\ No newline at end of file
@@ -0,0 +1,90 @@
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+import pytest
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT_DIR)
+
+import data_cache
+import sales_cube
+
+SOURCE_CSV = os.path.join(ROOT_DIR, 'Video_Games_Sales_as_at_22_Dec_2016.csv')
+
+
+@pytest.fixture(scope='session')
+def csv_path():
+    return SOURCE_CSV
+
+
+@pytest.fixture(scope='session')
+def raw(csv_path):
+    # The CSV as pd.read_csv gives it, with the "tbd" user scores coerced.
+    df = pd.read_csv(csv_path)
+    df['User_Score'] = pd.to_numeric(df['User_Score'], errors='coerce')
+    return df
+
+
+@pytest.fixture(scope='session')
+def cache_dir(tmp_path_factory):
+    # Caches built by the tests stay out of the repository's .greenlight_cache.
+    return str(tmp_path_factory.mktemp('cache') / 'dataset')
+
+
+@pytest.fixture(scope='session')
+def frame(csv_path, cache_dir):
+    return data_cache.load_dataset(csv_path, cache_dir=cache_dir)
+
+
+@pytest.fixture
+def cube(frame):
+    # A fresh cube per test, since delta updates edit theirs in place.
+    return sales_cube.build_cube(frame)
+
+
+def _keyed(table, keys):
+    # Cube table rows labelled by their key values, missing keys as None and
+    # years as floats, so tables built from differently typed sources line up.
+    labels = []
+    for col in keys:
+        values = table[col].astype(object)
+        if col == 'Year_of_Release':
+            values = values.map(lambda v: None if pd.isna(v) else float(v))
+        labels.append(values.where(table[col].notna(), None).map(repr).to_numpy())
+    index = pd.Index(['|'.join(parts) for parts in zip(*labels)]) if labels else pd.Index([])
+    return table.set_axis(index).sort_index()
+
+
+def assert_tables_equal(left, right, keys, measures):
+    left, right = _keyed(left, keys), _keyed(right, keys)
+    assert left.index.is_unique and right.index.is_unique
+    assert list(left.index) == list(right.index)
+    for m in measures:
+        np.testing.assert_allclose(
+            left[m].to_numpy(dtype='float64'), right[m].to_numpy(dtype='float64'), rtol=1e-6, err_msg=m,
+        )
+
+
+def assert_cubes_equal(left, right):
+    assert_tables_equal(left.frame, right.frame, sales_cube.CUBE_KEYS, sales_cube.MEASURES)
+    assert_tables_equal(left.titles, right.titles, sales_cube.TITLE_KEYS, sales_cube.TITLE_MEASURES)
+
+
+def assert_frames_match(left, right):
+    # Same rows and values, whatever the dtypes (categorical or object text,
+    # nullable or float numbers).
+    assert list(left.columns) == list(right.columns)
+    assert len(left) == len(right)
+    for col in left.columns:
+        a, b = left[col], right[col]
+        if pd.api.types.is_numeric_dtype(a.dtype) and pd.api.types.is_numeric_dtype(b.dtype):
+            np.testing.assert_allclose(
+                a.to_numpy(dtype='float64', na_value=np.nan), b.to_numpy(dtype='float64', na_value=np.nan),
+                rtol=1e-6, equal_nan=True, err_msg=col,
+            )
+        else:
+            a = a.astype(object).where(a.notna(), None).to_numpy()
+            b = b.astype(object).where(b.notna(), None).to_numpy()
+            assert list(a) == list(b), col
\ No newline at end of file
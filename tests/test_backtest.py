@@ -0,0 +1,77 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+import backtest
+
+
+def replay(raw, group_col, cutoff, train_years):
+    # One cutoff's forecasts the slow way: a straight line through each
+    # entity's yearly sales in the training window, evaluated at cutoff + 1.
+    rows = raw.dropna(subset=['Year_of_Release', 'Global_Sales', group_col])
+    yearly = rows.groupby([group_col, 'Year_of_Release'])['Global_Sales'].sum().reset_index()
+    years = yearly['Year_of_Release']
+    train = yearly[(years > cutoff - train_years) & (years <= cutoff)]
+    actual = yearly[years == cutoff + 1].set_index(group_col)['Global_Sales']
+    forecasts = {}
+    for entity, table in train.groupby(group_col):
+        if len(table) < 2:
+            continue
+        slope, intercept = np.polyfit(table['Year_of_Release'], table['Global_Sales'], 1)
+        forecasts[entity] = (intercept + slope * (cutoff + 1), actual.get(entity, 0.0))
+    return pd.DataFrame.from_dict(forecasts, orient='index', columns=['Predicted', 'Actual'])
+
+
+def test_train_years_follow_the_data(cube):
+    last_year = int(cube.frame['Year_of_Release'].max())
+    assert backtest.default_train_years(cube) == last_year - backtest.ml_predict.TRAIN_START_YEAR + 1
+
+
+@pytest.mark.parametrize('cutoff', [2008, 2013])
+def test_score_cutoff_matches_replay(raw, cube, cutoff):
+    train_years = 5
+    yearly = backtest.yearly_tables(cube, [cutoff], train_years)
+    errors = backtest.score_cutoff(yearly, cutoff, train_years)
+    assert (errors['Cutoff'] == cutoff).all()
+    np.testing.assert_allclose(errors['Error'], errors['Predicted'] - errors['Actual'])
+
+    for group_col in ('Platform', 'Genre', 'Publisher'):
+        scored = errors[errors['Group'] == group_col].set_index('Entity')
+        expected = replay(raw, group_col, cutoff, train_years)
+        assert sorted(scored.index) == sorted(expected.index)
+        scored = scored.loc[expected.index]
+        np.testing.assert_allclose(scored['Predicted'], expected['Predicted'], rtol=1e-5, atol=1e-5)
+        np.testing.assert_allclose(scored['Actual'], expected['Actual'], rtol=1e-5, atol=1e-5)
+
+
+def test_wape_skips_entities_that_sold_nothing():
+    errors = pd.DataFrame({
+        'Group': ['Name'] * 4 + ['Genre'] * 2,
+        'Predicted': [3.0, 1.0, 0.5, 2.0, 4.0, 6.0],
+        'Actual': [2.0, 2.0, 0.0, 0.0, 5.0, 5.0],
+    })
+    errors['Error'] = errors['Predicted'] - errors['Actual']
+    metrics = backtest.error_metrics(errors, ['Group']).set_index('Group')
+
+    assert metrics.at['Name', 'Forecasts'] == 4
+    # MAE and bias count the forecasts against zero; WAPE does not.
+    assert metrics.at['Name', 'MAE'] == pytest.approx((1 + 1 + 0.5 + 2) / 4)
+    assert metrics.at['Name', 'Bias'] == pytest.approx((1 - 1 + 0.5 + 2) / 4)
+    assert metrics.at['Name', 'RMSE'] == pytest.approx(np.sqrt((1 + 1 + 0.25 + 4) / 4))
+    assert metrics.at['Name', 'WAPE'] == pytest.approx(2 / 4)
+    assert metrics.at['Genre', 'WAPE'] == pytest.approx(2 / 10)
+
+
+def test_wape_without_sales_is_undefined():
+    errors = pd.DataFrame({'Group': ['Name', 'Name'], 'Predicted': [1.0, 2.0], 'Actual': [0.0, 0.0]})
+    errors['Error'] = errors['Predicted'] - errors['Actual']
+    metrics = backtest.error_metrics(errors, ['Group'])
+    assert np.isnan(metrics.at[0, 'WAPE'])
+    assert metrics.at[0, 'MAE'] == pytest.approx(1.5)
+
+
+def test_worker_processes_match_one_process(cube):
+    serial = backtest.run_backtest(cube, cutoffs=[2009, 2012], jobs=1)
+    parallel = backtest.run_backtest(cube, cutoffs=[2009, 2012], jobs=2)
+    pd.testing.assert_frame_equal(serial['errors'], parallel['errors'])
+    pd.testing.assert_frame_equal(serial['summary'], parallel['summary'])
\ No newline at end of file
@@ -0,0 +1,78 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+import bootstrap
+
+
+@pytest.fixture(scope='module')
+def groups():
+    # Three groups of very different sizes, with y correlated to x.
+    rng = np.random.default_rng(7)
+    codes = np.repeat([2, 0, 5], [40, 600, 6000])
+    x = rng.normal(70, 10, len(codes))
+    y = 0.05 * x + rng.normal(0, 0.5, len(codes))
+    return codes, x, y
+
+
+def normal_half_width(x, confidence=bootstrap.CONFIDENCE):
+    # The mean's interval half-width under the normal approximation, which
+    # the bootstrap of a large group should come close to.
+    z = {0.95: 1.959964}[confidence]
+    return z * x.std() / np.sqrt(len(x))
+
+
+def test_point_estimates_match_groupby(groups):
+    codes, x, y = groups
+    intervals = bootstrap.bootstrap_groups(codes, x, y, resamples=200)
+    frame = pd.DataFrame({'code': codes, 'x': x, 'y': y})
+    grouped = frame.groupby('code')
+    assert list(intervals.index) == [0, 2, 5]
+    assert list(intervals['Count']) == [600, 40, 6000]
+    np.testing.assert_allclose(intervals['X_Mean'], grouped['x'].mean())
+    np.testing.assert_allclose(intervals['Y_Mean'], grouped['y'].mean())
+    np.testing.assert_allclose(intervals['R'], grouped.apply(lambda g: g['x'].corr(g['y'])))
+    for name in ('X_Mean', 'Y_Mean', 'R'):
+        assert (intervals[f'{name}_Low'] <= intervals[name]).all()
+        assert (intervals[name] <= intervals[f'{name}_High']).all()
+
+
+def test_fixed_seed_repeats(groups):
+    codes, x, y = groups
+    first = bootstrap.bootstrap_groups(codes, x, y, resamples=300)
+    pd.testing.assert_frame_equal(first, bootstrap.bootstrap_groups(codes, x, y, resamples=300))
+    assert not first.equals(bootstrap.bootstrap_groups(codes, x, y, resamples=300, seed=1))
+
+
+def test_groups_are_resampled_separately(groups):
+    codes, x, _ = groups
+    intervals = bootstrap.bootstrap_groups(codes, x)
+    for code in (0, 2, 5):
+        rows = x[codes == code]
+        width = (intervals.at[code, 'X_Mean_High'] - intervals.at[code, 'X_Mean_Low']) / 2
+        assert width == pytest.approx(normal_half_width(rows), rel=0.15)
+
+
+def test_large_groups_drawn_m_out_of_n_keep_their_width(groups, monkeypatch):
+    # With only 100 draws per resample, the 6000-row group's spread is scaled
+    # from 100 rows back to 6000, so its interval matches the full bootstrap.
+    codes, x, _ = groups
+    full = bootstrap.bootstrap_groups(codes, x)
+    monkeypatch.setattr(bootstrap, 'GROUP_DRAWS', 100)
+    drawn = bootstrap.bootstrap_groups(codes, x)
+
+    np.testing.assert_allclose(drawn['X_Mean'], full['X_Mean'])
+    widths = (drawn['X_Mean_High'] - drawn['X_Mean_Low']) / (full['X_Mean_High'] - full['X_Mean_Low'])
+    assert widths.to_numpy() == pytest.approx(1, rel=0.15)
+    rows = x[codes == 5]
+    assert (drawn.at[5, 'X_Mean_High'] - drawn.at[5, 'X_Mean_Low']) / 2 == pytest.approx(normal_half_width(rows), rel=0.15)
+
+
+def test_single_row_and_empty_groups():
+    intervals = bootstrap.bootstrap_groups([3, 3, 8], [1.0, 2.0, 5.0], [1.0, 2.0, 5.0], resamples=100)
+    # One row: the mean cannot move and the correlation is undefined.
+    assert intervals.at[8, 'X_Mean_Low'] == intervals.at[8, 'X_Mean_High'] == 5.0
+    assert np.isnan(intervals.at[8, 'R_Low'])
+
+    empty = bootstrap.bootstrap_groups(np.array([], dtype=np.int64), np.array([]), resamples=10)
+    assert len(empty) == 0 and 'X_Mean_Low' in empty
\ No newline at end of file
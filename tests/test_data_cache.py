@@ -0,0 +1,63 @@
+import os
+import shutil
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import data_cache
+from conftest import assert_frames_match
+
+
+@pytest.fixture
+def csv_copy(csv_path, tmp_path):
+    path = tmp_path / 'sales.csv'
+    shutil.copyfile(csv_path, path)
+    return str(path)
+
+
+def test_plain_round_trip_matches_read_csv(raw, csv_path, cache_dir, frame):
+    plain = data_cache.load_dataset(csv_path, cache_dir=cache_dir, compact=False)
+    assert_frames_match(plain, raw)
+    # Two-decimal sales come back exactly, not as their float32 neighbours.
+    assert np.array_equal(plain['Global_Sales'].to_numpy(), raw['Global_Sales'].to_numpy(), equal_nan=True)
+
+
+def test_compact_round_trip_matches_prepare_frame(raw, frame):
+    prepared = data_cache.prepare_frame(raw)
+    assert_frames_match(frame, prepared)
+    assert {col: str(dtype) for col, dtype in frame.dtypes.items()} == {col: str(dtype) for col, dtype in prepared.dtypes.items()}
+
+
+def test_compact_floats_are_read_only_memory_maps(frame):
+    values = frame['Global_Sales'].to_numpy()
+    assert values.dtype == np.float32
+    assert not values.flags.writeable
+    base = values
+    while getattr(base, 'base', None) is not None and not isinstance(base, np.memmap):
+        base = base.base
+    assert isinstance(base, np.memmap)
+
+
+def test_touched_csv_keeps_cache(csv_copy, tmp_path):
+    cache_dir = str(tmp_path / 'cache')
+    data_cache.load_dataset(csv_copy, cache_dir=cache_dir)
+    stat = os.stat(csv_copy)
+    os.utime(csv_copy, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+
+    meta = data_cache.read_meta(cache_dir)
+    assert data_cache.cache_is_fresh(csv_copy, cache_dir, meta)
+    assert data_cache.read_meta(cache_dir)['source_mtime_ns'] == stat.st_mtime_ns + 10**9
+    assert not os.path.exists(os.path.join(cache_dir, 'meta.json.tmp'))
+
+
+def test_changed_csv_rebuilds_cache(csv_copy, tmp_path):
+    cache_dir = str(tmp_path / 'cache')
+    before = data_cache.load_dataset(csv_copy, cache_dir=cache_dir)
+    with open(csv_copy, 'a') as f:
+        f.write("Extra Title,PS4,2016,Action,Someone,1.0,0,0,0,1.0,,,,,,\n")
+
+    assert not data_cache.cache_is_fresh(csv_copy, cache_dir, data_cache.read_meta(cache_dir))
+    after = data_cache.load_dataset(csv_copy, cache_dir=cache_dir)
+    assert len(after) == len(before) + 1
+    assert after['Name'].iloc[-1] == 'Extra Title'
\ No newline at end of file
@@ -0,0 +1,130 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+import delta
+import ml_predict
+import sales_cube
+import title_search
+from conftest import assert_cubes_equal, assert_frames_match
+
+TREND_COLUMNS = ['Platform', 'Name', 'Genre', 'Publisher']
+
+
+def make_delta(raw, step):
+    # Changed sales and scores for existing rows, some moved to a new
+    # publisher or year, plus new titles (a few in a new genre) and, after the
+    # first step, changes to titles inserted by the step before.
+    unique = raw.drop_duplicates(['Name', 'Platform'], keep=False).dropna(subset=['Name'])
+    updates = unique.sample(50, random_state=step).copy()
+    updates['Global_Sales'] = updates['Global_Sales'] * 3
+    updates['Critic_Score'] = 99
+    updates.loc[updates.index[:5], 'Publisher'] = f'Brand New Publisher {step}'
+    updates.loc[updates.index[5:10], 'Year_of_Release'] = 2001
+    updates.loc[updates.index[10:12], 'Critic_Score'] = np.nan
+
+    def new_titles(seed, year):
+        rows = raw.sample(20, random_state=seed).copy()
+        rows['Name'] = rows['Name'].astype(str) + ' II'
+        rows['Year_of_Release'] = year
+        return rows
+
+    inserts = new_titles(100 + step, 2015)
+    inserts.loc[inserts.index[:3], 'Genre'] = 'Brand New Genre'
+    parts = [updates, inserts]
+    if step:
+        earlier = new_titles(100 + step - 1, 2014)
+        earlier['Global_Sales'] = 0.01
+        parts.append(earlier.iloc[:6])
+    return pd.concat(parts)
+
+
+@pytest.mark.parametrize('compact_rows', [None, 60])
+def test_updates_equal_full_rebuild(raw, frame, cube, monkeypatch, compact_rows):
+    # With compact_rows set the buffer is folded on every other update, so
+    # both the buffered and the folded paths are covered.
+    if compact_rows is not None:
+        monkeypatch.setattr(delta, 'COMPACT_ROWS', compact_rows)
+        monkeypatch.setattr(delta, 'COMPACT_FRACTION', 0)
+    for col in TREND_COLUMNS:
+        ml_predict.entity_trends(cube, col)
+    updater = delta.DeltaUpdater(frame, cube)
+
+    compacted = []
+    for step in range(4):
+        summary = updater.apply(make_delta(raw, step))
+        compacted.append(summary['compacted'])
+        assert summary['inserted'] == 20
+        rebuilt = sales_cube.build_cube(updater.frame())
+        assert_cubes_equal(cube.filtered(), rebuilt)
+        for col in TREND_COLUMNS:
+            top, expected = ml_predict.get_top_predictions(cube, col), ml_predict.get_top_predictions(rebuilt, col)
+            assert list(top[col]) == list(expected[col])
+            np.testing.assert_allclose(top['Predicted_Sales'], expected['Predicted_Sales'])
+    assert any(compacted) == (compact_rows is not None)
+    assert len(updater.frame()) == len(frame) + 80
+
+
+def test_trends_are_fitted_where_updates_apply(raw, frame, cube):
+    # A cube whose modules ran in worker processes has no fits of its own.
+    updater = delta.DeltaUpdater(frame, cube)
+    updater.apply(make_delta(raw, 0))
+    assert set(cube.trends) == {(col, ml_predict.TRAIN_START_YEAR) for col in TREND_COLUMNS}
+    summary = updater.apply(make_delta(raw, 1))
+    rebuilt = sales_cube.build_cube(updater.frame())
+    for col in TREND_COLUMNS:
+        refit = cube.trends[(col, ml_predict.TRAIN_START_YEAR)].set_index(col)
+        fresh = ml_predict.entity_trends(rebuilt, col).set_index(col)
+        entities = sorted(summary['affected'][col] & set(fresh.index))
+        np.testing.assert_allclose(refit.loc[entities, 'Slope'], fresh.loc[entities, 'Slope'])
+
+
+def test_emptied_keys_wait_for_compact(raw, frame, cube):
+    # Every row of one publisher moves to another, then half of them back.
+    publisher = 'Activision Blizzard'
+    rows = raw[raw['Publisher'] == publisher]
+    updater = delta.DeltaUpdater(frame, cube)
+    cell_index, title_index = updater.cell_index, updater.title_index
+
+    updater.apply(rows.assign(Publisher='Nintendo'))
+    # The emptied cells stay in the table, and its index is not rebuilt.
+    assert updater.cell_index is cell_index and updater.title_index is title_index
+    assert cube.emptied == len(updater.emptied_cells) > 0
+    rebuilt = sales_cube.build_cube(updater.frame())
+    assert_cubes_equal(cube.filtered(), rebuilt)
+    assert publisher not in cube.values('Publisher')
+    pd.testing.assert_frame_equal(cube.publisher_stats(), rebuilt.publisher_stats(), check_dtype=False)
+
+    updater.apply(rows.iloc[::2])
+    assert_cubes_equal(cube.filtered(), sales_cube.build_cube(updater.frame()))
+    assert publisher in cube.values('Publisher')
+
+    updater.compact()
+    assert cube.emptied == 0 and not updater.emptied_cells
+    assert_cubes_equal(cube, sales_cube.build_cube(updater.frame()))
+
+
+def test_overlay_rebuilds_current_frame(raw, frame, cube):
+    updater = delta.DeltaUpdater(frame, cube)
+    for step in range(2):
+        updater.apply(make_delta(raw, step))
+    assert_frames_match(delta.overlay_frame(frame, updater.overlay()), updater.frame())
+    # The published frame itself is left alone.
+    assert len(frame) == len(raw)
+
+
+def test_title_index_update_matches_rebuild(raw, frame, cube):
+    updater = delta.DeltaUpdater(frame, cube)
+    index = title_search.TitleIndex(frame)
+    for step in range(3):
+        summary = updater.apply(make_delta(raw, step))
+        index.update(summary['rows'], updater.take)
+
+    fresh = title_search.TitleIndex(updater.frame())
+    assert len(index) == len(fresh)
+    for query in ['mario', 'ii', 'call of duty', 'fifa', 'z']:
+        found, expected = index.search(query), fresh.search(query)
+        # Equal sales may rank in either order.
+        np.testing.assert_allclose(index.key_sales[found], fresh.key_sales[expected])
+        rows = index.lookup(query)
+        assert sorted(rows['Name'].astype(str)) == sorted(fresh.lookup(query)['Name'].astype(str))
\ No newline at end of file
@@ -0,0 +1,83 @@
+import os
+import types
+
+import matplotlib
+matplotlib.use('Agg')
+import matplotlib.pyplot as plt
+import pytest
+
+import figure_cache
+import result_cache
+
+
+def make_module(path):
+    # A stand-in analysis module whose source file is path.
+    path.write_text("# analysis module\n")
+    module = types.ModuleType('fake_module')
+    module.__file__ = str(path)
+
+    def compute(df, cube=None, mode='dots'):
+        return {'values': [1, 3, 2]}
+
+    def render(results, figsize=(14, 10)):
+        fig, ax = plt.subplots(figsize=figsize)
+        ax.plot(results['values'])
+        return fig
+
+    module.compute = compute
+    module.render = render
+    return module
+
+
+@pytest.fixture
+def module(tmp_path):
+    return make_module(tmp_path / 'fake_module.py')
+
+
+def key(module, fingerprint='data', params=None, figsize=None, dpi=figure_cache.RENDER_DPI):
+    resolved = result_cache.compute_params(module, params)
+    return figure_cache.figure_key(fingerprint, module, resolved, figsize, dpi)
+
+
+def test_key_follows_size_dpi_data_and_params(module):
+    base = key(module)
+    # No size asked for is the module's default size.
+    assert key(module, figsize=(14, 10)) == base
+    assert figure_cache.render_size(module) == (14, 10)
+    assert key(module, figsize=(8, 6)) != base
+    assert key(module, dpi=200) != base
+    assert key(module, fingerprint='other') != base
+    assert key(module, params={'mode': 'density'}) != base
+    # Figures and results never share a key.
+    assert base != result_cache.make_key('data', module.__name__, result_cache.compute_params(module))
+
+
+def test_key_follows_module_source(module, tmp_path):
+    before = key(module)
+    path = tmp_path / 'fake_module.py'
+    stat = os.stat(path)
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+    assert key(module) != before
+
+
+def test_rasterize_draws_at_the_requested_size(module):
+    png = figure_cache.rasterize(module, module.compute(None), figsize=(4, 3), dpi=50)
+    assert png.startswith(b'\x89PNG')
+    # Width and height from the IHDR chunk: inches times DPI.
+    assert (int.from_bytes(png[16:20], 'big'), int.from_bytes(png[20:24], 'big')) == (200, 150)
+    assert plt.get_fignums() == []
+
+
+def test_cache_round_trip_and_budget(tmp_path):
+    cache = figure_cache.FigureCache(str(tmp_path / 'figures'), disk_budget=250)
+    assert cache.get('a') is None and 'a' not in cache
+    for name in ('a', 'b', 'c'):
+        cache.put(name, name.encode() * 100)
+        os.utime(cache._path(name), (1000 + ord(name), 1000 + ord(name)))
+    cache.put('d', b'd' * 100)
+    # Over budget: the least recently used figures go first.
+    assert [name for name in 'abcd' if name in cache] == ['c', 'd']
+    assert cache.get('d') == b'd' * 100
+    assert (cache.hits, cache.misses) == (1, 1)
+    cache.clear()
+    assert os.listdir(tmp_path / 'figures') == []
\ No newline at end of file
@@ -0,0 +1,108 @@
+import types
+
+import matplotlib
+matplotlib.use('Agg')
+import matplotlib.pyplot as plt
+import pytest
+
+import filters
+
+PLATFORMS = ['DS', 'PS', 'PS2', 'PS3', 'PSP', 'Wii', 'WiiU']
+
+
+@pytest.mark.parametrize('text, expected', [
+    ('', None),
+    (' , ', None),
+    # A term naming a value exactly selects only that value...
+    ('ps', ['PS']),
+    ('WII', ['Wii']),
+    # ...otherwise every value containing it, in the options' order.
+    ('ps3, ds', ['DS', 'PS3']),
+    ('p', ['PS', 'PS2', 'PS3', 'PSP']),
+    ('i', ['Wii', 'WiiU']),
+    ('xbox', []),
+])
+def test_match_values(text, expected):
+    assert filters.match_values(text, PLATFORMS) == expected
+
+
+def make_module():
+    # A module that counts its computations and records what update() got.
+    module = types.ModuleType('fake_module')
+    module.FILTERS = ['years', 'platforms', 'genres']
+    module.calls = []
+    module.updates = []
+
+    def compute(df, cube=None, filters=None, mode='dots'):
+        module.calls.append((filters, mode))
+        return {'filters': filters}
+
+    def update(fig, results):
+        module.updates.append(results)
+        return False
+
+    module.compute = compute
+    module.update = update
+    return module
+
+
+@pytest.fixture
+def controls(cube):
+    fig = plt.figure()
+    module = make_module()
+    controls = filters.attach(fig, module, cube, params={'mode': 'density'})
+    yield controls
+    plt.close(fig)
+
+
+def test_attach_needs_filters_and_update(cube):
+    fig = plt.figure()
+    module = make_module()
+    del module.update
+    assert filters.attach(fig, module, cube) is None
+    assert filters.attach(fig, types.ModuleType('plain'), cube) is None
+    plt.close(fig)
+
+
+def test_controls_recompute_with_filters(controls, cube):
+    module = controls.module
+    assert controls.fields == ['years', 'platforms', 'genres']
+    assert controls.options['platforms'] == cube.values('Platform')
+
+    controls.on_years((2005.0, 2010.0))
+    controls.on_pick('platforms', 'wii')
+    assert module.calls == [
+        ({'years': (2005, 2010)}, 'density'),
+        ({'years': (2005, 2010), 'platforms': ['Wii']}, 'density'),
+    ]
+    assert module.updates[-1] == {'filters': {'years': (2005, 2010), 'platforms': ['Wii']}}
+    assert controls.describe() == "Filters: 2005-2010; Wii"
+    assert controls.status.get_text().startswith("Filters: 2005-2010; Wii  |  updated in ")
+
+    # Back to the full range and no pickers: no filters at all.
+    years = cube.frame['Year_of_Release']
+    controls.on_years((years.min(), years.max()))
+    controls.on_pick('platforms', '')
+    assert module.calls[-1] == (None, 'density')
+    assert controls.filters == {}
+
+
+def test_seen_filters_reuse_results_until_the_cube_changes(controls, cube):
+    module = controls.module
+    for _ in range(2):
+        controls.on_years((2000, 2004))
+        controls.on_years((2005, 2009))
+    assert len(module.calls) == 2
+    assert len(module.updates) == 4
+
+    cube.version += 1
+    controls.on_years((2000, 2004))
+    assert len(module.calls) == 3
+
+
+def test_describe_counts_and_misses(controls, cube):
+    controls.on_pick('platforms', 'p')
+    controls.on_pick('genres', 'no such genre')
+    matched = len(filters.match_values('p', cube.values('Platform')))
+    assert matched > 3
+    assert controls.describe() == f"Filters: {matched} platforms; no matching genres"
\ No newline at end of file
@@ -0,0 +1,71 @@
+import numpy as np
+import pytest
+import shapely
+
+heat = pytest.importorskip('heat')
+
+SHAPES = {
+    # A ring and an L: most of their bounding boxes lies outside them.
+    'ring': shapely.Point(10, 50).buffer(8).difference(shapely.Point(10, 50).buffer(6)),
+    'l_shape': shapely.Polygon([(0, 0), (20, 0), (20, 2), (2, 2), (2, 20), (0, 20)]),
+    'islands': shapely.MultiPolygon([shapely.box(-20, -10, -10, 0), shapely.box(10, 0, 20, 10)]),
+}
+
+
+@pytest.mark.parametrize('name', sorted(SHAPES))
+def test_every_point_lies_inside(name):
+    geom = SHAPES[name]
+    points = heat.generate_random_points(geom, 5000, np.random.default_rng(1))
+    assert points.shape == (5000, 2)
+    assert shapely.contains_xy(geom, points[:, 0], points[:, 1]).all()
+
+
+def test_points_spread_over_every_part():
+    points = heat.generate_random_points(SHAPES['islands'], 4000, np.random.default_rng(2))
+    # Two islands of equal area get about half of the points each.
+    west = (points[:, 0] < 0).mean()
+    assert west == pytest.approx(0.5, abs=0.05)
+
+
+def test_seeded_rng_repeats():
+    first = heat.generate_random_points(SHAPES['ring'], 100, np.random.default_rng(3))
+    again = heat.generate_random_points(SHAPES['ring'], 100, np.random.default_rng(3))
+    np.testing.assert_array_equal(first, again)
+
+
+def test_nothing_to_draw():
+    assert heat.generate_random_points(shapely.Polygon(), 10).shape == (0, 2)
+    assert heat.generate_random_points(SHAPES['ring'], 0).shape == (0, 2)
+
+
+def test_sliver_stops_after_max_attempts():
+    # A diagonal sliver covers a tiny share of its bounding box: sampling gives
+    # up after MAX_ATTEMPTS_PER_DOT draws per dot, but keeps only real hits.
+    sliver = shapely.LineString([(0, 0), (50, 50)]).buffer(0.01)
+    points = heat.generate_random_points(sliver, 200, np.random.default_rng(4))
+    assert len(points) < 200
+    assert shapely.contains_xy(sliver, points[:, 0], points[:, 1]).all()
+
+def test_region_cells_share_one_region():
+    share = heat.region_cells(shapely.box(-10, -5, 10, 5))
+    assert share.sum() == pytest.approx(1)
+    # 20 x 10 degrees of half-degree cells, all inside the box.
+    assert np.count_nonzero(share) == 40 * 20
+    tiny = heat.region_cells(shapely.box(0.1, 0.1, 0.2, 0.2))
+    assert np.count_nonzero(tiny) == 1 and tiny.sum() == pytest.approx(1)
+
+
+def test_density_spreads_region_sales(cube, monkeypatch):
+    boxes = [shapely.box(-120, 25, -70, 50), shapely.box(-10, 35, 30, 60), shapely.box(130, 31, 140, 40), shapely.box(-70, -40, -40, 0)]
+    regions = [dict(region, geometry=box) for region, box in zip(heat.geo_store.REGION_SETS['sales_regions'], boxes)]
+    store = heat.geo_store.RegionStore(None, None, None, np.array(boxes, dtype=object), {'sales_regions': regions})
+    monkeypatch.setattr(heat.geo_store, 'get_store', lambda allow_download=False: store)
+
+    results = heat.compute(None, cube=cube, mode='density', sales_per_dot=2)
+    sales = cube.genre_region_sales()
+    assert results['genre_dots'] == {}
+    for genre in results['genres']:
+        raster = results['genre_density'][genre]
+        # Smoothing moves density across cells but keeps every region's total.
+        assert raster.sum() == pytest.approx(sales.loc[genre].sum() / 2, rel=1e-4)
+        assert raster[:, :100].sum() == 0
\ No newline at end of file
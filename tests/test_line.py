@@ -0,0 +1,76 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+line = pytest.importorskip('line')
+
+
+def metrics_of(rows):
+    sales = pd.DataFrame(rows, columns=['Platform', 'Year_of_Release', 'Global_Sales'])
+    return line.lifecycle_metrics(*line.lifecycle_matrix(sales)).set_index('Platform')
+
+
+def reference_half_life(yearly, last_year):
+    # Years from the peak until sales first drop to half of it, walking the
+    # years one by one up to the data's last year (a year without releases,
+    # including every one after a platform was discontinued, sells nothing).
+    years = range(int(yearly.index.min()), last_year + 1)
+    sales = [yearly.get(year, 0.0) for year in years]
+    peak = int(np.argmax(sales))
+    half = sales[peak] / 2
+    for i in range(peak + 1, len(sales)):
+        if sales[i] <= half:
+            return i - 1 - peak + (sales[i - 1] - half) / (sales[i - 1] - sales[i])
+    return np.nan
+
+
+def test_hand_computed_lifecycles():
+    metrics = metrics_of([
+        ('A', 2000, 2.0), ('A', 2001, 10.0), ('A', 2002, 8.0), ('A', 2003, 4.0),
+        # No releases in 2001: the decline crosses half the peak that year.
+        ('B', 2000, 6.0), ('B', 2002, 2.0),
+        # Still selling above half its peak.
+        ('C', 2002, 1.0), ('C', 2003, 3.0),
+        # Tied best years: the first is the peak.
+        ('D', 2001, 5.0), ('D', 2002, 5.0), ('D', 2003, 1.0),
+        # Released in 2001 without recorded sales.
+        ('E', 2001, 0.0), ('E', 2002, 3.0),
+    ])
+
+    assert metrics.loc['A', ['Launch_Year', 'Peak_Year', 'Last_Year', 'Years_To_Peak']].tolist() == [2000, 2001, 2003, 1]
+    assert metrics.at['A', 'Decline_Half_Life'] == pytest.approx(1.75)
+    assert metrics.loc['B', ['Launch_Year', 'Last_Year']].tolist() == [2000, 2002]
+    assert metrics.at['B', 'Decline_Half_Life'] == pytest.approx(0.5)
+    assert np.isnan(metrics.at['C', 'Decline_Half_Life'])
+    assert metrics.at['D', 'Peak_Year'] == 2001
+    assert metrics.at['D', 'Decline_Half_Life'] == pytest.approx(1.625)
+    assert metrics.loc['E', ['Launch_Year', 'Peak_Year', 'Years_To_Peak']].tolist() == [2001, 2002, 1]
+
+    np.testing.assert_allclose(metrics['Sales_Share'], metrics['Total_Sales'] / 50)
+    assert metrics['Cumulative_Share'].sort_values().round(6).tolist() == [0.48, 0.7, 0.86, 0.94, 1.0]
+
+
+def test_platforms_in_launch_order(cube):
+    platforms, years, matrix, present = line.lifecycle_matrix(cube.platform_year_sales())
+    launch = years[present.argmax(axis=1)]
+    assert (np.diff(launch) >= 0).all()
+    np.testing.assert_allclose(matrix.sum(), cube.platform_year_sales()['Global_Sales'].sum())
+
+
+def test_half_lives_match_year_by_year_walk(cube):
+    sales = cube.platform_year_sales()
+    metrics = line.lifecycle_metrics(*line.lifecycle_matrix(sales)).set_index('Platform')
+    last_year = int(sales['Year_of_Release'].max())
+    for platform, rows in sales.groupby('Platform'):
+        expected = reference_half_life(rows.set_index('Year_of_Release')['Global_Sales'], last_year)
+        actual = metrics.at[platform, 'Decline_Half_Life']
+        if np.isnan(expected):
+            assert np.isnan(actual), platform
+        else:
+            assert actual == pytest.approx(expected), platform
+
+
+def test_no_platforms():
+    sales = pd.DataFrame({'Platform': [], 'Year_of_Release': np.array([], dtype=int), 'Global_Sales': []})
+    metrics = line.lifecycle_metrics(*line.lifecycle_matrix(sales))
+    assert list(metrics.columns) == line.METRIC_COLUMNS and len(metrics) == 0
\ No newline at end of file
@@ -0,0 +1,58 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+import ml_predict
+
+LinearRegression = pytest.importorskip('sklearn.linear_model').LinearRegression
+
+GROUP_COLUMNS = ['Platform', 'Name', 'Genre', 'Publisher']
+
+
+def per_entity_fits(raw, group_col, min_year=ml_predict.TRAIN_START_YEAR):
+    # The fits ml_predict made before trends were batched: one
+    # LinearRegression per entity over its yearly sums, in first-seen order.
+    recent = raw[raw['Year_of_Release'] >= min_year].dropna(subset=['Year_of_Release', 'Global_Sales'])
+    fits = []
+    for item in recent[group_col].dropna().unique():
+        item_data = recent[recent[group_col] == item]
+        if item_data['Year_of_Release'].nunique() < 2:
+            continue
+        yearly = item_data.groupby('Year_of_Release')['Global_Sales'].sum().reset_index()
+        model = LinearRegression().fit(yearly[['Year_of_Release']].to_numpy(), yearly['Global_Sales'].to_numpy())
+        predicted = model.predict(np.array([[yearly['Year_of_Release'].max() + 1]]))[0]
+        fits.append((item, model.coef_[0], model.intercept_, predicted))
+    return pd.DataFrame(fits, columns=[group_col, 'Slope', 'Intercept', 'Predicted_Sales'])
+
+
+@pytest.mark.parametrize('group_col', ['Platform', 'Genre', 'Publisher'])
+def test_batched_fits_match_per_entity_fits(raw, cube, group_col):
+    trends = ml_predict.entity_trends(cube, group_col).set_index(group_col)
+    expected = per_entity_fits(raw, group_col).set_index(group_col)
+    assert sorted(trends.index) == sorted(expected.index)
+    trends = trends.loc[expected.index]
+    np.testing.assert_allclose(trends['Slope'], expected['Slope'], rtol=1e-5, atol=1e-6)
+    np.testing.assert_allclose(trends['Predicted_Sales'], expected['Predicted_Sales'], rtol=1e-5, atol=1e-6)
+
+
+@pytest.mark.parametrize('group_col', GROUP_COLUMNS)
+def test_top_predictions_match_per_entity_fits(raw, cube, group_col):
+    top = ml_predict.get_top_predictions(cube, group_col)
+    expected = per_entity_fits(raw, group_col)
+    expected = expected[expected['Predicted_Sales'] > 0]
+    expected = expected.sort_values('Predicted_Sales', ascending=False, kind='stable').head(ml_predict.TOP_N)
+    assert list(top[group_col]) == list(expected[group_col])
+    np.testing.assert_allclose(top['Predicted_Sales'], expected['Predicted_Sales'], rtol=1e-5)
+
+
+def test_single_year_entities_are_not_fitted():
+    yearly = pd.DataFrame({
+        'Genre': ['A', 'A', 'B', 'C', 'C', 'C'],
+        'Year_of_Release': [2010.0, 2011.0, 2012.0, 2010.0, 2011.0, 2012.0],
+        'Global_Sales': [1.0, 3.0, 5.0, 6.0, 4.0, 2.0],
+    })
+    trends = ml_predict.fit_trends(yearly, 'Genre').set_index('Genre')
+    assert list(trends.index) == ['A', 'C']
+    np.testing.assert_allclose(trends['Slope'], [2.0, -2.0])
+    np.testing.assert_allclose(trends['Predicted_Sales'], [5.0, 0.0], atol=1e-9)
+    assert list(trends['Last_Year']) == [2011, 2012]
\ No newline at end of file
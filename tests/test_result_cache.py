@@ -0,0 +1,89 @@
+import os
+import types
+
+import result_cache
+
+
+def make_module(path, default=15):
+    # A stand-in analysis module whose source file is path.
+    path.write_text("# analysis module\n")
+    module = types.ModuleType('fake_module')
+    module.__file__ = str(path)
+    calls = []
+
+    def compute(df, cube=None, sales_per_dot=default, mode='dots'):
+        calls.append((sales_per_dot, mode))
+        return {'sales_per_dot': sales_per_dot, 'mode': mode}
+
+    module.compute = compute
+    module.calls = calls
+    return module
+
+
+def key(module, fingerprint='data', params=None):
+    return result_cache.make_key(fingerprint, module.__name__, result_cache.compute_params(module, params))
+
+
+def test_key_follows_dataset_params_and_defaults(tmp_path):
+    module = make_module(tmp_path / 'fake_module.py')
+    base = key(module)
+    assert key(module) == base
+    # Spelling out a default is the same request.
+    assert key(module, params={'sales_per_dot': 15}) == base
+    assert key(module, fingerprint='other') != base
+    assert key(module, params={'mode': 'density'}) != base
+    assert key(make_module(tmp_path / 'fake_module.py', default=1)) != base
+
+
+def test_key_follows_module_source(tmp_path):
+    path = tmp_path / 'fake_module.py'
+    module = make_module(path)
+    before = key(module)
+    stat = os.stat(path)
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+    assert key(module) != before
+
+
+def test_key_follows_cache_token(tmp_path):
+    module = make_module(tmp_path / 'fake_module.py')
+    module.cache_token = lambda: 1
+    before = key(module)
+    module.cache_token = lambda: 2
+    assert key(module) != before
+
+
+def test_spilled_results_survive_a_new_cache(tmp_path):
+    cache = result_cache.ResultCache(str(tmp_path / 'results'), memory_items=1)
+    cache.put('a', {'value': 1})
+    cache.put('b', {'value': 2})
+    # 'a' was spilled to disk when 'b' pushed it out of memory.
+    assert os.path.exists(cache._path('a'))
+    cache.flush()
+
+    fresh = result_cache.ResultCache(str(tmp_path / 'results'))
+    assert fresh.get('a') == {'value': 1} and fresh.get('b') == {'value': 2}
+    assert fresh.get('missing') is None
+    assert (fresh.hits, fresh.misses) == (2, 1)
+
+
+def test_cached_compute_runs_once(tmp_path):
+    module = make_module(tmp_path / 'fake_module.py')
+    cache = result_cache.ResultCache(str(tmp_path / 'results'))
+    for _ in range(3):
+        assert result_cache.cached_compute(cache, 'data', module, None, params={'mode': 'density'}) == {'sales_per_dot': 15, 'mode': 'density'}
+    assert module.calls == [(15, 'density')]
+
+
+def test_evict_to_budget_drops_least_recently_used(tmp_path):
+    for i, name in enumerate(['old', 'middle', 'new']):
+        path = tmp_path / f'{name}.pkl'
+        path.write_bytes(b'x' * 100)
+        os.utime(path, (1000 + i, 1000 + i))
+    (tmp_path / 'other.png').write_bytes(b'x' * 1000)
+
+    result_cache.evict_to_budget(str(tmp_path), '.pkl', 250)
+    assert sorted(os.listdir(tmp_path)) == ['middle.pkl', 'new.pkl', 'other.png']
+    result_cache.evict_to_budget(str(tmp_path), '.pkl', 0)
+    assert os.listdir(tmp_path) == ['other.png']
+    # A cache folder that was never created is left alone.
+    result_cache.evict_to_budget(str(tmp_path / 'missing'), '.pkl', 0)
\ No newline at end of file
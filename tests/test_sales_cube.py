@@ -0,0 +1,67 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+import sales_cube
+from conftest import assert_cubes_equal, assert_tables_equal
+
+FILTERS = [
+    {'years': (2005, 2010)},
+    {'platforms': ['PS2', 'Wii'], 'genres': ['Sports', 'Racing']},
+    {'years': (1995, 2015), 'publishers': ['Nintendo', 'Electronic Arts', 'Sega']},
+]
+
+
+def test_merged_chunks_equal_whole_cube(frame, cube):
+    bounds = [0, 1000, 7000, 12000, len(frame)]
+    parts = [sales_cube.build_cube(frame.iloc[start:stop], row_offset=start) for start, stop in zip(bounds[:-1], bounds[1:])]
+    assert_cubes_equal(sales_cube.merge_cubes(parts), cube)
+
+
+def test_stream_cube_equals_in_memory_cube(csv_path, cube):
+    assert_cubes_equal(sales_cube.stream_cube(csv_path, chunk_rows=5000), cube)
+
+
+@pytest.mark.parametrize('filters', FILTERS)
+def test_filtered_cube_equals_cube_of_filtered_rows(frame, cube, filters):
+    rows = frame[sales_cube.row_mask(frame, **filters)]
+    positions = np.flatnonzero(sales_cube.row_mask(frame, **filters))
+    expected = sales_cube.build_cube(rows, positions=positions)
+    filtered = cube.filtered(**filters)
+    # Titles are narrowed by year only, so only the cells are comparable.
+    assert_tables_equal(filtered.frame, expected.frame, sales_cube.CUBE_KEYS, sales_cube.MEASURES)
+
+
+def test_queries_match_row_level_groupby(raw, cube):
+    stats = cube.publisher_stats().set_index('Publisher')
+    grouped = raw.groupby('Publisher')
+    np.testing.assert_allclose(stats['Total_Revenue'], grouped['Global_Sales'].sum().reindex(stats.index), rtol=1e-5)
+    assert (stats['Game_Count'] == grouped['Name'].count().reindex(stats.index)).all()
+
+    sales = cube.platform_year_sales()
+    expected = raw.dropna(subset=['Year_of_Release', 'Global_Sales']).groupby(['Platform', 'Year_of_Release'])['Global_Sales'].sum()
+    np.testing.assert_allclose(sales.set_index(['Platform', 'Year_of_Release'])['Global_Sales'], expected.to_numpy(), rtol=1e-5)
+
+
+def test_genre_means_skip_rows_without_sales(raw):
+    # Some scored rows lose their sales; the old row-level code dropped them
+    # from both means rather than counting them as selling nothing.
+    rows = raw.copy()
+    scored = rows.index[rows['Critic_Score'].notna()]
+    rows.loc[scored[::7], 'Global_Sales'] = np.nan
+
+    means = sales_cube.build_cube(rows).genre_means().set_index('Genre')
+    expected = rows.dropna(subset=['Critic_Score', 'Global_Sales']).groupby('Genre').agg({
+        'Critic_Score': 'mean',
+        'Global_Sales': 'mean',
+    })
+    assert list(means.index) == list(expected.index)
+    np.testing.assert_allclose(means['Critic_Score'], expected['Critic_Score'])
+    np.testing.assert_allclose(means['Global_Sales'], expected['Global_Sales'])
+
+
+def test_entity_yearly_orders_by_first_row(raw, cube):
+    yearly = cube.entity_yearly('Publisher', min_year=2010)
+    first = yearly.drop_duplicates('Publisher')['Publisher'].tolist()
+    rows = raw[(raw['Year_of_Release'] >= 2010) & raw['Global_Sales'].notna()]
+    assert first == rows['Publisher'].dropna().drop_duplicates().tolist()
\ No newline at end of file
@@ -0,0 +1,132 @@
+import json
+import time
+import asyncio
+import threading
+
+import pytest
+
+service = pytest.importorskip('service')
+import result_cache
+
+
+@pytest.fixture
+def app(cube, tmp_path):
+    app = service.AnalyticsService(cube, 'fingerprint', rows=100, workers=2)
+    # Responses stay out of the repository's .greenlight_cache.
+    app.cache = result_cache.ResultCache(cache_dir=str(tmp_path), memory_items=service.RESPONSE_CACHE_ITEMS)
+    yield app
+    app.close()
+
+
+def parse(module_name, query):
+    extras = dict(service.ENDPOINTS.values())[module_name]
+    return service.parse_params(service.importlib.import_module(module_name), extras, query)
+
+
+def test_equivalent_queries_share_one_form():
+    first = parse('line', {'genres': ['Sports, Racing', 'Sports'], 'years': ['2000-2010']})
+    second = parse('line', {'genres': ['Racing,Sports,'], 'years': [' 2000-2010 ']})
+    assert first == second == {'filters': {'genres': ['Racing', 'Sports'], 'years': (2000, 2010)}}
+    assert parse('ml_predict', {'entity': ['Game'], 'top': ['3'], 'min_year': ['2012']}) == {
+        'top_n': 3, 'min_year': 2012, 'entity': 'game',
+    }
+    assert parse('bar', {}) == {}
+
+
+@pytest.mark.parametrize('text, expected', [
+    ('2005', (2005, 2005)),
+    ('2000-2010', (2000, 2010)),
+    ('-2005', (0, 2005)),
+    ('2010-', (2010, 9999)),
+])
+def test_parse_years(text, expected):
+    assert service.parse_years(text) == expected
+
+
+@pytest.mark.parametrize('module_name, query', [
+    ('line', {'top': ['3']}),
+    ('line', {'years': ['2010-2000']}),
+    ('line', {'years': ['recent']}),
+    ('bar', {'top': ['0']}),
+    ('bar', {'top': ['many']}),
+    ('ml_predict', {'entity': ['console']}),
+    ('ml_predict', {'min_year': ['1800']}),
+])
+def test_bad_queries_are_rejected(module_name, query):
+    with pytest.raises(service.BadRequest):
+        parse(module_name, query)
+
+
+def test_dispatch_statuses(app):
+    async def run():
+        return {
+            'post': await app.dispatch('POST', '/publishers'),
+            'missing': await app.dispatch('GET', '/nowhere'),
+            'bad': await app.dispatch('GET', '/forecast?entity=console'),
+            'health': await app.dispatch('GET', '/health'),
+        }
+
+    results = asyncio.run(run())
+    assert results['post'][0] == 405
+    assert results['missing'][0] == 404
+    assert set(json.loads(results['missing'][1])['endpoints']) == set(service.ENDPOINTS)
+    assert results['bad'][0] == 400 and 'entity' in json.loads(results['bad'][1])['error']
+    status, body, _ = results['health']
+    assert status == 200 and json.loads(body)['rows'] == 100
+
+
+def test_responses_match_module_results(app, cube):
+    async def run():
+        return await app.dispatch('GET', '/forecast?entity=platform&top=3'), await app.dispatch('GET', '/forecast/?top=3&entity=platform')
+
+    (status, body, cache_status), (_, again, again_status) = asyncio.run(run())
+    expected = service.importlib.import_module('ml_predict').get_top_predictions(cube, 'Platform', 3)
+    assert status == 200 and (cache_status, again_status) == ('miss', 'hit')
+    assert json.loads(body) == {'entity': 'platform', 'predictions': service.jsonable(expected)}
+    assert again == body
+
+
+def test_identical_requests_share_one_computation(app, monkeypatch):
+    calls = []
+    compute = app.compute
+
+    def slow_compute(module_name, params):
+        calls.append(threading.get_ident())
+        time.sleep(0.2)
+        return compute(module_name, params)
+
+    monkeypatch.setattr(app, 'compute', slow_compute)
+
+    async def run():
+        return await asyncio.gather(*(app.dispatch('GET', '/lifecycles?years=2000-2010') for _ in range(5)))
+
+    results = asyncio.run(run())
+    assert len(calls) == 1
+    assert sorted(cache_status for _, _, cache_status in results) == ['miss'] + ['shared'] * 4
+    assert len({body for _, body, _ in results}) == 1
+
+
+def test_http_keep_alive(app):
+    async def run():
+        ready = asyncio.get_running_loop().create_future()
+        server = asyncio.create_task(app.serve(port=0, ready=ready.set_result))
+        port = (await ready).sockets[0].getsockname()[1]
+        reader, writer = await asyncio.open_connection('127.0.0.1', port)
+        responses = []
+        for target in ('/health', '/nowhere'):
+            writer.write(f"GET {target} HTTP/1.1\r\nHost: test\r\n\r\n".encode())
+            await writer.drain()
+            status = (await reader.readline()).decode()
+            headers = {}
+            while (line := await reader.readline()) != b'\r\n':
+                name, _, value = line.decode().partition(':')
+                headers[name.lower()] = value.strip()
+            body = await reader.readexactly(int(headers['content-length']))
+            responses.append((status.split()[1], headers['connection'], json.loads(body)))
+        writer.close()
+        server.cancel()
+        return responses
+
+    (health, health_connection, _), (missing, missing_connection, _) = asyncio.run(run())
+    assert (health, missing) == ('200', '404')
+    assert health_connection == missing_connection == 'keep-alive'
\ No newline at end of file
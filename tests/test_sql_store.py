@@ -0,0 +1,53 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+import sales_cube
+import sql_store
+from conftest import assert_cubes_equal, assert_tables_equal
+
+FILTERS = [
+    {},
+    {'years': (2005, 2010)},
+    {'platforms': ['PS2', 'Wii'], 'genres': ['Sports', 'Racing']},
+    {'years': (1995, 2015), 'publishers': ['Nintendo', 'Electronic Arts', 'Sega']},
+]
+
+
+@pytest.fixture(scope='module')
+def sql_cube(csv_path, tmp_path_factory):
+    db_path = str(tmp_path_factory.mktemp('sql') / 'sales.sqlite')
+    return sql_store.open_cube(csv_path, db_path)
+
+
+def test_tables_equal_in_memory_cube(sql_cube, cube):
+    assert_cubes_equal(sql_cube, cube)
+
+
+def test_database_keeps_only_the_cube(sql_cube):
+    # The rows are staged in a temporary table and not written to the file.
+    master = sql_cube.store.connection().execute("SELECT type, name, tbl_name FROM sqlite_master").fetchall()
+    assert sorted(name for kind, name, _ in master if kind == 'table' and not name.startswith('sqlite_')) == ['cells', 'meta', 'titles']
+    assert sorted({table for kind, name, table in master if kind == 'index' and name.startswith('idx_')}) == ['cells', 'titles']
+
+
+@pytest.mark.parametrize('filters', FILTERS)
+def test_queries_equal_in_memory_cube(sql_cube, cube, filters):
+    expected = cube.filtered(**filters) if filters else cube
+    actual = sql_cube.filtered(**filters) if filters else sql_cube
+
+    for by in ('Publisher', 'Genre', ['Platform', 'Year_of_Release']):
+        keys = [by] if isinstance(by, str) else by
+        assert_tables_equal(actual.rollup(by).reset_index(), expected.rollup(by).reset_index(), keys, sales_cube.MEASURES)
+
+    pd.testing.assert_frame_equal(actual.platform_year_sales(), expected.platform_year_sales(), check_dtype=False, check_exact=False)
+    pd.testing.assert_frame_equal(actual.genre_means(), expected.genre_means(), check_dtype=False, check_exact=False)
+    assert actual.values('Platform') == expected.values('Platform')
+
+
+@pytest.mark.parametrize('group_col', ['Platform', 'Publisher', 'Name'])
+def test_entity_yearly_equals_in_memory_cube(sql_cube, cube, group_col):
+    actual = sql_cube.entity_yearly(group_col, min_year=2010)
+    expected = cube.entity_yearly(group_col, min_year=2010)
+    assert actual[group_col].astype(object).tolist() == expected[group_col].astype(object).tolist()
+    np.testing.assert_allclose(actual['Global_Sales'], expected['Global_Sales'], rtol=1e-6)
\ No newline at end of file
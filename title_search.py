@@ -0,0 +1,268 @@
+import re
+import sys
+import time
+import bisect
+import unicodedata
+import numpy as np
+import pandas as pd
+
+import tracing
+
+RESULT_LIMIT = 20
+# Suffixes per block of the ranking summary (see TitleIndex).
+BLOCK_SIZE = 2048
+DETAIL_COLUMNS = [
+    'Platform', 'Year_of_Release', 'NA_Sales', 'EU_Sales', 'JP_Sales', 'Other_Sales', 'Global_Sales',
+    'Critic_Score', 'User_Score',
+]
+
+_COMBINING = re.compile('[\u0300-\u036f]')
+_SEPARATORS = re.compile(r'[\W_]+')
+# Sorts after any character a normalized name can contain.
+_HIGHEST = chr(0x10FFFF)
+
+
+def normalize(text):
+    # Case, accents, punctuation and spacing are ignored, so "Pokémon
+    # Red/Blue" and "Pokemon Red / Blue" are the same title.
+    text = _COMBINING.sub('', unicodedata.normalize('NFKD', str(text))).lower().replace('&', ' and ')
+    return _SEPARATORS.sub(' ', text).strip()
+
+
+class TitleIndex:
+    # Search index over the Name column of the row-level frame.
+    #   keys:      distinct normalized names; titles spelt slightly differently
+    #              on different platforms share one key.
+    #   postings:  row ids grouped by key, key k's rows being
+    #              postings[offsets[k]:offsets[k + 1]] (in frame order).
+    #   suffixes:  every word-start suffix of every key ("super mario bros",
+    #              "mario bros", "bros"), sorted, with suffix_keys giving each
+    #              one's key. Typing any leading part of a title or of a word
+    #              inside it is a prefix of one of these, so the matches are
+    #              the contiguous run found by two binary searches.
+    #   block_top: the RESULT_LIMIT best-selling distinct keys of each block of
+    #              BLOCK_SIZE suffixes (one row per block, -1 padded). Ranking
+    #              a run only looks at its two partial blocks and the
+    #              summaries of the blocks in between, so a one-letter query
+    #              does not rank every title.
+    # Titles that first appear in a sales update get key ids after these and
+    # their suffixes go to a small sorted side list (see update).
+    @tracing.traced('title_search.build')
+    def __init__(self, df):
+        # take(row_ids) returns rows of the frame the ids refer to.
+        self.take = df.take
+        names = df['Name']
+        categorical = names.array if isinstance(names.dtype, pd.CategoricalDtype) else pd.Categorical(names)
+        codes = np.asarray(categorical.codes)
+
+        # Normalization runs once per distinct name, not per row.
+        normalized = pd.Index(categorical.categories).map(normalize)
+        self.keys, key_of_category = np.unique(np.asarray(normalized, dtype=object), return_inverse=True)
+
+        named = codes >= 0
+        row_ids = np.flatnonzero(named)
+        row_keys = key_of_category.reshape(-1)[codes[named]]
+        # Each row's key and sales, so an update can move the difference.
+        self.row_key = np.full(len(df), -1, dtype=np.int64)
+        self.row_key[row_ids] = row_keys
+        order = np.argsort(row_keys, kind='stable')
+        self.postings = row_ids[order]
+        self.offsets = np.searchsorted(row_keys[order], np.arange(len(self.keys) + 1))
+
+        self.row_sales = _sales(df['Global_Sales'])
+        self.key_sales = np.bincount(row_keys, weights=self.row_sales[row_ids], minlength=len(self.keys))
+        # Each key is shown as the name of its first row.
+        first_rows = self.postings[self.offsets[:-1]]
+        self.titles = np.asarray(categorical.categories, dtype=object)[codes[first_rows]]
+
+        suffixes = []
+        owners = []
+        for key_id, key in enumerate(self.keys):
+            for match in re.finditer(r'(?:^| )(?=\S)', key):
+                suffixes.append(key[match.end():])
+                owners.append(key_id)
+        order = sorted(range(len(suffixes)), key=suffixes.__getitem__)
+        self.suffixes = [suffixes[i] for i in order]
+        self.suffix_keys = np.asarray(owners, dtype=np.int64)[order]
+        self.block_top = self._block_summary(RESULT_LIMIT)
+        # Suffix positions of each key, for re-ranking the blocks it is in.
+        self.key_suffixes = np.argsort(self.suffix_keys, kind='stable')
+        self.key_suffix_offsets = np.searchsorted(self.suffix_keys[self.key_suffixes], np.arange(len(self.keys) + 1))
+
+        # Added by update: rows past the frame and titles new to the index.
+        self.new_rows = {}
+        self.new_postings = {}
+        self.new_keys = {}
+        self.new_suffixes = []
+        # key_sales and titles grow by doubling, so a new title does not copy
+        # them; entries past key_count are spare.
+        self.key_count = len(self.keys)
+
+    def _block_summary(self, limit):
+        blocks = np.arange(len(self.suffix_keys)) // BLOCK_SIZE
+        sales = self.key_sales[self.suffix_keys]
+        # By block, best-selling first; a key's suffixes in the same block sort
+        # next to each other, so all but the first are dropped.
+        order = np.lexsort((self.suffix_keys, -sales, blocks))
+        keys = self.suffix_keys[order]
+        block_of = blocks[order]
+        repeat = np.zeros(len(order), dtype=bool)
+        repeat[1:] = (block_of[1:] == block_of[:-1]) & (keys[1:] == keys[:-1])
+        keys = keys[~repeat]
+        block_of = block_of[~repeat]
+
+        n_blocks = -(-len(self.suffix_keys) // BLOCK_SIZE)
+        starts = np.searchsorted(block_of, np.arange(n_blocks))
+        rank = np.arange(len(keys)) - starts[block_of]
+        keep = rank < limit
+        top = np.full((n_blocks, limit), -1, dtype=np.int64)
+        top[block_of[keep], rank[keep]] = keys[keep]
+        return top
+
+    def _rerank_blocks(self, key_ids):
+        # The blocks holding a suffix of any of these keys, whose sales moved.
+        parts = [self.key_suffixes[self.key_suffix_offsets[k]:self.key_suffix_offsets[k + 1]] for k in key_ids]
+        for block in np.unique(np.concatenate(parts) // BLOCK_SIZE) if parts else []:
+            keys = np.unique(self.suffix_keys[block * BLOCK_SIZE:(block + 1) * BLOCK_SIZE])
+            best = keys[np.lexsort((keys, -self.key_sales[keys]))][:self.block_top.shape[1]]
+            self.block_top[block] = -1
+            self.block_top[block, :len(best)] = best
+
+    def _key_of(self, name):
+        # Key id of a name's normalized form, adding a new title if needed.
+        key = normalize(name)
+        at = np.searchsorted(self.keys, key)
+        if at < len(self.keys) and self.keys[at] == key:
+            return int(at)
+        if key not in self.new_keys:
+            key_id = self.key_count
+            if key_id == len(self.key_sales):
+                spare = max(key_id, 1)
+                self.key_sales = np.concatenate([self.key_sales, np.zeros(spare)])
+                self.titles = np.concatenate([self.titles, np.full(spare, None, dtype=object)])
+            self.key_count += 1
+            self.new_keys[key] = key_id
+            self.titles[key_id] = name
+            for match in re.finditer(r'(?:^| )(?=\S)', key):
+                bisect.insort(self.new_suffixes, (key[match.end():], key_id))
+        return self.new_keys[key]
+
+    @tracing.traced('title_search.update')
+    def update(self, rows, take=None):
+        # Brings the index up to date with dataset rows a sales update changed
+        # or appended (rows is labelled by row id) without rebuilding it: sales
+        # move between keys, new rows join their key's postings, and only the
+        # blocks of keys whose sales changed are re-ranked. A changed row keeps
+        # its Name, which is part of the key updates match rows on.
+        if take is not None:
+            self.take = take
+        moved = set()
+        for row_id, name, sales in zip(rows.index, rows['Name'], _sales(rows['Global_Sales'])):
+            row_id = int(row_id)
+            if row_id < len(self.row_key):
+                key_id, before = int(self.row_key[row_id]), self.row_sales[row_id]
+                self.row_sales[row_id] = sales
+            elif row_id in self.new_rows:
+                key_id, before = self.new_rows[row_id]
+                self.new_rows[row_id] = (key_id, sales)
+            elif pd.isna(name):
+                continue
+            else:
+                key_id, before = self._key_of(name), 0.0
+                self.new_rows[row_id] = (key_id, sales)
+                self.new_postings.setdefault(key_id, []).append(row_id)
+            if key_id < 0 or sales == before:
+                continue
+            self.key_sales[key_id] += sales - before
+            moved.add(key_id)
+        self._rerank_blocks([key_id for key_id in moved if key_id < len(self.keys)])
+
+    def __len__(self):
+        return self.key_count
+
+    def search(self, query, limit=RESULT_LIMIT):
+        # Key ids of the titles matching the query, best-selling first.
+        prefix = normalize(query)
+        if not prefix:
+            return np.empty(0, dtype=np.int64)
+        low = bisect.bisect_left(self.suffixes, prefix)
+        high = bisect.bisect_left(self.suffixes, prefix + _HIGHEST, low)
+        first_block = -(-low // BLOCK_SIZE)
+        last_block = high // BLOCK_SIZE
+        if first_block < last_block and limit <= RESULT_LIMIT:
+            top = self.block_top[first_block:last_block].ravel()
+            candidates = np.concatenate([
+                self.suffix_keys[low:first_block * BLOCK_SIZE],
+                top[top >= 0],
+                self.suffix_keys[last_block * BLOCK_SIZE:high],
+            ])
+        else:
+            candidates = self.suffix_keys[low:high]
+        if self.new_suffixes:
+            start = bisect.bisect_left(self.new_suffixes, (prefix,))
+            stop = bisect.bisect_left(self.new_suffixes, (prefix + _HIGHEST,), start)
+            added = [key_id for _, key_id in self.new_suffixes[start:stop]]
+            candidates = np.concatenate([candidates, np.asarray(added, dtype=np.int64)])
+        matches = np.unique(candidates)
+        if len(matches) > limit:
+            matches = matches[np.argpartition(-self.key_sales[matches], limit - 1)[:limit]]
+        return matches[np.argsort(-self.key_sales[matches], kind='stable')]
+
+    def rows(self, key_id):
+        rows = self.postings[self.offsets[key_id]:self.offsets[key_id + 1]] if key_id < len(self.keys) else self.postings[:0]
+        added = self.new_postings.get(key_id)
+        return np.concatenate([rows, np.asarray(added, dtype=np.int64)]) if added else rows
+
+    def lookup(self, query, limit=RESULT_LIMIT):
+        # One row per matching title and platform, gathered from the frame in
+        # a single take, with the title each row was grouped under.
+        matches = self.search(query, limit)
+        parts = [self.rows(key_id) for key_id in matches]
+        row_ids = np.concatenate(parts) if parts else np.empty(0, dtype=np.int64)
+        found = self.take(row_ids)
+        rows = found[DETAIL_COLUMNS].reset_index(drop=True)
+        rows.insert(0, 'Title', np.repeat(self.titles[matches], [len(part) for part in parts]))
+        rows.insert(1, 'Name', found['Name'].to_numpy())
+        return rows
+
+
+def _sales(series):
+    # Global_Sales as float64, missing counted as no sales.
+    return np.nan_to_num(pd.to_numeric(series, errors='coerce').to_numpy(dtype='float64', na_value=np.nan))
+
+
+def cell(value, fmt):
+    # Display text for a result value; missing scores show as "-".
+    return '-' if pd.isna(value) else format(value, fmt)
+
+
+def summarize(rows):
+    # Per-title totals over platforms for the search results: sales summed,
+    # scores averaged over the platforms that have one.
+    grouped = rows.groupby('Title', sort=False)
+    summary = grouped[['NA_Sales', 'EU_Sales', 'JP_Sales', 'Other_Sales', 'Global_Sales']].sum()
+    summary['Critic_Score'] = grouped['Critic_Score'].mean()
+    summary['User_Score'] = grouped['User_Score'].mean()
+    summary.insert(0, 'Platforms', grouped.size())
+    return summary.reset_index()
+
+
+if __name__ == "__main__":
+    import os
+    import data_cache
+
+    script_dir = os.path.dirname(os.path.abspath(__file__))
+    csv_path = sys.argv[1] if len(sys.argv) > 1 else os.path.join(script_dir, 'Video_Games_Sales_as_at_22_Dec_2016.csv')
+    queries = sys.argv[2:] or ['mario', 'call of duty', 'pokemon', 'fifa 1', 'zelda']
+
+    df = data_cache.load_dataset(csv_path)
+    start = time.perf_counter()
+    index = TitleIndex(df)
+    print(f"Indexed {len(index):,} titles from {len(df):,} rows in {time.perf_counter() - start:.2f}s")
+
+    for query in queries:
+        start = time.perf_counter()
+        matches = index.search(query)
+        elapsed = time.perf_counter() - start
+        names = ", ".join(index.titles[matches[:3]])
+        print(f"    {query!r:<16} {len(matches):>3} titles in {elapsed * 1e6:7.1f} us  ({names})")
\ No newline at end of file
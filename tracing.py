@@ -0,0 +1,186 @@
+import os
+import sys
+import json
+import time
+import functools
+import threading
+import tracemalloc
+from collections import deque
+from contextlib import contextmanager
+
+# Spans are cheap enough to leave on (a few clock reads and two getrusage
+# calls each); set GREENLIGHT_TRACE=0 to turn them off entirely.
+# Each span records rss_growth_mb, how far it raised the process's resident
+# high-water mark: 0 when it stayed under a peak reached earlier, so it shows
+# which stage set a peak rather than what each one used.
+ENABLED = os.environ.get('GREENLIGHT_TRACE', '1') != '0'
+# GREENLIGHT_TRACE_MEMORY=1 adds per-span Python allocation peaks through
+# tracemalloc, which slows allocation-heavy code down noticeably.
+TRACE_MEMORY = os.environ.get('GREENLIGHT_TRACE_MEMORY', '0') == '1'
+MAX_EVENTS = 20000
+
+_events = deque(maxlen=MAX_EVENTS)
+_local = threading.local()
+
+try:
+    import resource
+except ImportError:
+    resource = None
+
+
+def max_rss_mb():
+    # Process-wide resident high-water mark; ru_maxrss is in kilobytes on
+    # Linux and bytes on macOS.
+    if resource is None:
+        return None
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return rss / 2**20 if sys.platform == 'darwin' else rss / 2**10
+
+
+def start_memory_tracing():
+    if not tracemalloc.is_tracing():
+        tracemalloc.start()
+
+
+@contextmanager
+def span(name, category='greenlight', **args):
+    if not ENABLED:
+        yield
+        return
+
+    stack = getattr(_local, 'stack', None)
+    if stack is None:
+        stack = _local.stack = []
+
+    frame = {}
+    if tracemalloc.is_tracing():
+        # reset_peak() is global, so an enclosing span keeps the peak it had
+        # seen so far and folds in its children's peaks when they finish.
+        current, peak = tracemalloc.get_traced_memory()
+        if stack:
+            stack[-1]['peak'] = max(stack[-1].get('peak', 0), peak)
+        tracemalloc.reset_peak()
+        frame = {'base': current, 'peak': current}
+    stack.append(frame)
+
+    start_rss = max_rss_mb()
+    start_cpu = time.thread_time_ns()
+    start = time.perf_counter_ns()
+    try:
+        yield
+    finally:
+        end = time.perf_counter_ns()
+        end_cpu = time.thread_time_ns()
+        stack.pop()
+
+        details = dict(args)
+        details['cpu_ms'] = (end_cpu - start_cpu) / 1e6
+        if start_rss is not None:
+            details['rss_growth_mb'] = max_rss_mb() - start_rss
+        if 'base' in frame and tracemalloc.is_tracing():
+            peak = max(frame['peak'], tracemalloc.get_traced_memory()[1])
+            details['alloc_peak_mb'] = (peak - frame['base']) / 2**20
+            if stack:
+                stack[-1]['peak'] = max(stack[-1].get('peak', 0), peak)
+
+        _events.append({
+            'name': name,
+            'cat': category,
+            'ph': 'X',
+            'ts': start / 1000,
+            'dur': (end - start) / 1000,
+            'pid': os.getpid(),
+            'tid': threading.get_ident(),
+            'thread': threading.current_thread().name,
+            'args': details,
+        })
+
+
+def traced(name, category='greenlight'):
+    def decorate(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with span(name, category):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorate
+
+
+def events():
+    return list(_events)
+
+
+def drain():
+    # Hands a worker process's spans back to the parent with its result.
+    drained = []
+    while _events:
+        try:
+            drained.append(_events.popleft())
+        except IndexError:
+            break
+    return drained
+
+
+def record(new_events):
+    _events.extend(new_events)
+
+
+def clear():
+    _events.clear()
+
+
+def summary(trace_events=None):
+    rows = {}
+    for event in (events() if trace_events is None else trace_events):
+        row = rows.setdefault(event['name'], {
+            'name': event['name'], 'calls': 0, 'total_ms': 0.0, 'max_ms': 0.0,
+            'cpu_ms': 0.0, 'rss_growth_mb': None, 'alloc_peak_mb': None,
+        })
+        wall_ms = event['dur'] / 1000
+        row['calls'] += 1
+        row['total_ms'] += wall_ms
+        row['max_ms'] = max(row['max_ms'], wall_ms)
+        row['cpu_ms'] += event['args'].get('cpu_ms', 0.0)
+        for key in ('rss_growth_mb', 'alloc_peak_mb'):
+            value = event['args'].get(key)
+            if value is not None:
+                row[key] = value if row[key] is None else max(row[key], value)
+    for row in rows.values():
+        row['mean_ms'] = row['total_ms'] / row['calls']
+    return sorted(rows.values(), key=lambda row: row['total_ms'], reverse=True)
+
+
+def format_summary(rows):
+    lines = [f"{'Stage':<34} {'Calls':>5} {'Total ms':>10} {'Mean ms':>9} {'Max ms':>9} {'CPU ms':>9} {'RSS +MB':>8} {'Alloc MB':>9}"]
+    for row in rows:
+        rss = f"{row['rss_growth_mb']:8.1f}" if row['rss_growth_mb'] is not None else f"{'-':>8}"
+        alloc = f"{row['alloc_peak_mb']:9.1f}" if row['alloc_peak_mb'] is not None else f"{'-':>9}"
+        lines.append(
+            f"{row['name']:<34} {row['calls']:>5} {row['total_ms']:10.1f} {row['mean_ms']:9.1f} "
+            f"{row['max_ms']:9.1f} {row['cpu_ms']:9.1f} {rss} {alloc}"
+        )
+    return "\n".join(lines)
+
+
+def chrome_trace(trace_events=None):
+    # Chrome trace event format, readable by chrome://tracing and Perfetto.
+    trace_events = events() if trace_events is None else trace_events
+    out = []
+    named = set()
+    for event in trace_events:
+        thread = (event['pid'], event['tid'])
+        if thread not in named:
+            named.add(thread)
+            out.append({'name': 'thread_name', 'ph': 'M', 'pid': event['pid'], 'tid': event['tid'], 'args': {'name': event['thread']}})
+        out.append({key: value for key, value in event.items() if key != 'thread'})
+    return {'traceEvents': out, 'displayTimeUnit': 'ms'}
+
+
+def export_chrome_trace(path, trace_events=None):
+    with open(path, 'w') as f:
+        json.dump(chrome_trace(trace_events), f)
+    return path
+
+
+if TRACE_MEMORY:
+    start_memory_tracing()
\ No newline at end of file
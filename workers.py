@@ -0,0 +1,325 @@
+import os
+import time
+import pickle
+import importlib
+import threading
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from multiprocessing import shared_memory
+import numpy as np
+import pandas as pd
+
+import delta
+import tracing
+import figure_cache
+
+
+class SharedFrame:
+    # Publishes a frame's columns into shared memory once, so process workers
+    # can map them instead of receiving a pickled copy with every task.
+    def __init__(self, df):
+        self.blocks = []
+        columns = []
+        for col in df.columns:
+            series = df[col]
+            dtype = series.dtype
+            if isinstance(dtype, pd.CategoricalDtype):
+                # Prepared frames: publish the compact codes as they are.
+                kind = 'categorical'
+                parts = {'values': np.asarray(series.cat.codes)}
+                categories = list(dtype.categories)
+            elif pd.api.types.is_extension_array_dtype(dtype) and pd.api.types.is_numeric_dtype(dtype):
+                # Nullable ints/floats travel as their data plus the NA mask.
+                kind = 'masked'
+                parts = {
+                    'values': series.to_numpy(dtype=dtype.numpy_dtype, na_value=0),
+                    'mask': series.isna().to_numpy(),
+                }
+                categories = None
+            elif pd.api.types.is_numeric_dtype(dtype):
+                kind = 'numpy'
+                parts = {'values': series.to_numpy()}
+                categories = None
+            else:
+                kind = 'categorical'
+                codes, uniques = pd.factorize(series, sort=True, use_na_sentinel=True)
+                parts = {'values': codes.astype(np.int32)}
+                categories = list(uniques)
+
+            blocks = {}
+            dtypes = {}
+            for part, values in parts.items():
+                block = shared_memory.SharedMemory(create=True, size=max(values.nbytes, 1))
+                np.ndarray(values.shape, dtype=values.dtype, buffer=block.buf)[:] = values
+                self.blocks.append(block)
+                blocks[part] = block.name
+                dtypes[part] = values.dtype.str
+            columns.append({
+                'name': col,
+                'kind': kind,
+                'dtype': str(dtype),
+                'blocks': blocks,
+                'dtypes': dtypes,
+                'length': len(series),
+                'categories': categories,
+            })
+        self.handle = {'columns': columns}
+
+    def close(self):
+        for block in self.blocks:
+            block.close()
+            block.unlink()
+        self.blocks = []
+
+
+def attach_frame(handle):
+    blocks = []
+    data = {}
+    for spec in handle['columns']:
+        parts = {}
+        for part, name in spec['blocks'].items():
+            block = shared_memory.SharedMemory(name=name)
+            blocks.append(block)
+            parts[part] = np.ndarray((spec['length'],), dtype=np.dtype(spec['dtypes'][part]), buffer=block.buf)
+            parts[part].setflags(write=False)
+
+        if spec['kind'] == 'categorical':
+            data[spec['name']] = pd.Categorical.from_codes(parts['values'], categories=spec['categories'])
+        elif spec['kind'] == 'masked':
+            array_type = pd.api.types.pandas_dtype(spec['dtype']).construct_array_type()
+            data[spec['name']] = array_type(parts['values'], parts['mask'])
+        else:
+            data[spec['name']] = parts['values']
+    return pd.DataFrame(data, copy=False), blocks
+
+
+class SharedCube:
+    # Publishes a pickled sales cube into shared memory once, so process
+    # workers load it when it first reaches them rather than receiving a
+    # copy (its titles table is about as large as the dataset) with every
+    # task. Tasks carry only the handle; each new cube gets a new version.
+    def __init__(self, cube, version):
+        payload = pickle.dumps(cube, protocol=pickle.HIGHEST_PROTOCOL)
+        self.block = shared_memory.SharedMemory(create=True, size=max(len(payload), 1))
+        self.block.buf[:len(payload)] = payload
+        self.handle = {'name': self.block.name, 'size': len(payload), 'version': version}
+
+    def close(self):
+        self.block.close()
+        self.block.unlink()
+
+
+def attach_cube(handle):
+    block = shared_memory.SharedMemory(name=handle['name'])
+    try:
+        return pickle.loads(block.buf[:handle['size']])
+    finally:
+        block.close()
+
+
+_worker_frame = None
+_worker_blocks = []
+# (version, cube): the cube this worker loaded last, kept between tasks.
+_worker_cube = (None, None)
+# (overlay version, frame): the published frame with the latest delta
+# overlay applied, rebuilt once per update rather than once per task.
+_overlaid = (None, None)
+_overlaid_lock = threading.Lock()
+
+
+def _init_worker(handle, cube_handle=None):
+    global _worker_frame, _worker_blocks
+    _current_cube(cube_handle)
+    if handle is None:
+        # Streaming mode: there is no row-level frame, only the cube.
+        return
+    _worker_frame, _worker_blocks = attach_frame(handle)
+
+
+def _current_cube(handle):
+    global _worker_cube
+    if handle is None:
+        return None
+    version, cube = _worker_cube
+    if version != handle['version']:
+        with tracing.span('workers.attach_cube'):
+            cube = attach_cube(handle)
+        _worker_cube = (handle['version'], cube)
+    return cube
+
+
+def _current_frame(df, overlay):
+    global _overlaid
+    if df is None or overlay is None:
+        return df
+    with _overlaid_lock:
+        version, frame = _overlaid
+        if version != overlay['version']:
+            frame = delta.overlay_frame(df, overlay)
+            _overlaid = (overlay['version'], frame)
+        return frame
+
+
+def _import_module(module_name):
+    with tracing.span(f"{module_name}.import"):
+        importlib.import_module(module_name)
+
+
+def _run_compute(module_name, cube_handle, params, overlay):
+    module = importlib.import_module(module_name)
+    results = module.compute(_current_frame(_worker_frame, overlay), cube=_current_cube(cube_handle), **params)
+    # Spans recorded in this worker (including earlier pre-warm imports)
+    # travel back with the result.
+    return results, tracing.drain()
+
+
+def _run_render(module_name, cube_handle, params, overlay, results, figsize, dpi):
+    # Draws a figure for the figure cache off the Tk thread. Workers never show
+    # windows, so pyplot is switched to Agg before the first figure. Without
+    # results (after a sales update) the module is recomputed first.
+    import matplotlib
+    matplotlib.use('Agg')
+    module = importlib.import_module(module_name)
+    if results is None:
+        results = module.compute(_current_frame(_worker_frame, overlay), cube=_current_cube(cube_handle), **params)
+    png = None
+    if results is not None:
+        with tracing.span(f"{module_name}.rasterize"):
+            png = figure_cache.rasterize(module, results, figsize, dpi)
+    return (results, png), tracing.drain()
+
+
+def _run_compute_local(df, module_name, cube, params, overlay):
+    module = importlib.import_module(module_name)
+    return module.compute(_current_frame(df, overlay), cube=cube, **params), []
+
+
+class Job:
+    def __init__(self, module_name, future):
+        self.module_name = module_name
+        self.future = future
+        self.started = time.perf_counter()
+        self.cancelled = False
+
+    def cancel(self):
+        # A task already running in a worker cannot be interrupted; its result
+        # is simply discarded when it arrives.
+        self.cancelled = True
+        self.future.cancel()
+
+    def done(self):
+        return self.future.done()
+
+    def result(self):
+        results, events = self.future.result()
+        tracing.record(events)
+        return results
+
+    def elapsed(self):
+        return time.perf_counter() - self.started
+
+
+class ModuleRunner:
+    # Runs module computations for one dataset: its row-level frame (None in
+    # streaming and SQLite modes) and its sales cube, both handed to process
+    # workers once rather than with each task.
+    def __init__(self, df, cube=None, mode='process', max_workers=None):
+        self.df = df
+        self.cube = cube
+        self.mode = mode
+        self.shared = None
+        # The cubes most recently published to process workers, newest last.
+        # The one before is kept until the next update, for tasks submitted
+        # before this one that have not started yet.
+        self.shared_cubes = []
+        self.cube_version = 0
+        # Rows changed or appended by sales updates since df was published
+        # (delta.DeltaUpdater.overlay), sent along with every task.
+        self.overlay = None
+        self.max_workers = max_workers or min(4, os.cpu_count() or 1)
+        if mode == 'process':
+            self._share_cube(cube)
+            self.executor = self._process_pool(df)
+        else:
+            self.executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix='module-worker')
+
+    def _process_pool(self, df):
+        if df is not None:
+            self.shared = SharedFrame(df)
+        # Spawned (not forked) workers: the dashboard has a live Tk
+        # interpreter and may be importing modules on another thread.
+        return ProcessPoolExecutor(
+            max_workers=self.max_workers,
+            mp_context=multiprocessing.get_context('spawn'),
+            initializer=_init_worker,
+            initargs=(self.shared.handle if self.shared is not None else None, self._cube_handle()),
+        )
+
+    def _share_cube(self, cube):
+        self.cube = cube
+        if cube is None:
+            return
+        self.cube_version += 1
+        self.shared_cubes.append(SharedCube(cube, self.cube_version))
+        while len(self.shared_cubes) > 2:
+            self.shared_cubes.pop(0).close()
+
+    def _cube_handle(self):
+        return self.shared_cubes[-1].handle if self.shared_cubes else None
+
+    def publish(self, df, cube=None):
+        # A new row-level frame, e.g. after a sales update folded its buffer,
+        # and the cube as it is now (the current one if not given). Process
+        # workers map the frame they were started with, so they are replaced
+        # by a pool attached to the new one; tasks already running finish on
+        # the old.
+        self.df = df
+        self.overlay = None
+        if self.mode == 'process':
+            self._share_cube(cube if cube is not None else self.cube)
+            old_executor, old_shared = self.executor, self.shared
+            self.shared = None
+            self.executor = self._process_pool(df)
+            old_executor.shutdown(wait=False, cancel_futures=True)
+            if old_shared is not None:
+                old_shared.close()
+        elif cube is not None:
+            self.cube = cube
+
+    def patch(self, overlay, cube=None):
+        # A sales update that was not folded: workers keep the frame they
+        # have and apply the overlay to it, once, on their next task. The
+        # updated cube (the current one if not given) is shared again and
+        # each worker loads it once, on its next task.
+        self.overlay = overlay
+        if self.mode == 'process':
+            self._share_cube(cube if cube is not None else self.cube)
+        elif cube is not None:
+            self.cube = cube
+
+    def submit(self, module_name, params=None):
+        params = params or {}
+        if self.mode == 'process':
+            future = self.executor.submit(_run_compute, module_name, self._cube_handle(), params, self.overlay)
+        else:
+            future = self.executor.submit(_run_compute_local, self.df, module_name, self.cube, params, self.overlay)
+        return Job(module_name, future)
+
+    def submit_render(self, module_name, params=None, results=None, figsize=None, dpi=figure_cache.RENDER_DPI):
+        # Process pools only: a thread would share pyplot with the Tk thread.
+        # Without results the module is recomputed from the published cube.
+        future = self.executor.submit(_run_render, module_name, self._cube_handle(), params or {}, self.overlay, results, figsize, dpi)
+        return Job(module_name, future)
+
+    def prewarm(self, module_names):
+        if self.mode == 'process':
+            for module_name in module_names:
+                self.executor.submit(_import_module, module_name)
+
+    def shutdown(self):
+        self.executor.shutdown(wait=False, cancel_futures=True)
+        if self.shared is not None:
+            self.shared.close()
+            self.shared = None
+        while self.shared_cubes:
+            self.shared_cubes.pop().close()
\ No newline at end of file